@@ -6,6 +6,7 @@ from sqlalchemy import pool
 from alembic import context
 
 from app import Base
+from app.repo.migrations import PROGRESS_TABLE
 
 config = context.config
 
@@ -14,12 +15,20 @@ if config.config_file_name is not None:
 
 target_metadata = Base.metadata
 
+# tables in the database that no model declares and autogenerate must leave alone
+UNMANAGED_TABLES = {PROGRESS_TABLE}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    return not (type_ == "table" and reflected and compare_to is None and name in UNMANAGED_TABLES)
+
 
 def run_migrations_offline() -> None:
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -36,7 +45,7 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
 
         with context.begin_transaction():
             context.run_migrations()
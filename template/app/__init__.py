@@ -1,16 +1,31 @@
-from contextlib import asynccontextmanager
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_redoc_html
 from starlette.staticfiles import StaticFiles
 
 from app.core.config import settings
 from app.core.logging import configure_logging
-from app.repo.session import Base, engine
+from app.core.metrics import cache_counters, flush as flush_metrics, mark_process_dead, render, run_flusher
+from app.core.redis import close_redis, init_redis
+from app.repo.session import Base, engine, replica_set
+from app.repo.api_key_cache import api_key_cache
+from app.repo.api_key_filter import api_key_filter
+from app.repo.api_key_usage import usage_buffer
+from app.repo.entity_cache import entity_cache
 from app.api.v1 import router as v1_router
+from app.api.errors import ErrorCode
+from app.api.response import error_code
 from app.middleware.jwt_middleware import JWTMiddleware
 from app.middleware.api_key_middleware import ApiKeyMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.route_policy import AuthPolicy, RoutePolicyTable
+from app.middleware.sql_profiler import SqlProfilerMiddleware
 from app.static import STATIC_PATH
+from app.tasks.gateway import task_gateway
+from app.tasks.progress import progress_broker
+from app.utils.security import PasswordHasherBusy, jwt_cache_stats
 
 __all__ = ["create_app", "Base", "engine"]
 
@@ -20,7 +35,30 @@ def create_app() -> FastAPI:
 
     @asynccontextmanager
     async def lifespan(app: FastAPI):
+        init_redis()
+        background = [
+            asyncio.create_task(api_key_cache.listen()),
+            asyncio.create_task(entity_cache.listen()),
+            asyncio.create_task(usage_buffer.run(settings.api_key_usage_buffer_seconds)),
+        ]
+        if api_key_filter.enabled:
+            background.append(asyncio.create_task(api_key_filter.run(settings.api_key_filter_rebuild_seconds)))
+        if replica_set.replicas:
+            background.append(asyncio.create_task(replica_set.monitor(settings.mysql_replica_check_interval_seconds)))
+        if settings.metrics_enabled:
+            background.append(asyncio.create_task(run_flusher(settings.metrics_flush_seconds)))
         yield
+        for task in background:
+            task.cancel()
+        for task in background:
+            with suppress(asyncio.CancelledError):
+                await task
+        await task_gateway.aclose()
+        await progress_broker.aclose()
+        await close_redis()
+        if settings.metrics_enabled:
+            flush_metrics()
+        mark_process_dead()
 
     app = FastAPI(
         title=f"{settings.app_name} API",
@@ -39,24 +77,53 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
-    app.add_middleware(
-        ApiKeyMiddleware,
-        include_patterns=(
+    policy_table = RoutePolicyTable({
+        AuthPolicy.API_KEY: (
             r"/api/v1/demo/secure",
-            r"/api/v1/signature/.*"
-        )
-    )
-    app.add_middleware(
-        JWTMiddleware,
-        include_patterns=(
+            r"/api/v1/demo/tasks/.*",
+            r"/api/v1/signature/.*",
+            r"/api/v1/tasks/.*",
+        ),
+        AuthPolicy.JWT: (
             r"/api/v1/demo/me",
+        ),
+    })
+    app.add_middleware(ApiKeyMiddleware, policy_table=policy_table)
+    app.add_middleware(JWTMiddleware, policy_table=policy_table)
+    if settings.sql_profiler_enabled:
+        # outermost, so the auth middlewares' lookups are counted too
+        app.add_middleware(
+            SqlProfilerMiddleware,
+            slow_ms=settings.sql_profiler_slow_ms,
+            max_queries=settings.sql_profiler_max_queries,
+            n_plus_one_threshold=settings.sql_profiler_n_plus_one_threshold,
+            top_n=settings.sql_profiler_top_n,
+            server_timing=settings.sql_profiler_server_timing,
         )
-    )
+    if settings.metrics_enabled:
+        # outermost: the latency includes every other middleware
+        app.add_middleware(MetricsMiddleware)
+
+    @app.exception_handler(PasswordHasherBusy)
+    async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+        return error_code(code=ErrorCode.SERVICE_BUSY, status_code=503)
 
     @app.get("/health")
     def read_health() -> dict[str, str]:
         return {"status": "ok"}
 
+    if settings.metrics_enabled:
+        cache_counters.add("api_key", api_key_cache.stats, {"hit": "hits", "miss": "misses"})
+        cache_counters.add("entity", entity_cache.stats, {"local_hit": "local_hits", "redis_hit": "redis_hits", "miss": "misses"})
+        cache_counters.add("jwt", jwt_cache_stats, {"hit": "hits", "miss": "misses"})
+
+        @app.get("/metrics", include_in_schema=False)
+        async def metrics() -> Response:
+            # on the loop thread, where the buffered values are written
+            flush_metrics()
+            body, content_type = await asyncio.to_thread(render)
+            return Response(content=body, media_type=content_type)
+
     @app.get("/redoc", include_in_schema=False)
     async def redoc_html():
         return get_redoc_html(
@@ -1,13 +1,36 @@
-from typing import Annotated
+from typing import Annotated, AsyncIterator, Iterator
 from fastapi import Depends, Request, HTTPException, status
+import redis
+import redis.asyncio as aioredis
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.repo.session import get_db
-from app.repo.api_key_repository import ApiKeyRepository
+from app.core.redis import get_async_redis, get_redis
+from app.repo.session import get_db, get_async_db
+from app.repo.api_key_repository import ApiKeyRepository, AsyncApiKeyRepository
+from app.repo.unit_of_work import AsyncUnitOfWork, UnitOfWork
 
 
 SessionDep = Annotated[Session, Depends(get_db)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
+RedisDep = Annotated[redis.Redis, Depends(get_redis)]
+AsyncRedisDep = Annotated[aioredis.Redis, Depends(get_async_redis)]
+
+
+def _get_unit_of_work(db: SessionDep) -> Iterator[UnitOfWork]:
+    with UnitOfWork(db) as uow:
+        yield uow
+
+
+async def _get_async_unit_of_work(db: AsyncSessionDep) -> AsyncIterator[AsyncUnitOfWork]:
+    async with AsyncUnitOfWork(db) as uow:
+        yield uow
+
+
+# declare on an endpoint to make every repository on the request's session commit once, at the end
+UnitOfWorkDep = Annotated[UnitOfWork, Depends(_get_unit_of_work)]
+AsyncUnitOfWorkDep = Annotated[AsyncUnitOfWork, Depends(_get_async_unit_of_work)]
 
 
 def _get_api_key_repo(db: SessionDep) -> ApiKeyRepository:
@@ -17,6 +40,13 @@ def _get_api_key_repo(db: SessionDep) -> ApiKeyRepository:
 ApiKeyRepoDep = Annotated[ApiKeyRepository, Depends(_get_api_key_repo)]
 
 
+def _get_async_api_key_repo(db: AsyncSessionDep) -> AsyncApiKeyRepository:
+    return AsyncApiKeyRepository(db)
+
+
+AsyncApiKeyRepoDep = Annotated[AsyncApiKeyRepository, Depends(_get_async_api_key_repo)]
+
+
 def _get_current_user_id_from_state(request: Request) -> str:
     user_id = getattr(request.state, "user_id", None)
     if user_id is None:
@@ -4,6 +4,9 @@ from fastapi import status
 
 class ErrorCode(IntEnum):
     UNKNOWN_ERROR = -1000
+    SERVICE_BUSY = -1001
+    TASK_TIMEOUT = -1002
+    TASK_NOT_FOUND = -1003
 
     @staticmethod
     def error_doc() -> str:
@@ -14,6 +17,9 @@ class ErrorCode(IntEnum):
             "- Error codes:\n"
             "   - `0`: success\n"
             f"  - `{ErrorCode.UNKNOWN_ERROR}`: unknown error\n"
+            f"  - `{ErrorCode.SERVICE_BUSY}`: service busy, retry later\n"
+            f"  - `{ErrorCode.TASK_TIMEOUT}`: background task not finished in time\n"
+            f"  - `{ErrorCode.TASK_NOT_FOUND}`: no such background task\n"
         )
 
 
@@ -26,7 +32,10 @@ class BusinessError(Exception):
 
 
 DEFAULT_MESSAGES = {
-    ErrorCode.UNKNOWN_ERROR: "Unknown error"
+    ErrorCode.UNKNOWN_ERROR: "Unknown error",
+    ErrorCode.SERVICE_BUSY: "Service busy, retry later",
+    ErrorCode.TASK_TIMEOUT: "Task not finished in time",
+    ErrorCode.TASK_NOT_FOUND: "Task not found",
 }
 
 
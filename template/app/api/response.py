@@ -1,10 +1,23 @@
 from __future__ import annotations
 
+import dataclasses
+import json
+from collections import deque
 from datetime import datetime, date
-from typing import Any, Optional, Union
+from enum import Enum
+from functools import lru_cache
+from types import GeneratorType
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Iterable, Iterator, Literal, Optional, Union
 
 from fastapi.encoders import jsonable_encoder
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from pydantic_core import to_jsonable_python
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - falls back to the stdlib encoder
+    orjson = None  # type: ignore[assignment]
 
 from app.api.errors import ErrorCode, DEFAULT_MESSAGES
 
@@ -20,45 +33,131 @@ def _default_datetime_encoder(fmt: str):
     return _encode
 
 
+def _json_float(value: float) -> Any:
+    # orjson prints exponents differently from json ("1e16" vs "1e+16"); keep json's text
+    if value == 0.0 or 1e-4 <= abs(value) < 1e16 or orjson is None:
+        return value
+    return orjson.Fragment(json.dumps(value, allow_nan=False))
+
+
+def _json_int(value: int) -> Any:
+    if -(2 ** 63) <= value < 2 ** 64 or orjson is None:
+        return value
+    return orjson.Fragment(str(value))
+
+
+def _json_key(key: Any) -> str:
+    if isinstance(key, str):
+        return key
+    return json.dumps(key)
+
+
+class _PayloadEncoder:
+    """Single-pass encoder producing JSON-ready values with datetimes already formatted.
+
+    Mirrors ``jsonable_encoder`` for plain values and pydantic's JSON mode for values
+    dumped from models, so the rendered bytes match the previous two-pass output
+    for datetime/date fields. Built once per ``datetime_format``.
+    """
+
+    def __init__(self, datetime_format: str) -> None:
+        self.encode_datetime = _default_datetime_encoder(datetime_format)
+        self.custom_encoder = {datetime: self.encode_datetime, date: self.encode_datetime}
+        identity = lambda v, in_model: v  # noqa: E731
+        self._by_type: dict[type, Callable[[Any, bool], Any]] = {
+            str: identity,
+            bool: identity,
+            type(None): identity,
+            int: lambda v, in_model: _json_int(v),
+            float: lambda v, in_model: _json_float(v),
+            dict: self._encode_dict,
+            list: self._encode_list,
+            tuple: self._encode_list,
+            datetime: lambda v, in_model: self.encode_datetime(v),
+            date: lambda v, in_model: self.encode_datetime(v),
+        }
+
+    def encode(self, value: Any, exclude: JsonExclude = None, in_model: bool = False) -> Any:
+        if exclude:
+            if isinstance(value, BaseModel):
+                return self._encode_dict(value.model_dump(by_alias=True, exclude=exclude), True)
+            if isinstance(value, dict):
+                value = {k: v for k, v in value.items() if k not in exclude}
+        fn = self._by_type.get(type(value))
+        if fn is not None:
+            return fn(value, in_model)
+        return self._encode_other(value, in_model)
+
+    def _encode_dict(self, value: dict, in_model: bool) -> dict:
+        by_type = self._by_type
+        out = {}
+        for k, v in value.items():
+            if type(k) is str:
+                if k.startswith("_sa"):
+                    continue
+            else:
+                k = _json_key(k)
+            fn = by_type.get(type(v))
+            out[k] = fn(v, in_model) if fn is not None else self._encode_other(v, in_model)
+        return out
+
+    def _encode_list(self, value: Iterable[Any], in_model: bool) -> list:
+        by_type = self._by_type
+        out = []
+        for v in value:
+            fn = by_type.get(type(v))
+            out.append(fn(v, in_model) if fn is not None else self._encode_other(v, in_model))
+        return out
+
+    def _encode_other(self, value: Any, in_model: bool) -> Any:
+        if isinstance(value, BaseModel):
+            return self._encode_dict(value.model_dump(by_alias=True), True)
+        if isinstance(value, Enum):
+            return self.encode(value.value, in_model=in_model)
+        if isinstance(value, (datetime, date)):
+            return self.encode_datetime(value)
+        if isinstance(value, dict):
+            return self._encode_dict(value, in_model)
+        if isinstance(value, (list, tuple, set, frozenset, GeneratorType, deque)):
+            return self._encode_list(value, in_model)
+        if isinstance(value, (str, int, float)):
+            return value
+        if dataclasses.is_dataclass(value) and not isinstance(value, type):
+            return self._encode_dict(dataclasses.asdict(value), in_model)
+        if in_model:
+            # values dumped from a model follow pydantic's JSON mode (e.g. Decimal -> str)
+            return to_jsonable_python(value)
+        return jsonable_encoder(value, custom_encoder=self.custom_encoder)
+
+
+@lru_cache(maxsize=16)
+def _get_encoder(datetime_format: str) -> _PayloadEncoder:
+    return _PayloadEncoder(datetime_format)
+
+
 def _encode_payload(
     data: Any,
     *,
     exclude: JsonExclude = None,
     datetime_format: str,
 ) -> Any:
-    custom = {
-        datetime: _default_datetime_encoder(datetime_format),
-        date: _default_datetime_encoder(datetime_format),
-    }
-
+    encoder = _get_encoder(datetime_format)
     if isinstance(data, (list, tuple)):
-        return [
-            jsonable_encoder(item, custom_encoder=custom, exclude=exclude)
-            for item in data
-        ]
-
-    return jsonable_encoder(data, custom_encoder=custom, exclude=exclude)
-
-
-def _reformat_datetime_strings(obj: Any, fmt: str) -> Any:
-    if isinstance(obj, dict):
-        return {k: _reformat_datetime_strings(v, fmt) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [_reformat_datetime_strings(v, fmt) for v in obj]
-    if isinstance(obj, tuple):
-        return tuple(_reformat_datetime_strings(v, fmt) for v in obj)
-    if isinstance(obj, (datetime, date)):
-        return _default_datetime_encoder(fmt)(obj)
-    if isinstance(obj, str):
-        s = obj
-        try:
-            if s.endswith("Z"):
-                s = s[:-1] + "+00:00"
-            dt = datetime.fromisoformat(s)
-            return dt.strftime(fmt)
-        except Exception:
-            return obj
-    return obj
+        return [encoder.encode(item, exclude=exclude) for item in data]
+    return encoder.encode(data, exclude=exclude)
+
+
+def _dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class EnvelopeResponse(JSONResponse):
+    """JSONResponse for already-encoded envelopes; serialises straight to bytes."""
+
+    def render(self, content: Any) -> bytes:
+        return _dumps(content)
 
 
 def success(
@@ -75,8 +174,7 @@ def success(
         "message": message,
         "data": _encode_payload(data, exclude=exclude, datetime_format=datetime_format),
     }
-    payload = _reformat_datetime_strings(payload, datetime_format)
-    return JSONResponse(content=payload, status_code=status_code)
+    return EnvelopeResponse(content=payload, status_code=status_code)
 
 
 def error(
@@ -93,8 +191,7 @@ def error(
         "message": message,
         "data": _encode_payload(data, exclude=exclude, datetime_format=datetime_format),
     }
-    payload = _reformat_datetime_strings(payload, datetime_format)
-    return JSONResponse(content=payload, status_code=status_code)
+    return EnvelopeResponse(content=payload, status_code=status_code)
 
 
 def error_code(
@@ -115,3 +212,100 @@ def error_code(
     )
 
 
+def success_page(
+    items: Any,
+    *,
+    next_cursor: Optional[str],
+    message: str = "success",
+    code: int = 0,
+    exclude: JsonExclude = None,
+    datetime_format: str = "%Y-%m-%d %H:%M:%S",
+    status_code: int = 200,
+) -> JSONResponse:
+    """Cursor-paginated envelope: ``data = {items, next_cursor, has_more}``."""
+    payload = {
+        "code": code,
+        "message": message,
+        "data": {
+            "items": _encode_payload(list(items), exclude=exclude, datetime_format=datetime_format),
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+        },
+    }
+    return EnvelopeResponse(content=payload, status_code=status_code)
+
+
+StreamFormat = Literal["json", "ndjson"]
+_STREAM_MEDIA_TYPES = {"json": "application/json", "ndjson": "application/x-ndjson"}
+
+
+def _stream_chunks(items: Iterable[Any], head: bytes, sep: bytes, tail: bytes, encode: Callable[[Any], bytes], chunk_size: int) -> Iterator[bytes]:
+    # send the head on its own so the first byte leaves before the query finishes
+    yield head
+    buf = bytearray()
+    first = True
+    for item in items:
+        if not first:
+            buf += sep
+        buf += encode(item)
+        first = False
+        if len(buf) >= chunk_size:
+            yield bytes(buf)
+            buf.clear()
+    buf += tail
+    yield bytes(buf)
+
+
+async def _astream_chunks(items: AsyncIterable[Any], head: bytes, sep: bytes, tail: bytes, encode: Callable[[Any], bytes], chunk_size: int) -> AsyncIterator[bytes]:
+    yield head
+    buf = bytearray()
+    first = True
+    async for item in items:
+        if not first:
+            buf += sep
+        buf += encode(item)
+        first = False
+        if len(buf) >= chunk_size:
+            yield bytes(buf)
+            buf.clear()
+    buf += tail
+    yield bytes(buf)
+
+
+def success_stream(
+    items: Union[Iterable[Any], AsyncIterable[Any]],
+    *,
+    stream_format: StreamFormat = "json",
+    message: str = "success",
+    code: int = 0,
+    exclude: JsonExclude = None,
+    datetime_format: str = "%Y-%m-%d %H:%M:%S",
+    status_code: int = 200,
+    chunk_size: int = 64 * 1024,
+) -> StreamingResponse:
+    """Streaming variant of ``success()`` for large collections.
+
+    ``json`` writes the usual envelope with ``data`` as a chunked array; ``ndjson``
+    writes one encoded item per line. Items are encoded one at a time, so memory
+    stays flat regardless of the row count. Sync iterables are consumed in the
+    threadpool by ``StreamingResponse``.
+    """
+    encoder = _get_encoder(datetime_format)
+    if stream_format == "ndjson":
+        head, sep, tail = b"", b"", b""
+
+        def encode(item: Any) -> bytes:
+            return _dumps(encoder.encode(item, exclude=exclude)) + b"\n"
+    else:
+        envelope = _dumps({"code": code, "message": message, "data": []})
+        head, sep, tail = envelope[:-2], b",", envelope[-2:]
+
+        def encode(item: Any) -> bytes:
+            return _dumps(encoder.encode(item, exclude=exclude))
+
+    body: Union[Iterator[bytes], AsyncIterator[bytes]]
+    if isinstance(items, AsyncIterable):
+        body = _astream_chunks(items, head, sep, tail, encode, chunk_size)
+    else:
+        body = _stream_chunks(items, head, sep, tail, encode, chunk_size)
+    return StreamingResponse(body, status_code=status_code, media_type=_STREAM_MEDIA_TYPES[stream_format])
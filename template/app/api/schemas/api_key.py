@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -9,6 +9,10 @@ class ApiKeyCreateRequest(BaseModel):
     validity_days: int = Field(default=30, ge=1, le=3650)
 
 
+class ApiKeyBulkRevokeRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
+
+
 class ApiKeyRead(BaseModel):
     id: int
     name: str
@@ -1,11 +1,27 @@
-from fastapi import APIRouter
-from app.api.response import success, error
+import asyncio
+import time
+from typing import Any, Dict, Optional, Sequence
+
+from fastapi import APIRouter, Query
+from app.api.errors import ErrorCode
+from app.api.response import success, error, error_code
 from app.api.deps import ApiKeyIdDep, CurrentUserIdDep
+from app.tasks.gateway import TaskResultTimeout, task_gateway
+from app.tasks.owners import task_owners
 
 
 router = APIRouter()
 
 
+async def _submit(name: str, args: Optional[Sequence[Any]] = None, kwargs: Optional[Dict[str, Any]] = None, owner: Optional[int] = None) -> str:
+    """Dispatch ``name``; with an ``owner``, only that API key can read the task afterwards."""
+    task_id = await task_gateway.submit(name, args=args, kwargs=kwargs)
+    if owner is not None:
+        # after dispatch: a coalesced call returns the id of a task another key started
+        await task_owners.add(task_id, owner)
+    return task_id
+
+
 @router.get("/public", summary="Public echo demo (no auth)")
 def public_echo(q: str = "ping") -> dict:
     return success({"echo": q})
@@ -21,3 +37,55 @@ def me(user_id: CurrentUserIdDep) -> dict:
     return success({"user_id": user_id})
 
 
+@router.post("/tasks/echo", summary="Dispatch demo.echo and return its task id")
+async def submit_echo(api_key_id: ApiKeyIdDep, q: str = "ping") -> dict:
+    task_id = await _submit("demo.echo", args=[q], owner=api_key_id)
+    return success({"task_id": task_id})
+
+
+@router.post("/tasks/long-job", summary="Start demo.long_job; follow it at /api/v1/tasks/{task_id}/progress")
+async def submit_long_job(
+    api_key_id: ApiKeyIdDep,
+    steps: int = Query(10, ge=1, le=1000),
+    delay: float = Query(0.5, ge=0, le=10),
+) -> dict:
+    task_id = await _submit("demo.long_job", kwargs={"steps": steps, "delay": delay}, owner=api_key_id)
+    return success({"task_id": task_id, "progress_url": f"/api/v1/tasks/{task_id}/progress"})
+
+
+@router.post("/tasks/report", summary="Start demo.report; identical calls while it runs get the same task id")
+async def submit_report(api_key_id: ApiKeyIdDep, day: str = Query(..., pattern=r"^\d{4}-\d{2}-\d{2}$")) -> dict:
+    task_id = await _submit("demo.report", args=[day], owner=api_key_id)
+    return success({"task_id": task_id})
+
+
+@router.get("/tasks/{task_id}", summary="Await a task result (woken by Redis pub/sub, holds no thread)")
+async def task_result(api_key_id: ApiKeyIdDep, task_id: str, timeout: float = Query(10.0, gt=0, le=60)) -> dict:
+    if not await task_owners.owns(task_id, api_key_id):
+        return error_code(code=ErrorCode.TASK_NOT_FOUND, data={"task_id": task_id}, status_code=404)
+    try:
+        value = await task_gateway.result(task_id, timeout=timeout)
+    except TaskResultTimeout:
+        return error_code(code=ErrorCode.TASK_TIMEOUT, data={"task_id": task_id}, status_code=504)
+    return success({"task_id": task_id, "result": value})
+
+
+@router.post("/tasks/echo/fan-out", summary="Dispatch n demo.echo tasks and await all results concurrently")
+async def fan_out_echo(
+    api_key_id: ApiKeyIdDep,
+    n: int = Query(1000, ge=1, le=5000),
+    timeout: float = Query(30.0, gt=0, le=120),
+) -> dict:
+    started = time.perf_counter()
+    task_ids = await asyncio.gather(*(_submit("demo.echo", args=[str(i)]) for i in range(n)))
+    dispatched = time.perf_counter()
+    try:
+        results = await asyncio.gather(*(task_gateway.result(task_id, timeout=timeout) for task_id in task_ids))
+    except TaskResultTimeout as exc:
+        return error_code(code=ErrorCode.TASK_TIMEOUT, data={"task_id": exc.task_id}, status_code=504)
+    return success({
+        "tasks": n,
+        "ok": sum(1 for i, value in enumerate(results) if value == str(i)),
+        "dispatch_ms": round((dispatched - started) * 1e3, 1),
+        "wait_ms": round((time.perf_counter() - dispatched) * 1e3, 1),
+    })
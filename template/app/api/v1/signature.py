@@ -1,17 +1,23 @@
 import secrets
-from fastapi import APIRouter
-from app.api.deps import ApiKeyRepoDep
-from app.api.schemas.api_key import ApiKeyCreateRequest, ApiKeyRead, ApiKeyWithPlain
-from app.api.response import success
+from typing import Optional
+from fastapi import APIRouter, Query
+from app.api.deps import AsyncApiKeyRepoDep
+from app.api.schemas.api_key import ApiKeyBulkRevokeRequest, ApiKeyCreateRequest, ApiKeyRead, ApiKeyWithPlain
+from app.api.response import StreamFormat, error, success, success_page, success_stream
+from app.repo.api_key_cache import api_key_cache
+from app.repo.api_key_repository import AsyncApiKeyRepository
+from app.repo.models import ApiKey
+from app.repo.pagination import InvalidCursor
+from app.repo.session import AsyncSessionLocal
 
 
 router = APIRouter()
 
 
 @router.post("/api-key", response_model=ApiKeyWithPlain, summary="Create API key")
-def create_api_key(payload: ApiKeyCreateRequest, repo: ApiKeyRepoDep):
+async def create_api_key(payload: ApiKeyCreateRequest, repo: AsyncApiKeyRepoDep):
     token: str = "ra_" + secrets.token_urlsafe(30)
-    entity = repo.create_with_plain(
+    entity = await repo.create_with_plain(
         name=payload.name,
         token_plain=token,
         scopes=payload.scopes,
@@ -22,18 +28,40 @@ def create_api_key(payload: ApiKeyCreateRequest, repo: ApiKeyRepoDep):
 
 
 @router.get("/api-keys", response_model=list[ApiKeyRead], summary="List API keys")
-def list_api_keys(repo: ApiKeyRepoDep) -> list[ApiKeyRead]:
-    items = repo.list()
+async def list_api_keys(repo: AsyncApiKeyRepoDep) -> list[ApiKeyRead]:
+    items = await repo.list()
     return [ApiKeyRead(**i.__dict__) for i in items]
 
 
+@router.get("/api-keys/page", summary="List API keys with cursor pagination")
+async def page_api_keys(repo: AsyncApiKeyRepoDep, cursor: Optional[str] = None, limit: int = Query(default=100, ge=1, le=1000)):
+    try:
+        page = await repo.list_keyset(order_by=ApiKey.created_at, descending=True, limit=limit, cursor=cursor)
+    except InvalidCursor as exc:
+        return error(message=str(exc), status_code=400)
+    return success_page([ApiKeyRead(**i.__dict__) for i in page.items], next_cursor=page.next_cursor)
+
+
+@router.get("/api-keys/stream", summary="Stream all API keys (chunked JSON envelope or NDJSON)")
+async def stream_api_keys(format: StreamFormat = "json"):
+    async def rows():
+        # the response outlives request dependencies, so the stream owns its session
+        async with AsyncSessionLocal() as db:
+            async for entity in AsyncApiKeyRepository(db).stream(order_by=ApiKey.id):
+                yield ApiKeyRead(**entity.__dict__)
+
+    return success_stream(rows(), stream_format=format)
+
+
 @router.delete("/api-key/{key_id}", summary="Revoke API key")
-def revoke_api_key(key_id: int, repo: ApiKeyRepoDep) -> dict[str, str]:
-    entity = repo.find_by_id(key_id)
-    if entity:
-        entity.is_active = False
-        repo.db.add(entity)
-        repo.db.commit()
+async def revoke_api_key(key_id: int, repo: AsyncApiKeyRepoDep) -> dict[str, str]:
+    # the repository commits, or only flushes when a unit of work owns the transaction
+    await api_key_cache.publish_invalidations(await repo.revoke_many([key_id]))
     return {"message": "revoked"}
 
 
+@router.post("/api-keys/revoke", summary="Revoke API keys in bulk")
+async def revoke_api_keys(payload: ApiKeyBulkRevokeRequest, repo: AsyncApiKeyRepoDep):
+    key_hashes = await repo.revoke_many(payload.ids)
+    await api_key_cache.publish_invalidations(key_hashes)
+    return success({"revoked": len(key_hashes)})
@@ -0,0 +1,57 @@
+from typing import AsyncIterator
+
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import StreamingResponse
+
+from app.api.deps import ApiKeyIdDep
+from app.api.errors import ErrorCode
+from app.api.response import error_code
+from app.core.config import settings
+from app.tasks.owners import task_owners
+from app.tasks.progress import ProgressStreamsFull, progress_broker
+
+
+router = APIRouter()
+
+
+@router.get(
+    "/{task_id}/progress",
+    summary="Task progress as Server-Sent Events",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def task_progress(api_key_id: ApiKeyIdDep, task_id: str, request: Request) -> Response:
+    """One ``progress`` event per update (JSON, ``final: true`` on the last one), then the stream ends.
+
+    Starts with the latest known state. A client that reads slowly skips intermediate updates.
+    Only the API key that started the task can follow it (404 otherwise); 503 when the
+    process already holds ``TASK_PROGRESS_MAX_STREAMS`` streams.
+    """
+    if not await task_owners.owns(task_id, api_key_id):
+        return error_code(code=ErrorCode.TASK_NOT_FOUND, data={"task_id": task_id}, status_code=404)
+    if progress_broker.full():
+        return error_code(code=ErrorCode.SERVICE_BUSY, status_code=503)
+
+    async def events() -> AsyncIterator[bytes]:
+        try:
+            async with progress_broker.subscribe(task_id) as subscription:
+                while True:
+                    event = await subscription.next(timeout=settings.task_progress_heartbeat_seconds)
+                    if event is None:
+                        if await request.is_disconnected():
+                            return
+                        # keeps proxies from closing an idle stream
+                        yield b": keep-alive\n\n"
+                        continue
+                    yield f"id: {event.id}\nevent: progress\ndata: {event.data}\n\n".encode()
+                    if event.final:
+                        return
+        except ProgressStreamsFull:
+            # another request took the last slot after the check above; the client retries
+            return
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Dict, List, Literal
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -15,12 +16,116 @@ class Settings(BaseSettings):
     env: str = Field("development", alias="ENVIRONMENT")
     app_name: str = Field("__APP_NAME__", alias="APP_NAME")
     mysql_url: str = Field("__MYSQL_URL__", alias="MYSQL_URL")
+    # derived from MYSQL_URL (aiomysql / aiosqlite) when empty
+    mysql_async_url: str = Field("", alias="MYSQL_ASYNC_URL")
+    # read replicas as a JSON list, e.g. MYSQL_REPLICA_URLS='["mysql+pymysql://...@replica1/db"]'
+    mysql_replica_urls: List[str] = Field(default_factory=list, alias="MYSQL_REPLICA_URLS")
+    mysql_replica_max_lag_seconds: float = Field(5.0, alias="MYSQL_REPLICA_MAX_LAG_SECONDS")
+    mysql_replica_check_interval_seconds: float = Field(10.0, alias="MYSQL_REPLICA_CHECK_INTERVAL_SECONDS")
     redis_url: str = Field("__REDIS_URL__", alias="REDIS_URL")
+    # per process, per client flavour (sync / asyncio)
+    redis_max_connections: int = Field(50, alias="REDIS_MAX_CONNECTIONS")
+    redis_pool_timeout_seconds: float = Field(5.0, alias="REDIS_POOL_TIMEOUT_SECONDS")
+    redis_socket_timeout_seconds: float = Field(5.0, alias="REDIS_SOCKET_TIMEOUT_SECONDS")
+    redis_socket_connect_timeout_seconds: float = Field(2.0, alias="REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS")
+    redis_health_check_interval_seconds: int = Field(30, alias="REDIS_HEALTH_CHECK_INTERVAL_SECONDS")
     celery_broker_url: str = Field("__CELERY_BROKER_URL__", alias="CELERY_BROKER_URL")
     celery_result_backend: str = Field("__CELERY_RESULT_BACKEND__", alias="CELERY_RESULT_BACKEND")
+    # batched tasks (app/tasks/batching.py) buffer items in Redis lists under this prefix
+    celery_batch_prefix: str = Field("__APP_NAME__:batch", alias="CELERY_BATCH_PREFIX")
+    celery_batch_visibility_timeout_seconds: float = Field(300.0, alias="CELERY_BATCH_VISIBILITY_TIMEOUT_SECONDS")
+    celery_batch_sweep_seconds: float = Field(30.0, alias="CELERY_BATCH_SWEEP_SECONDS")
+    # task / result serializer: "compact" (msgpack, app/tasks/serialization.py) or "json"
+    celery_serializer: str = Field("compact", alias="CELERY_SERIALIZER")
+    # "zlib", "lz4" (needs the lz4 extra) or "none"; bodies smaller than the threshold are sent uncompressed
+    celery_compression: str = Field("zlib", alias="CELERY_COMPRESSION")
+    celery_compression_threshold_bytes: int = Field(1024, alias="CELERY_COMPRESSION_THRESHOLD_BYTES")
+    # payloads above the threshold are stored in Redis / a shared directory and only a reference is sent
+    celery_claim_check_backend: str = Field("redis", alias="CELERY_CLAIM_CHECK_BACKEND")
+    celery_claim_check_threshold_bytes: int = Field(256 * 1024, alias="CELERY_CLAIM_CHECK_THRESHOLD_BYTES")
+    celery_claim_check_prefix: str = Field("__APP_NAME__:claim", alias="CELERY_CLAIM_CHECK_PREFIX")
+    celery_claim_check_dir: str = Field("/tmp/__APP_NAME__-claims", alias="CELERY_CLAIM_CHECK_DIR")
+    celery_claim_check_ttl_seconds: int = Field(86400, alias="CELERY_CLAIM_CHECK_TTL_SECONDS")
+    # results are deleted from the backend after this long; hard / soft per-task time limits
+    celery_result_expires_seconds: int = Field(3600, alias="CELERY_RESULT_EXPIRES_SECONDS")
+    celery_task_time_limit_seconds: int = Field(300, alias="CELERY_TASK_TIME_LIMIT_SECONDS")
+    celery_task_soft_time_limit_seconds: int = Field(270, alias="CELERY_TASK_SOFT_TIME_LIMIT_SECONDS")
+    # task gateway (app/tasks/gateway.py): threads publishing for async callers, default result wait
+    celery_dispatch_workers: int = Field(4, alias="CELERY_DISPATCH_WORKERS")
+    celery_result_wait_timeout_seconds: float = Field(30.0, alias="CELERY_RESULT_WAIT_TIMEOUT_SECONDS")
+    # coalescing tasks (app/tasks/coalesce.py): in-flight markers expire after this long at the latest
+    celery_coalesce_prefix: str = Field("__APP_NAME__:coalesce", alias="CELERY_COALESCE_PREFIX")
+    celery_coalesce_lock_ttl_seconds: int = Field(600, alias="CELERY_COALESCE_LOCK_TTL_SECONDS")
+    # API keys allowed to read a task's result / progress (app/tasks/owners.py)
+    task_owner_prefix: str = Field("__APP_NAME__:task-owner", alias="TASK_OWNER_PREFIX")
+    # task progress (app/tasks/progress.py): latest state kept this long, per-stream queue, update throttle
+    task_progress_prefix: str = Field("__APP_NAME__:task-progress", alias="TASK_PROGRESS_PREFIX")
+    task_progress_ttl_seconds: int = Field(3600, alias="TASK_PROGRESS_TTL_SECONDS")
+    task_progress_queue_size: int = Field(16, alias="TASK_PROGRESS_QUEUE_SIZE")
+    # open progress streams per process; more are refused with 503
+    task_progress_max_streams: int = Field(1000, alias="TASK_PROGRESS_MAX_STREAMS")
+    task_progress_min_interval_seconds: float = Field(0.2, alias="TASK_PROGRESS_MIN_INTERVAL_SECONDS")
+    task_progress_heartbeat_seconds: float = Field(15.0, alias="TASK_PROGRESS_HEARTBEAT_SECONDS")
     log_level: str = Field("__LOG_LEVEL__", alias="LOG_LEVEL")
     log_dir: str = Field("__LOG_DIR__", alias="LOG_DIR")
 
+    # JWT verification: "jose" (python-jose) or "native" (stdlib HS256 verifier)
+    jwt_backend: Literal["jose", "native"] = Field("jose", alias="JWT_BACKEND")
+    jwt_cache_size: int = Field(10000, alias="JWT_CACHE_SIZE")
+    jwt_cache_ttl_seconds: float = Field(3600.0, alias="JWT_CACHE_TTL_SECONDS")
+
+    # Password hashing
+    bcrypt_rounds: int = Field(12, alias="BCRYPT_ROUNDS")
+    password_hash_workers: int = Field(4, alias="PASSWORD_HASH_WORKERS")
+    password_hash_max_pending: int = Field(64, alias="PASSWORD_HASH_MAX_PENDING")
+
+    # API key auth
+    api_key_salt: str = Field("", alias="API_KEY_SALT")
+    api_key_cache_size: int = Field(10000, alias="API_KEY_CACHE_SIZE")
+    api_key_cache_ttl_seconds: float = Field(300.0, alias="API_KEY_CACHE_TTL_SECONDS")
+    # cache misses read the key from the primary; false reads a replica, and a key revoked within
+    # MYSQL_REPLICA_MAX_LAG_SECONDS of the lookup may then stay accepted for API_KEY_CACHE_TTL_SECONDS
+    api_key_lookup_on_primary: bool = Field(True, alias="API_KEY_LOOKUP_ON_PRIMARY")
+    api_key_invalidation_channel: str = Field("__APP_NAME__:api_key:invalidate", alias="API_KEY_INVALIDATION_CHANNEL")
+    api_key_usage_redis_key: str = Field("__APP_NAME__:api_key:usage", alias="API_KEY_USAGE_REDIS_KEY")
+    # Bloom filter of valid key hashes; unknown tokens are refused without a DB lookup
+    api_key_filter_enabled: bool = Field(True, alias="API_KEY_FILTER_ENABLED")
+    api_key_filter_capacity: int = Field(100000, alias="API_KEY_FILTER_CAPACITY")
+    api_key_filter_error_rate: float = Field(0.001, alias="API_KEY_FILTER_ERROR_RATE")
+    api_key_filter_rebuild_seconds: float = Field(300.0, alias="API_KEY_FILTER_REBUILD_SECONDS")
+    # key writes announce themselves here; its lease / last-write keys share the prefix
+    api_key_filter_channel: str = Field("__APP_NAME__:api_key:written", alias="API_KEY_FILTER_CHANNEL")
+    # longest a key write may take to commit; a writer that dies mid-write stalls misses this long
+    api_key_filter_write_lease_seconds: float = Field(60.0, alias="API_KEY_FILTER_WRITE_LEASE_SECONDS")
+    # web workers push buffered counts to Redis this often; Celery beat flushes Redis -> MySQL
+    api_key_usage_buffer_seconds: float = Field(1.0, alias="API_KEY_USAGE_BUFFER_SECONDS")
+    api_key_usage_flush_interval_seconds: float = Field(10.0, alias="API_KEY_USAGE_FLUSH_INTERVAL_SECONDS")
+
+    # Prometheus metrics: /metrics, HTTP / DB pool / cache / Celery task metrics
+    metrics_enabled: bool = Field(True, alias="METRICS_ENABLED")
+    # how often buffered HTTP latencies and cache counters are published (also done on every scrape)
+    metrics_flush_seconds: float = Field(5.0, alias="METRICS_FLUSH_SECONDS")
+    # Celery workers serve their metrics on this port (0: off)
+    celery_metrics_port: int = Field(0, alias="CELERY_METRICS_PORT")
+
+    # Per-request SQL profiler; engines are only instrumented when enabled
+    sql_profiler_enabled: bool = Field(False, alias="SQL_PROFILER_ENABLED")
+    sql_profiler_slow_ms: float = Field(500.0, alias="SQL_PROFILER_SLOW_MS")
+    sql_profiler_max_queries: int = Field(50, alias="SQL_PROFILER_MAX_QUERIES")
+    sql_profiler_n_plus_one_threshold: int = Field(5, alias="SQL_PROFILER_N_PLUS_ONE_THRESHOLD")
+    sql_profiler_top_n: int = Field(5, alias="SQL_PROFILER_TOP_N")
+    sql_profiler_server_timing: bool = Field(False, alias="SQL_PROFILER_SERVER_TIMING")
+
+    # Opt-in read-through cache for Repository(..., cache=entity_cache)
+    entity_cache_prefix: str = Field("__APP_NAME__:entity", alias="ENTITY_CACHE_PREFIX")
+    entity_cache_ttl_seconds: float = Field(300.0, alias="ENTITY_CACHE_TTL_SECONDS")
+    entity_cache_negative_ttl_seconds: float = Field(30.0, alias="ENTITY_CACHE_NEGATIVE_TTL_SECONDS")
+    # per-table overrides as JSON, e.g. ENTITY_CACHE_MODEL_TTLS='{"api_keys": 60}'
+    entity_cache_model_ttls: Dict[str, float] = Field(default_factory=dict, alias="ENTITY_CACHE_MODEL_TTLS")
+    entity_cache_local_size: int = Field(1024, alias="ENTITY_CACHE_LOCAL_SIZE")
+    # other workers' writes reach the in-process level only by expiry
+    entity_cache_local_ttl_seconds: float = Field(5.0, alias="ENTITY_CACHE_LOCAL_TTL_SECONDS")
+
 
 @lru_cache()
 def get_settings() -> Settings:
@@ -0,0 +1,148 @@
+"""Prometheus metrics, served at ``/metrics`` (and by Celery workers on ``CELERY_METRICS_PORT``).
+
+Values live in this process. With several processes (``uvicorn --workers``,
+Celery prefork) set ``PROMETHEUS_MULTIPROC_DIR`` to a directory shared by all
+of them, empty at deploy time and set before they start: every process then
+writes its values to files there, and a scrape of any process aggregates all
+of them.
+
+Request-rate metrics stay off Prometheus's locked values on the hot path: HTTP
+latencies go into plain per-process ``BufferedHistogram`` counts, and counters
+the caches already keep as plain ints are not instrumented at all. ``flush()``
+(every ``METRICS_FLUSH_SECONDS``, before each scrape and at shutdown) folds both
+into the exported metrics.
+"""
+import asyncio
+import os
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Mapping, Tuple
+
+from loguru import logger
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+TASK_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests being handled", ["method"], multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections checked out of the SQLAlchemy pool", ["pool"], multiprocess_mode="livesum",
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent getting a connection from the SQLAlchemy pool",
+    ["pool"], buckets=WAIT_BUCKETS,
+)
+CACHE_LOOKUPS = Counter("cache_lookups", "Cache lookups by cache and outcome", ["cache", "result"])
+CELERY_TASK_RUNTIME = Histogram(
+    "celery_task_runtime_seconds", "Celery task run time", ["task", "state"], buckets=TASK_BUCKETS,
+)
+CELERY_TASK_QUEUE_WAIT = Histogram(
+    "celery_task_queue_wait_seconds", "Time from publish (or ETA) to start", ["task", "queue"], buckets=TASK_BUCKETS,
+)
+
+
+def render() -> Tuple[bytes, str]:
+    if MULTIPROCESS:
+        # per scrape, as prometheus_client requires: reads every process's files
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int = 0) -> None:
+    """Drop an exiting process's live gauges from the aggregate."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+_flush_hooks: Dict[str, Callable[[], None]] = {}
+
+
+def on_flush(name: str, hook: Callable[[], None]) -> None:
+    """Run ``hook`` on every ``flush()``; registering a name again replaces its hook."""
+    _flush_hooks[name] = hook
+
+
+def flush() -> None:
+    """Publish buffered values. Call from the event loop thread, which is where they are buffered."""
+    for name, hook in list(_flush_hooks.items()):
+        try:
+            hook()
+        except Exception as exc:
+            logger.warning(f"Failed to publish {name} metrics: {exc}")
+
+
+async def run_flusher(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        flush()
+
+
+class BufferedHistogram:
+    """One labelled histogram child, counted in plain lists and published on ``flush()``.
+
+    ``observe`` takes no lock, so all calls to it and to ``flush`` must come from
+    one thread (the event loop's). The child's buckets and sum are prometheus_client
+    internals, but their layout is the same in every value store, mmap included.
+    """
+
+    __slots__ = ("_child", "_bounds", "_counts", "_sum")
+
+    def __init__(self, child: Histogram) -> None:
+        self._child = child
+        self._bounds = child._upper_bounds
+        self._counts: List[int] = [0] * len(self._bounds)
+        self._sum = 0.0
+
+    def observe(self, amount: float) -> None:
+        # the first bound >= amount, as Histogram.observe picks it; the last bound is +Inf
+        self._counts[bisect_left(self._bounds, amount)] += 1
+        self._sum += amount
+
+    def flush(self) -> None:
+        counts, total = self._counts, self._sum
+        if not any(counts):
+            return
+        self._counts, self._sum = [0] * len(counts), 0.0
+        for bucket, count in zip(self._child._buckets, counts):
+            if count:
+                bucket.inc(count)
+        self._child._sum.inc(total)
+
+
+class CounterSync:
+    """Publishes ``int`` counters kept elsewhere (e.g. ``stats()`` dicts) as a Prometheus counter."""
+
+    def __init__(self, counter: Counter) -> None:
+        self.counter = counter
+        self._sources: Dict[str, Tuple[Callable[[], Mapping[str, Any]], Dict[str, Any], Dict[str, int]]] = {}
+
+    def add(self, name: str, stats: Callable[[], Mapping[str, Any]], fields: Mapping[str, str]) -> None:
+        """Track ``stats()[field]`` as ``counter{cache=name, result=label}`` for each ``label: field``."""
+        children = {field: self.counter.labels(name, label) for label, field in fields.items()}
+        # re-adding a name (another create_app()) replaces it instead of counting twice
+        self._sources[name] = (stats, children, {field: int(stats().get(field, 0)) for field in fields.values()})
+
+    def sync(self) -> None:
+        for stats, children, last in self._sources.values():
+            values = stats()
+            for field, child in children.items():
+                value = int(values.get(field, 0))
+                if value > last[field]:
+                    child.inc(value - last[field])
+                last[field] = value
+
+
+
+cache_counters = CounterSync(CACHE_LOOKUPS)
+on_flush("cache", cache_counters.sync)
@@ -0,0 +1,185 @@
+import hashlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import redis
+import redis.asyncio as aioredis
+from redis.exceptions import NoScriptError
+
+from app.core.config import settings
+
+
+# one pool per process for each flavour; the app opens them in the lifespan,
+# Celery workers and scripts create them lazily on first use
+_redis: Optional[redis.Redis] = None
+_async_redis: Optional[aioredis.Redis] = None
+# bytes in, bytes out (e.g. Celery claim-check payloads); created on first use
+_raw_redis: Optional[redis.Redis] = None
+
+Command = Tuple[Any, ...]
+
+
+def _pool_kwargs(decode_responses: bool = True) -> Dict[str, Any]:
+    return {
+        "max_connections": settings.redis_max_connections,
+        # wait this long for a free connection instead of failing when the pool is exhausted
+        "timeout": settings.redis_pool_timeout_seconds,
+        "socket_timeout": settings.redis_socket_timeout_seconds,
+        "socket_connect_timeout": settings.redis_socket_connect_timeout_seconds,
+        "health_check_interval": settings.redis_health_check_interval_seconds,
+        "decode_responses": decode_responses,
+    }
+
+
+def get_redis() -> redis.Redis:
+    global _redis
+    if _redis is None:
+        pool = redis.BlockingConnectionPool.from_url(settings.redis_url, **_pool_kwargs())
+        _redis = redis.Redis(connection_pool=pool)
+    return _redis
+
+
+def get_async_redis() -> aioredis.Redis:
+    global _async_redis
+    if _async_redis is None:
+        pool = aioredis.BlockingConnectionPool.from_url(settings.redis_url, **_pool_kwargs())
+        _async_redis = aioredis.Redis(connection_pool=pool)
+    return _async_redis
+
+
+def get_raw_redis() -> redis.Redis:
+    global _raw_redis
+    if _raw_redis is None:
+        pool = redis.BlockingConnectionPool.from_url(settings.redis_url, **_pool_kwargs(decode_responses=False))
+        _raw_redis = redis.Redis(connection_pool=pool)
+    return _raw_redis
+
+
+def init_redis() -> None:
+    get_redis()
+    get_async_redis()
+
+
+async def close_redis() -> None:
+    global _redis, _async_redis, _raw_redis
+    if _async_redis is not None:
+        await _async_redis.aclose(close_connection_pool=True)
+        _async_redis = None
+    if _redis is not None:
+        _redis.close()
+        _redis.connection_pool.disconnect()
+        _redis = None
+    if _raw_redis is not None:
+        _raw_redis.close()
+        _raw_redis.connection_pool.disconnect()
+        _raw_redis = None
+
+
+def _batches(commands: Iterable[Command], batch_size: int) -> Iterable[List[Command]]:
+    batch: List[Command] = []
+    for command in commands:
+        batch.append(command)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def pipelined(
+    commands: Iterable[Command],
+    client: Optional[redis.Redis] = None,
+    transaction: bool = False,
+    batch_size: int = 1000,
+) -> List[Any]:
+    """Run ``(name, *args)`` commands in pipelines of ``batch_size``; one round trip per batch.
+
+    With ``transaction=True`` each batch is a MULTI/EXEC block, not the whole sequence.
+    """
+    client = client or get_redis()
+    results: List[Any] = []
+    for batch in _batches(commands, batch_size):
+        with client.pipeline(transaction=transaction) as pipe:
+            for name, *args in batch:
+                pipe.execute_command(name, *args)
+            results.extend(pipe.execute())
+    return results
+
+
+async def async_pipelined(
+    commands: Iterable[Command],
+    client: Optional[aioredis.Redis] = None,
+    transaction: bool = False,
+    batch_size: int = 1000,
+) -> List[Any]:
+    client = client or get_async_redis()
+    results: List[Any] = []
+    for batch in _batches(commands, batch_size):
+        async with client.pipeline(transaction=transaction) as pipe:
+            for name, *args in batch:
+                pipe.execute_command(name, *args)
+            results.extend(await pipe.execute())
+    return results
+
+
+class ScriptRegistry:
+    """Lua scripts run by SHA (``EVALSHA``), loaded on the first ``NOSCRIPT`` reply.
+
+    The SHA is computed locally, so a script costs one round trip per call once
+    the server has it cached, and a Redis restart only costs one reload.
+    """
+
+    def __init__(self) -> None:
+        self._scripts: Dict[str, Tuple[str, str]] = {}
+
+    def register(self, name: str, source: str) -> str:
+        sha = hashlib.sha1(source.encode("utf-8")).hexdigest()
+        self._scripts[name] = (source, sha)
+        return name
+
+    def sha(self, name: str) -> str:
+        return self._scripts[name][1]
+
+    def run(self, name: str, keys: Sequence[Any] = (), args: Sequence[Any] = (), client: Optional[redis.Redis] = None) -> Any:
+        client = client or get_redis()
+        source, sha = self._scripts[name]
+        try:
+            return client.evalsha(sha, len(keys), *keys, *args)
+        except NoScriptError:
+            client.script_load(source)
+            return client.evalsha(sha, len(keys), *keys, *args)
+
+    async def run_async(self, name: str, keys: Sequence[Any] = (), args: Sequence[Any] = (), client: Optional[aioredis.Redis] = None) -> Any:
+        client = client or get_async_redis()
+        source, sha = self._scripts[name]
+        try:
+            return await client.evalsha(sha, len(keys), *keys, *args)
+        except NoScriptError:
+            await client.script_load(source)
+            return await client.evalsha(sha, len(keys), *keys, *args)
+
+
+scripts = ScriptRegistry()
+
+
+def _sync_pool_stats(pool: Any) -> Dict[str, Any]:
+    created = len(pool._connections)
+    # the blocking pool's queue holds idle connections plus ``None`` placeholders for unopened slots
+    idle = sum(1 for conn in list(pool.pool.queue) if conn is not None)
+    return {"max_connections": pool.max_connections, "created": created, "in_use": created - idle, "idle": idle}
+
+
+def _async_pool_stats(pool: Any) -> Dict[str, Any]:
+    idle = len(pool._available_connections)
+    in_use = len(pool._in_use_connections)
+    return {"max_connections": pool.max_connections, "created": idle + in_use, "in_use": in_use, "idle": idle}
+
+
+def pool_stats() -> Dict[str, Optional[Dict[str, Any]]]:
+    sync_pool = _redis.connection_pool if _redis is not None else None
+    async_pool = _async_redis.connection_pool if _async_redis is not None else None
+    raw_pool = _raw_redis.connection_pool if _raw_redis is not None else None
+    return {
+        "sync": _sync_pool_stats(sync_pool) if isinstance(sync_pool, redis.BlockingConnectionPool) else None,
+        "async": _async_pool_stats(async_pool) if isinstance(async_pool, aioredis.ConnectionPool) else None,
+        "raw": _sync_pool_stats(raw_pool) if isinstance(raw_pool, redis.BlockingConnectionPool) else None,
+    }
@@ -1,40 +1,61 @@
-from typing import Callable, Iterable, Optional, List
-import re
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
-
-from app.repo.api_key_repository import ApiKeyRepository
-from app.repo.session import SessionLocal
-
-
-class ApiKeyMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app: ASGIApp, include_patterns: Iterable[str] = ()) -> None:
-        super().__init__(app)
-        self.include_regex: List[re.Pattern[str]] = [re.compile(p) for p in include_patterns]
-
-    async def dispatch(self, request: Request, call_next: Callable[[Request], Response]) -> Response:
-        if request.method == "OPTIONS":
-            return await call_next(request)
-        path: str = request.url.path
-        if not any(r.search(path) for r in self.include_regex):
-            return await call_next(request)
-        token: Optional[str] = request.headers.get("X-API-Key")
+from typing import Iterable, Optional
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.middleware.route_policy import AuthPolicy, RoutePolicyTable
+from app.repo.api_key_cache import api_key_cache
+from app.repo.api_key_filter import api_key_filter
+from app.repo.api_key_repository import AsyncApiKeyRepository, hash_api_token
+from app.repo.api_key_usage import usage_buffer
+from app.repo.routing import use_primary
+from app.repo.session import AsyncSessionLocal
+
+
+class ApiKeyMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        policy_table: Optional[RoutePolicyTable] = None,
+        include_patterns: Iterable[str] = (),
+    ) -> None:
+        self.app = app
+        self.policy_table = policy_table or RoutePolicyTable({AuthPolicy.API_KEY: include_patterns})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        if not self.policy_table.requires(scope["path"], AuthPolicy.API_KEY):
+            await self.app(scope, receive, send)
+            return
+
+        token: Optional[str] = Headers(scope=scope).get("x-api-key")
         if not token:
-            return Response(status_code=401, content="Missing API key")
-
-        db = SessionLocal()
-        try:
-            repo = ApiKeyRepository(db)
-            entity = repo.verify_plain(token)
+            await Response(status_code=401, content="Missing API key")(scope, receive, send)
+            return
+
+        key_hash = hash_api_token(token)
+        if not await api_key_filter.might_exist(key_hash):
+            await Response(status_code=401, content="Invalid API key")(scope, receive, send)
+            return
+        cached = api_key_cache.get(key_hash)
+        if cached is None:
+            generation = api_key_cache.generation
+            async with AsyncSessionLocal() as db:
+                if settings.api_key_lookup_on_primary:
+                    # what is read here is cached: a lagging replica could still show a revoked key as active
+                    use_primary(db)
+                entity = await AsyncApiKeyRepository(db).verify_hash(key_hash)
             if not entity:
-                return Response(status_code=401, content="Invalid API key")
-            repo.increment_usage(entity.id)
-            request.state.api_key_id = int(entity.id)
-            request.state.skip_jwt = True
-        finally:
-            db.close()
-
-        return await call_next(request)
+                await Response(status_code=401, content="Invalid API key")(scope, receive, send)
+                return
+            cached = api_key_cache.put(key_hash, entity, generation=generation)
+        usage_buffer.incr(cached.id)
 
+        state = scope.setdefault("state", {})
+        state["api_key_id"] = cached.id
+        state["skip_jwt"] = True
 
+        await self.app(scope, receive, send)
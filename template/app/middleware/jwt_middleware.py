@@ -1,44 +1,53 @@
-from typing import Callable, Iterable, List
-import re
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
-from app.utils.security import decode_access_token
-
-
-class JWTMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app: ASGIApp, include_patterns: Iterable[str] = ()) -> None:
-        super().__init__(app)
-        self.include_regex: List[re.Pattern[str]] = [re.compile(p) for p in include_patterns]
+from typing import Iterable, Optional
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-    async def dispatch(self, request: Request, call_next: Callable[[Request], Response]) -> Response:
-        if request.method == "OPTIONS":
-            return await call_next(request)
-        if getattr(request.state, "skip_jwt", False):
-            return await call_next(request)
+from app.middleware.route_policy import AuthPolicy, RoutePolicyTable
+from app.utils.security import decode_access_token
 
-        path: str = request.url.path
-        if not any(r.search(path) for r in self.include_regex):
-            return await call_next(request)
 
-        auth = request.headers.get("authorization") or request.headers.get("Authorization")
+class JWTMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        policy_table: Optional[RoutePolicyTable] = None,
+        include_patterns: Iterable[str] = (),
+    ) -> None:
+        self.app = app
+        self.policy_table = policy_table or RoutePolicyTable({AuthPolicy.JWT: include_patterns})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        state = scope.setdefault("state", {})
+        if state.get("skip_jwt", False):
+            await self.app(scope, receive, send)
+            return
+        if not self.policy_table.requires(scope["path"], AuthPolicy.JWT):
+            await self.app(scope, receive, send)
+            return
+
+        auth = Headers(scope=scope).get("authorization")
         if not auth or not auth.lower().startswith("bearer "):
-            return Response(status_code=401, content="Missing token")
+            await Response(status_code=401, content="Missing token")(scope, receive, send)
+            return
 
         token = auth.split(" ", 1)[1]
         try:
             payload = decode_access_token(token)
         except Exception:
-            return Response(status_code=401, content="Invalid token")
+            await Response(status_code=401, content="Invalid token")(scope, receive, send)
+            return
 
         sub = payload.get("sub")
         try:
             user_id_str = sub.split(":", 1)[1] if isinstance(sub, str) and ":" in sub else sub
             user_id = int(user_id_str)
         except Exception:
-            return Response(status_code=401, content="Invalid subject")
-
-        request.state.user_id = user_id
-        return await call_next(request)
-
+            await Response(status_code=401, content="Invalid subject")(scope, receive, send)
+            return
 
+        state["user_id"] = user_id
+        await self.app(scope, receive, send)
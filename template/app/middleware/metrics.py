@@ -0,0 +1,66 @@
+from time import perf_counter
+from typing import Dict, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_PROGRESS, BufferedHistogram, on_flush
+
+_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+
+class MetricsMiddleware:
+    """Request latency per method, route template and status (``/api/v1/tasks/{task_id}/progress``).
+
+    The route is read from the scope after routing, so label values are bounded
+    by the app's routes: paths matching none are ``unmatched``. Latencies and
+    in-progress counts are kept here as plain numbers (the middleware only runs
+    on the event loop) and published on ``app.core.metrics.flush()``, so the
+    in-progress gauge is a sample taken at each flush.
+    """
+
+    def __init__(self, app: ASGIApp, track_in_progress: bool = True) -> None:
+        self.app = app
+        self.track_in_progress = track_in_progress
+        self._histograms: Dict[Tuple[str, str, int], BufferedHistogram] = {}
+        self._in_progress: Dict[str, int] = {}
+        on_flush("http", self.flush)
+
+    def flush(self) -> None:
+        for histogram in list(self._histograms.values()):
+            histogram.flush()
+        for method, count in list(self._in_progress.items()):
+            HTTP_REQUESTS_IN_PROGRESS.labels(method).set(count)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"] if scope["method"] in _METHODS else "OTHER"
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        track = self.track_in_progress
+        if track:
+            self._in_progress[method] = self._in_progress.get(method, 0) + 1
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - start
+            if track:
+                self._in_progress[method] -= 1
+            route = scope.get("route")
+            template = getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+            key = (method, template, status)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = BufferedHistogram(
+                    HTTP_REQUEST_DURATION.labels(method, template, str(status))
+                )
+            histogram.observe(elapsed)
@@ -0,0 +1,52 @@
+from enum import Enum
+import re
+from typing import Dict, FrozenSet, Iterable, Mapping, Optional
+
+
+class AuthPolicy(str, Enum):
+    API_KEY = "api_key"
+    JWT = "jwt"
+
+
+_NO_POLICIES: FrozenSet[AuthPolicy] = frozenset()
+
+
+class RoutePolicyTable:
+    """Route -> auth policy table, compiled once and shared by the auth middlewares.
+
+    All patterns are merged into a single alternation so an unprotected path costs
+    one regex search; results are memoized per path (bounded) so hot routes skip
+    the regex entirely.
+    """
+
+    def __init__(self, rules: Mapping[AuthPolicy, Iterable[str]], cache_size: int = 2048) -> None:
+        self._policy_regex: Dict[AuthPolicy, re.Pattern[str]] = {}
+        all_patterns = []
+        for policy, patterns in rules.items():
+            patterns = list(patterns)
+            if not patterns:
+                continue
+            self._policy_regex[policy] = re.compile("|".join(f"(?:{p})" for p in patterns))
+            all_patterns.extend(patterns)
+        self._any_regex: Optional[re.Pattern[str]] = (
+            re.compile("|".join(f"(?:{p})" for p in all_patterns)) if all_patterns else None
+        )
+        self._cache: Dict[str, FrozenSet[AuthPolicy]] = {}
+        self._cache_size = cache_size
+
+    def policies_for(self, path: str) -> FrozenSet[AuthPolicy]:
+        cached = self._cache.get(path)
+        if cached is not None:
+            return cached
+        if self._any_regex is None or self._any_regex.search(path) is None:
+            policies = _NO_POLICIES
+        else:
+            policies = frozenset(p for p, r in self._policy_regex.items() if r.search(path))
+        if len(self._cache) >= self._cache_size:
+            # paths with ids are unbounded; drop the oldest entry instead of growing
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[path] = policies
+        return policies
+
+    def requires(self, path: str, policy: AuthPolicy) -> bool:
+        return policy in self.policies_for(path)
@@ -0,0 +1,69 @@
+from loguru import logger
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.repo.profiler import QueryProfile, current_profile, start_profile, stop_profile
+
+
+def _short(statement: str, limit: int = 200) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+
+class SqlProfilerMiddleware:
+    """Profiles the SQL each HTTP request runs (see ``app.repo.profiler``).
+
+    Requests over ``slow_ms`` of DB time or ``max_queries`` statements, or that
+    repeat one statement shape ``n_plus_one_threshold`` times, are logged with
+    their slowest statements. With ``server_timing`` the totals so far are sent
+    as a ``Server-Timing: db;dur=...`` header.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        slow_ms: float = 500.0,
+        max_queries: int = 50,
+        n_plus_one_threshold: int = 5,
+        top_n: int = 5,
+        server_timing: bool = False,
+    ) -> None:
+        self.app = app
+        self.slow_ms = slow_ms
+        self.max_queries = max_queries
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.top_n = top_n
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # endpoints run in copies of this context (threadpool, greenlets) but share the profile object
+        token = start_profile(self.top_n)
+        profile = current_profile()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", f'db;dur={profile.total * 1000:.2f};desc="{profile.count} queries"')
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing if self.server_timing else send)
+        finally:
+            stop_profile(token)
+            self._report(scope, profile)
+
+    def _report(self, scope: Scope, profile: QueryProfile) -> None:
+        repeated = profile.repeated(self.n_plus_one_threshold)
+        db_ms = profile.total * 1000
+        if db_ms < self.slow_ms and profile.count < self.max_queries and not repeated:
+            return
+        lines = [f"{scope['method']} {scope['path']}: {profile.count} queries, {db_ms:.1f} ms in DB"]
+        for statement, n in repeated:
+            lines.append(f"  possible N+1, {n}x: {_short(statement)}")
+        for elapsed, statement in profile.slowest:
+            lines.append(f"  {elapsed * 1000:8.1f} ms  {_short(statement)}")
+        logger.warning("\n".join(lines))
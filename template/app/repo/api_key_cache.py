@@ -0,0 +1,119 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.redis import get_async_redis
+from app.repo.models import ApiKey
+from app.utils.cache import TTLCache
+
+
+@dataclass(frozen=True)
+class CachedApiKey:
+    id: int
+    scopes: Optional[str]
+    expires_at: Optional[datetime]
+
+    def is_expired(self, now: Optional[datetime] = None) -> bool:
+        if self.expires_at is None:
+            return False
+        return self.expires_at <= (now or datetime.now(timezone.utc))
+
+
+class ApiKeyCache:
+    """Verified API keys keyed by token hash.
+
+    Only positive lookups are cached. Entries live until the earlier of the cache
+    TTL and the key's own ``expires_at``, and are dropped on every worker when a
+    key is revoked (Redis pub/sub). The cache is only consulted while the
+    invalidation listener is subscribed, so a worker that cannot hear
+    revocations falls back to the database instead of serving stale keys.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, channel: str) -> None:
+        self._cache: TTLCache[CachedApiKey] = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.channel = channel
+        self.listening = False
+        # bumped on every invalidation so a lookup that raced a revoke is not cached
+        self.generation = 0
+
+    def get(self, key_hash: str) -> Optional[CachedApiKey]:
+        if not self.listening:
+            return None
+        cached = self._cache.get(key_hash)
+        if cached is not None and cached.is_expired():
+            self._cache.pop(key_hash)
+            return None
+        return cached
+
+    def put(self, key_hash: str, entity: ApiKey, generation: Optional[int] = None) -> CachedApiKey:
+        expires_at = entity.expires_at
+        if expires_at is not None and expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        cached = CachedApiKey(id=int(entity.id), scopes=entity.scopes, expires_at=expires_at)
+        if self.listening and (generation is None or generation == self.generation):
+            ttl = None
+            if expires_at is not None:
+                ttl = (expires_at - datetime.now(timezone.utc)).total_seconds()
+            self._cache.set(key_hash, cached, ttl=ttl)
+        return cached
+
+    def invalidate(self, key_hash: str) -> None:
+        self.generation += 1
+        self._cache.pop(key_hash)
+
+    async def publish_invalidation(self, key_hash: str) -> None:
+        await self.publish_invalidations([key_hash])
+
+    async def publish_invalidations(self, key_hashes: Iterable[str]) -> None:
+        key_hashes = list(key_hashes)
+        for key_hash in key_hashes:
+            self.invalidate(key_hash)
+        if not key_hashes:
+            return
+        try:
+            async with get_async_redis().pipeline(transaction=False) as pipe:
+                for key_hash in key_hashes:
+                    pipe.publish(self.channel, key_hash)
+                await pipe.execute()
+        except Exception as exc:
+            logger.error(f"Failed to publish API key invalidation: {exc}")
+
+    async def listen(self, retry_delay: float = 1.0) -> None:
+        while True:
+            pubsub = get_async_redis().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                # invalidations may have been missed while disconnected
+                self._cache.clear()
+                self.listening = True
+                while True:
+                    # a read timeout of its own: the shared client's socket_timeout would end a quiet listen()
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None and message["type"] == "message":
+                        self.invalidate(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning(f"API key invalidation listener disconnected: {exc}")
+            finally:
+                self.listening = False
+                self._cache.clear()
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(retry_delay)
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "listening": self.listening}
+
+
+api_key_cache = ApiKeyCache(
+    maxsize=settings.api_key_cache_size,
+    ttl=settings.api_key_cache_ttl_seconds,
+    channel=settings.api_key_invalidation_channel,
+)
@@ -0,0 +1,212 @@
+import asyncio
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterator, Optional, Sequence
+
+from loguru import logger
+from sqlalchemy import func, or_, select
+
+from app.core.config import settings
+from app.core.redis import get_async_redis, get_redis, scripts
+from app.repo.models import ApiKey
+from app.repo.routing import use_primary
+from app.repo.session import AsyncSessionLocal
+from app.utils.bloom import BloomFilter
+
+
+# Redis server time in ms: the one clock writers and every worker agree on
+_NOW = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+"""
+
+# KEYS: leases; ARGV: token, lease ms
+_BEGIN_SCRIPT = scripts.register("api_key_write_begin", _NOW + """
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[1])
+return now
+""")
+
+# KEYS: leases, last write; ARGV: token
+_END_SCRIPT = scripts.register("api_key_write_end", _NOW + """
+redis.call('ZREM', KEYS[1], ARGV[1])
+if now > tonumber(redis.call('GET', KEYS[2]) or '0') then
+    redis.call('SET', KEYS[2], now)
+end
+return now
+""")
+
+# KEYS: leases, last write; returns {now, last write, writes in flight}
+_STATE_SCRIPT = scripts.register("api_key_write_state", _NOW + """
+local last = tonumber(redis.call('GET', KEYS[2]) or '0')
+-- a lease that ran out belongs to a writer that died or lost Redis: count it as written then
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'WITHSCORES')
+if #expired > 0 then
+    for i = 2, #expired, 2 do
+        last = math.max(last, tonumber(expired[i]))
+    end
+    redis.call('SET', KEYS[2], last)
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+end
+return {now, last, redis.call('ZCARD', KEYS[1])}
+""")
+
+
+class ApiKeyFilter:
+    """Bloom filter over the hashes of usable API keys, so unknown tokens are refused without a query.
+
+    Each worker builds the filter from the primary at startup and every
+    ``rebuild_interval``. A miss is only trusted if no key was written since the
+    build began: writes that can make a key usable hold a lease in Redis until
+    they commit (``writing()``; ``ApiKeyRepository`` takes it for every write but
+    usage counts), then record the Redis time and announce themselves, and
+    workers rebuild shortly after. On a miss the worker asks Redis (one script
+    call, never MySQL) whether that happened; if it did, or Redis does not
+    answer, the token takes the usual lookup. Writes that bypass the
+    repositories (raw SQL, other services) must run inside ``writing()`` too.
+
+    Revoked or expired keys stay "maybe present" until the next rebuild, which
+    is safe: the cache / database check still rejects them.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, channel: str, write_lease: float, enabled: bool = True) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.channel = channel
+        self.write_lease = write_lease
+        self.enabled = enabled
+        self.ready = False
+        self.rejected = 0
+        # misses that went to the database because a key write could be missing from the filter
+        self.unverified = 0
+        self._filter: Optional[BloomFilter] = None
+        # Redis time (ms) at which the current filter's table read began
+        self._built_at = 0
+        self._stale = asyncio.Event()
+        self._keys: Sequence[str] = (f"{channel}:leases", f"{channel}:written_at")
+
+    async def might_exist(self, key_hash: str) -> bool:
+        bloom = self._filter
+        if not self.ready or bloom is None:
+            return True
+        if key_hash in bloom:
+            return True
+        try:
+            _, written_at, in_flight = await scripts.run_async(_STATE_SCRIPT, keys=self._keys)
+        except Exception as exc:
+            logger.warning(f"API key filter cannot confirm it is current, checking the database: {exc}")
+            self.unverified += 1
+            return True
+        if in_flight or written_at >= self._built_at:
+            self.unverified += 1
+            if not in_flight:
+                # the announcement may have been lost; a write still in flight announces itself
+                self._stale.set()
+            return True
+        self.rejected += 1
+        return False
+
+    @contextmanager
+    def writing(self) -> Iterator[None]:
+        """Hold a write lease around a write (and its commit) that can make a key usable.
+
+        Raises when Redis cannot grant it: workers could otherwise refuse the new key.
+        """
+        if not self.enabled:
+            yield
+            return
+        token = uuid.uuid4().hex
+        scripts.run(_BEGIN_SCRIPT, keys=self._keys[:1], args=[token, int(self.write_lease * 1000)])
+        try:
+            yield
+        finally:
+            try:
+                scripts.run(_END_SCRIPT, keys=self._keys, args=[token])
+                get_redis().publish(self.channel, token)
+            except Exception as exc:
+                logger.error(f"Failed to announce an API key write; filters distrust misses until its lease ends: {exc}")
+
+    @asynccontextmanager
+    async def writing_async(self) -> AsyncIterator[None]:
+        if not self.enabled:
+            yield
+            return
+        token = uuid.uuid4().hex
+        await scripts.run_async(_BEGIN_SCRIPT, keys=self._keys[:1], args=[token, int(self.write_lease * 1000)])
+        try:
+            yield
+        finally:
+            try:
+                await scripts.run_async(_END_SCRIPT, keys=self._keys, args=[token])
+                await get_async_redis().publish(self.channel, token)
+            except Exception as exc:
+                logger.error(f"Failed to announce an API key write; filters distrust misses until its lease ends: {exc}")
+
+    async def rebuild(self, batch_size: int = 10000) -> int:
+        self._stale.clear()
+        built_at, _, _ = await scripts.run_async(_STATE_SCRIPT, keys=self._keys)
+        now = datetime.now(timezone.utc)
+        usable = (ApiKey.is_active.is_(True), or_(ApiKey.expires_at.is_(None), ApiKey.expires_at > now))
+        async with AsyncSessionLocal() as db:
+            # a lagging replica could miss keys created moments ago
+            use_primary(db)
+            total = await db.scalar(select(func.count()).select_from(ApiKey).where(*usable))
+            # headroom for keys created before the next rebuild
+            bloom = BloomFilter(max(self.capacity, 2 * (total or 0)), self.error_rate)
+            stmt = select(ApiKey.key_hash).where(*usable).execution_options(yield_per=batch_size)
+            async for key_hash in await db.stream_scalars(stmt):
+                bloom.add(key_hash)
+        self._filter = bloom
+        self._built_at = built_at
+        return len(bloom)
+
+    async def run(self, rebuild_interval: float, refresh_delay: float = 1.0, retry_delay: float = 1.0) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            pubsub = get_async_redis().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                await self.rebuild()
+                self.ready = True
+                rebuild_at = loop.time() + rebuild_interval
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=max(0.0, min(rebuild_at - loop.time(), refresh_delay)))
+                    if (message is not None and message["type"] == "message") or self._stale.is_set():
+                        # a key was written: rebuild soon, once for a burst of writes
+                        rebuild_at = min(rebuild_at, loop.time() + refresh_delay)
+                        self._stale.clear()
+                    if loop.time() >= rebuild_at:
+                        await self.rebuild()
+                        rebuild_at = loop.time() + rebuild_interval
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning(f"API key filter unavailable, checking every key against the database: {exc}")
+            finally:
+                self.ready = False
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(retry_delay)
+
+    def stats(self) -> dict:
+        bloom = self._filter
+        return {
+            "ready": self.ready,
+            "keys": len(bloom) if bloom is not None else 0,
+            "capacity": bloom.capacity if bloom is not None else self.capacity,
+            "size_bytes": bloom.size_bytes if bloom is not None else 0,
+            "expected_error_rate": bloom.expected_error_rate() if bloom is not None else 0.0,
+            "rejected": self.rejected,
+            "unverified": self.unverified,
+        }
+
+
+api_key_filter = ApiKeyFilter(
+    capacity=settings.api_key_filter_capacity,
+    error_rate=settings.api_key_filter_error_rate,
+    channel=settings.api_key_filter_channel,
+    write_lease=settings.api_key_filter_write_lease_seconds,
+    enabled=settings.api_key_filter_enabled,
+)
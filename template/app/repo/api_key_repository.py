@@ -1,63 +1,194 @@
 from datetime import datetime, timezone, timedelta
 import hashlib
 import hmac
-from typing import Optional
+from typing import Any, List, Mapping, Optional, Sequence, cast
 
+from sqlalchemy import Table, bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.repo.api_key_filter import api_key_filter
+from app.repo.async_base import AsyncRepository
 from app.repo.base import Repository
 from app.repo.models import ApiKey
 
 
-def _hash_api_token(token: str) -> str:
+def hash_api_token(token: str) -> str:
     data: str = settings.api_key_salt + token
     return hashlib.sha256(data.encode("utf-8")).hexdigest()
 
 
+def _new_key_fields(name: str, token_plain: str, scopes: Optional[str], validity_days: Optional[int]) -> dict:
+    expires_at = datetime.now(timezone.utc) + timedelta(days=validity_days)
+    return dict(
+        name=name,
+        key_hash=hash_api_token(token_plain),
+        scopes=scopes,
+        usage_count=0,
+        is_active=True,
+        created_at=datetime.now(timezone.utc),
+        expires_at=expires_at
+    )
+
+
+def _usage_params(counts: Mapping[int, int]) -> List[dict]:
+    return [{"b_id": int(k), "b_n": int(n)} for k, n in counts.items() if n]
+
+
+# Core table, not the entity: an ORM update() with a parameter list would be a bulk update by primary key
+_api_keys = cast(Table, ApiKey.__table__)
+_ADD_USAGE_STMT = (
+    update(_api_keys)
+    .where(_api_keys.c.id == bindparam("b_id"))
+    .values(usage_count=_api_keys.c.usage_count + bindparam("b_n"))
+)
+
+
+def _active_hashes_stmt(ids: Sequence[int]):
+    return select(ApiKey.key_hash).where(ApiKey.id.in_(ids), ApiKey.is_active.is_(True))
+
+
+def _usable(entity: Optional[ApiKey]) -> Optional[ApiKey]:
+    if not entity:
+        return None
+    if not entity.is_active:
+        return None
+    if entity.expires_at is not None:
+        now_utc = datetime.now(timezone.utc)
+        expires_at = entity.expires_at
+        if expires_at.tzinfo is None:
+            # assume stored as UTC-naive; normalize to UTC-aware for safe comparison
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        if expires_at <= now_utc:
+            return None
+    return entity
+
+
 class ApiKeyRepository(Repository[ApiKey]):
+    """Writes that can make a key usable hold ``api_key_filter``'s write lease until they commit."""
+
     def __init__(self, db: Session) -> None:
         super().__init__(db, ApiKey)
 
+    def create(self, **fields: Any) -> ApiKey:
+        with api_key_filter.writing():
+            return super().create(**fields)
+
+    def update(self, entity: ApiKey) -> ApiKey:
+        with api_key_filter.writing():
+            return super().update(entity)
+
+    def create_many(self, rows: Sequence[Mapping[str, Any]], chunk_size: Optional[int] = None) -> int:
+        with api_key_filter.writing():
+            return super().create_many(rows, chunk_size)
+
+    def update_where(self, values: Mapping[str, Any], *where_clauses: Any) -> int:
+        with api_key_filter.writing():
+            return super().update_where(values, *where_clauses)
+
+    def upsert_many(
+        self,
+        rows: Sequence[Mapping[str, Any]],
+        update_fields: Optional[Sequence[str]] = None,
+        index_elements: Optional[Sequence[str]] = None,
+        chunk_size: Optional[int] = None,
+    ) -> int:
+        with api_key_filter.writing():
+            return super().upsert_many(rows, update_fields, index_elements, chunk_size)
+
     def find_by_hash(self, key_hash: str) -> Optional[ApiKey]:
         return super().find_one_by(key_hash=key_hash)
 
     def create_with_plain(self, name: str, token_plain: str, scopes: Optional[str] = None, validity_days: Optional[int] = 30) -> ApiKey:
-        key_hash: str = _hash_api_token(token_plain)
-        expires_at = datetime.now(timezone.utc) + timedelta(days=validity_days)
-        return super().create(
-            name=name,
-            key_hash=key_hash,
-            scopes=scopes,
-            usage_count=0,
-            is_active=True,
-            created_at=datetime.now(timezone.utc),
-            expires_at=expires_at
-        )
+        return self.create(**_new_key_fields(name, token_plain, scopes, validity_days))
 
     def increment_usage(self, api_key_id: int) -> None:
-        entity = self.find_by_id(api_key_id)
-        if not entity:
-            return
-        entity.usage_count += 1
-        self.db.add(entity)
-        self.db.commit()
+        self.add_usage_counts({api_key_id: 1})
+
+    def add_usage_counts(self, counts: Mapping[int, int]) -> int:
+        """Apply ``usage_count = usage_count + n`` for many keys in one executemany batch."""
+        params = _usage_params(counts)
+        if not params:
+            return 0
+        result = self.db.execute(_ADD_USAGE_STMT, params)
+        self._commit()
+        return result.rowcount
 
     def verify_plain(self, token_plain: str) -> Optional[ApiKey]:
-        key_hash: str = _hash_api_token(token_plain)
-        entity = self.find_by_hash(key_hash)
-        if not entity:
-            return None
-        if not entity.is_active:
-            return None
-        if entity.expires_at is not None:
-            now_utc = datetime.now(timezone.utc)
-            expires_at = entity.expires_at
-            if expires_at.tzinfo is None:
-                # assume stored as UTC-naive; normalize to UTC-aware for safe comparison
-                expires_at = expires_at.replace(tzinfo=timezone.utc)
-            if expires_at <= now_utc:
-                return None
-        return entity
+        return self.verify_hash(hash_api_token(token_plain))
+
+    def verify_hash(self, key_hash: str) -> Optional[ApiKey]:
+        return _usable(self.find_by_hash(key_hash))
+
+    def revoke_many(self, ids: Sequence[int]) -> List[str]:
+        """Deactivate keys with one UPDATE; returns the hashes of keys that were active (for cache invalidation)."""
+        if not ids:
+            return []
+        hashes = list(self.db.execute(_active_hashes_stmt(ids)).scalars().all())
+        if hashes:
+            # deactivating cannot make a key usable: no lease
+            super().update_where({"is_active": False}, ApiKey.id.in_(ids))
+        return hashes
+
+
+class AsyncApiKeyRepository(AsyncRepository[ApiKey]):
+    def __init__(self, db: AsyncSession) -> None:
+        super().__init__(db, ApiKey)
+
+    async def create(self, **fields: Any) -> ApiKey:
+        async with api_key_filter.writing_async():
+            return await super().create(**fields)
+
+    async def update(self, entity: ApiKey) -> ApiKey:
+        async with api_key_filter.writing_async():
+            return await super().update(entity)
+
+    async def create_many(self, rows: Sequence[Mapping[str, Any]], chunk_size: Optional[int] = None) -> int:
+        async with api_key_filter.writing_async():
+            return await super().create_many(rows, chunk_size)
+
+    async def update_where(self, values: Mapping[str, Any], *where_clauses: Any) -> int:
+        async with api_key_filter.writing_async():
+            return await super().update_where(values, *where_clauses)
+
+    async def upsert_many(
+        self,
+        rows: Sequence[Mapping[str, Any]],
+        update_fields: Optional[Sequence[str]] = None,
+        index_elements: Optional[Sequence[str]] = None,
+        chunk_size: Optional[int] = None,
+    ) -> int:
+        async with api_key_filter.writing_async():
+            return await super().upsert_many(rows, update_fields, index_elements, chunk_size)
+
+    async def find_by_hash(self, key_hash: str) -> Optional[ApiKey]:
+        return await super().find_one_by(key_hash=key_hash)
+
+    async def create_with_plain(self, name: str, token_plain: str, scopes: Optional[str] = None, validity_days: Optional[int] = 30) -> ApiKey:
+        return await self.create(**_new_key_fields(name, token_plain, scopes, validity_days))
+
+    async def increment_usage(self, api_key_id: int) -> None:
+        await self.add_usage_counts({api_key_id: 1})
+
+    async def add_usage_counts(self, counts: Mapping[int, int]) -> int:
+        params = _usage_params(counts)
+        if not params:
+            return 0
+        result = await self.db.execute(_ADD_USAGE_STMT, params)
+        await self._commit()
+        return result.rowcount
+
+    async def verify_plain(self, token_plain: str) -> Optional[ApiKey]:
+        return await self.verify_hash(hash_api_token(token_plain))
 
+    async def verify_hash(self, key_hash: str) -> Optional[ApiKey]:
+        return _usable(await self.find_by_hash(key_hash))
 
+    async def revoke_many(self, ids: Sequence[int]) -> List[str]:
+        if not ids:
+            return []
+        hashes = list((await self.db.execute(_active_hashes_stmt(ids))).scalars().all())
+        if hashes:
+            await super().update_where({"is_active": False}, ApiKey.id.in_(ids))
+        return hashes
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Dict
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.redis import get_async_redis
+
+
+class UsageBuffer:
+    """Write-behind API key usage counter.
+
+    Requests only bump an in-process dict; a background loop moves the totals
+    into a Redis hash with HINCRBY, and the ``api_keys.flush_usage`` Celery task
+    applies them to MySQL in bulk.
+    """
+
+    def __init__(self, redis_key: str) -> None:
+        self.redis_key = redis_key
+        self._counts: Dict[int, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def incr(self, api_key_id: int, n: int = 1) -> None:
+        with self._lock:
+            self._counts[api_key_id] += n
+
+    def _take(self) -> Dict[int, int]:
+        with self._lock:
+            counts, self._counts = self._counts, defaultdict(int)
+        return counts
+
+    def _restore(self, counts: Dict[int, int]) -> None:
+        with self._lock:
+            for api_key_id, n in counts.items():
+                self._counts[api_key_id] += n
+
+    async def flush(self) -> int:
+        counts = self._take()
+        if not counts:
+            return 0
+        try:
+            async with get_async_redis().pipeline(transaction=True) as pipe:
+                for api_key_id, n in counts.items():
+                    pipe.hincrby(self.redis_key, str(api_key_id), n)
+                await pipe.execute()
+        except Exception:
+            self._restore(counts)
+            raise
+        return len(counts)
+
+    async def run(self, interval: float) -> None:
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self.flush()
+                except Exception as exc:
+                    logger.warning(f"Failed to push API key usage to Redis: {exc}")
+        finally:
+            # drain on shutdown; counts are kept in memory if Redis is unreachable
+            try:
+                await self.flush()
+            except Exception as exc:
+                logger.error(f"Dropping buffered API key usage on shutdown: {exc}")
+
+
+usage_buffer = UsageBuffer(settings.api_key_usage_redis_key)
@@ -0,0 +1,144 @@
+from typing import AsyncIterator, Generic, Mapping, Optional, Sequence, Type, TypeVar, Any, List
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, insert, update
+
+from app.repo.bulk import DEFAULT_CHUNK_SIZE, chunked, require_where, upsert_statement
+from app.repo.pagination import KeysetPage, build_page, keyset_select
+from app.repo.statements import (
+    exists_where_statement,
+    filter_by_statement,
+    find_where_statement,
+    list_statement,
+    list_where_statement,
+    max_of_statement,
+    page_params,
+    stream_statement,
+)
+from app.repo.unit_of_work import active_unit_of_work
+
+
+T = TypeVar('T')
+
+
+class AsyncRepository(Generic[T]):
+    bulk_chunk_size: int = DEFAULT_CHUNK_SIZE
+
+    def __init__(self, db: AsyncSession, model: Type[T]) -> None:
+        self.db = db
+        self.model = model
+
+    async def _commit(self) -> None:
+        # inside a UnitOfWork the scope owns the transaction; just send the SQL
+        if active_unit_of_work(self.db) is None:
+            await self.db.commit()
+        else:
+            await self.db.flush()
+
+    async def _refresh(self, entity: T) -> None:
+        uow = active_unit_of_work(self.db)
+        if uow is None or uow.refresh:
+            await self.db.refresh(entity)
+
+    async def refresh(self, entity: T) -> T:
+        await self.db.refresh(entity)
+        return entity
+
+    async def find_by_id(self, entity_id: Any) -> Optional[T]:
+        return await self.db.get(self.model, entity_id)
+
+    async def find_one_by(self, **filters: Any) -> Optional[T]:
+        stmt, params = filter_by_statement(self.model, filters)
+        return (await self.db.execute(stmt, params)).scalar_one_or_none()
+
+    async def list(self, offset: int = 0, limit: int = 100, order_by: Optional[Any] = None, descending: bool = False) -> List[T]:
+        stmt = list_statement(self.model, order_by, descending)
+        return list((await self.db.execute(stmt, page_params(offset, limit))).scalars().all())
+
+    async def list_keyset(self, *where_clauses: Any, order_by: Optional[Any] = None, descending: bool = False, limit: int = 100, cursor: Optional[str] = None) -> KeysetPage[T]:
+        stmt, keys = keyset_select(self.model, where_clauses, order_by=order_by, descending=descending, limit=limit, cursor=cursor)
+        return build_page(list((await self.db.execute(stmt)).scalars().all()), keys, limit)
+
+    async def create(self, **fields: Any) -> T:
+        entity = self.model(**fields)
+        self.db.add(entity)
+        await self._commit()
+        await self._refresh(entity)
+        return entity
+
+    async def update(self, entity: T) -> T:
+        self.db.add(entity)
+        await self._commit()
+        await self._refresh(entity)
+        return entity
+
+    async def find_one_where(self, *where_clauses: Any) -> Optional[T]:
+        stmt, params = find_where_statement(self.model, where_clauses)
+        return (await self.db.execute(stmt, params)).scalar_one_or_none()
+
+    async def list_where(self, *where_clauses: Any, offset: int = 0, limit: Optional[int] = None) -> List[T]:
+        stmt, params = list_where_statement(self.model, where_clauses, offset, limit)
+        return list((await self.db.execute(stmt, params)).scalars().all())
+
+    async def exists_where(self, *where_clauses: Any) -> bool:
+        stmt, params = exists_where_statement(self.model, where_clauses)
+        return (await self.db.execute(stmt, params)).scalar_one_or_none() is not None
+
+    async def find_max_of(self, column: Any, *where_clauses: Any) -> Optional[T]:
+        stmt, params = max_of_statement(self.model, column, where_clauses)
+        return (await self.db.execute(stmt, params)).scalar_one_or_none()
+
+    async def stream(self, *where_clauses: Any, order_by: Optional[Any] = None, descending: bool = False, batch_size: int = 1000) -> AsyncIterator[T]:
+        stmt, params = stream_statement(self.model, where_clauses, order_by, descending)
+        result = await self.db.stream_scalars(stmt.execution_options(yield_per=batch_size), params)
+        async for entity in result:
+            yield entity
+
+    async def delete(self, entity: T) -> None:
+        await self.db.delete(entity)
+        await self._commit()
+
+    async def delete_by_id(self, entity_id: Any) -> bool:
+        entity = await self.find_by_id(entity_id)
+        if entity is None:
+            return False
+        await self.db.delete(entity)
+        await self._commit()
+        return True
+
+    async def create_many(self, rows: Sequence[Mapping[str, Any]], chunk_size: Optional[int] = None) -> int:
+        total = 0
+        for chunk in chunked(rows, chunk_size or self.bulk_chunk_size):
+            await self.db.execute(insert(self.model), chunk)
+            total += len(chunk)
+        await self._commit()
+        return total
+
+    async def update_where(self, values: Mapping[str, Any], *where_clauses: Any) -> int:
+        require_where(where_clauses, "update_where")
+        stmt = update(self.model).where(*where_clauses).values(**values).execution_options(synchronize_session=False)
+        result = await self.db.execute(stmt)
+        await self._commit()
+        return result.rowcount
+
+    async def upsert_many(
+        self,
+        rows: Sequence[Mapping[str, Any]],
+        update_fields: Optional[Sequence[str]] = None,
+        index_elements: Optional[Sequence[str]] = None,
+        chunk_size: Optional[int] = None,
+    ) -> int:
+        if not rows:
+            return 0
+        stmt = upsert_statement(self.model, self.db.get_bind().dialect.name, list(rows[0].keys()), update_fields, index_elements)
+        total = 0
+        for chunk in chunked(rows, chunk_size or self.bulk_chunk_size):
+            total += (await self.db.execute(stmt, chunk)).rowcount
+        await self._commit()
+        return total
+
+    async def delete_where(self, *where_clauses: Any) -> int:
+        require_where(where_clauses, "delete_where")
+        stmt = delete(self.model).where(*where_clauses).execution_options(synchronize_session=False)
+        result = await self.db.execute(stmt)
+        await self._commit()
+        return result.rowcount
@@ -1,79 +1,212 @@
-from typing import Generic, Optional, Type, TypeVar, Any, List
-from sqlalchemy.orm import Session
-from sqlalchemy import select
+from typing import Callable, Generic, Iterator, Mapping, Optional, Sequence, Type, TypeVar, Any, List
+from sqlalchemy.orm import Session, class_mapper
+from sqlalchemy.orm.attributes import instance_state
+from sqlalchemy import delete, event, insert, update
+
+from app.repo.bulk import DEFAULT_CHUNK_SIZE, chunked, require_where, upsert_statement
+from app.repo.entity_cache import (
+    MISSING, EntityCache, entity_tag, entity_to_row, filter_key, id_key, model_tag, query_tag, row_to_entity,
+)
+from app.repo.pagination import KeysetPage, build_page, keyset_select
+from app.repo.statements import (
+    exists_where_statement,
+    filter_by_statement,
+    find_where_statement,
+    list_statement,
+    list_where_statement,
+    max_of_statement,
+    page_params,
+    stream_statement,
+)
+from app.repo.unit_of_work import active_unit_of_work
 
 
 T = TypeVar('T')
 
 
 class Repository(Generic[T]):
-    def __init__(self, db: Session, model: Type[T]) -> None:
+    bulk_chunk_size: int = DEFAULT_CHUNK_SIZE
+
+    def __init__(self, db: Session, model: Type[T], cache: Optional[EntityCache] = None) -> None:
         self.db = db
         self.model = model
+        self.cache = cache
+
+    def _commit(self) -> None:
+        # inside a UnitOfWork the scope owns the transaction; just send the SQL
+        if active_unit_of_work(self.db) is None:
+            self.db.commit()
+        else:
+            self.db.flush()
+
+    def _refresh(self, entity: T) -> None:
+        uow = active_unit_of_work(self.db)
+        if uow is None or uow.refresh:
+            self.db.refresh(entity)
+
+    def refresh(self, entity: T) -> T:
+        self.db.refresh(entity)
+        return entity
+
+    def _entity_id(self, entity: T) -> Any:
+        identity = instance_state(entity).identity or class_mapper(self.model).primary_key_from_instance(entity)
+        return identity[0] if len(identity) == 1 else tuple(identity)
+
+    def _cached(self, cache: EntityCache, key: str, load: Callable[[], Optional[T]], tags: List[str]) -> Optional[T]:
+        row = cache.get(key)
+        if row is not MISSING:
+            return None if row is None else row_to_entity(self.db, self.model, row)
+        generation = cache.generation
+        # a write committed after this point bumps one of these tags, so the row read below is not stored
+        versions = cache.versions(tags)
+        entity = load()
+        if versions is None:
+            return entity
+        if entity is None:
+            cache.put(self.model, key, None, tags, generation=generation, versions=versions)
+        else:
+            # the entity tag is not guarded: every write of the row also invalidates the query/model tags read above
+            tags = tags + [entity_tag(self.model, self._entity_id(entity))]
+            cache.put(self.model, key, entity_to_row(entity), tags, generation=generation, versions=versions)
+        return entity
+
+    def _invalidate(self, *tags: str) -> None:
+        if self.cache is None:
+            return
+        cache = self.cache
+        cache.invalidate(*tags)
+        if active_unit_of_work(self.db) is not None:
+            # other requests can re-cache the old row until the scope commits
+            event.listen(self.db, "after_commit", lambda session: cache.invalidate(*tags), once=True)
+
+    def _invalidate_entity(self, entity_id: Any) -> None:
+        self._invalidate(entity_tag(self.model, entity_id), query_tag(self.model))
 
     def find_by_id(self, entity_id: Any) -> Optional[T]:
-        return self.db.get(self.model, entity_id)
+        if self.cache is None:
+            return self.db.get(self.model, entity_id)
+        return self._cached(
+            self.cache,
+            id_key(self.model, entity_id),
+            lambda: self.db.get(self.model, entity_id),
+            [model_tag(self.model), entity_tag(self.model, entity_id)],
+        )
 
     def find_one_by(self, **filters: Any) -> Optional[T]:
-        return self.db.execute(select(self.model).filter_by(**filters)).scalar_one_or_none()
+        stmt, params = filter_by_statement(self.model, filters)
+        if self.cache is None:
+            return self.db.execute(stmt, params).scalar_one_or_none()
+        return self._cached(
+            self.cache,
+            filter_key(self.model, filters),
+            lambda: self.db.execute(stmt, params).scalar_one_or_none(),
+            [model_tag(self.model), query_tag(self.model)],
+        )
 
     def list(self, offset: int = 0, limit: int = 100, order_by: Optional[Any] = None, descending: bool = False) -> List[T]:
-        stmt = select(self.model).offset(offset).limit(limit)
-        if order_by is not None:
-            stmt = stmt.order_by(order_by.desc() if descending else order_by.asc())
-        return list(self.db.execute(stmt).scalars().all())
+        stmt = list_statement(self.model, order_by, descending)
+        return list(self.db.execute(stmt, page_params(offset, limit)).scalars().all())
+
+    def list_keyset(self, *where_clauses: Any, order_by: Optional[Any] = None, descending: bool = False, limit: int = 100, cursor: Optional[str] = None) -> KeysetPage[T]:
+        """Cursor pagination: every page seeks past the last-seen sort key (primary key appended as tie-breaker).
+
+        Sort columns must be NOT NULL; nullable ones are rejected with ``ValueError``.
+        """
+        stmt, keys = keyset_select(self.model, where_clauses, order_by=order_by, descending=descending, limit=limit, cursor=cursor)
+        return build_page(list(self.db.execute(stmt).scalars().all()), keys, limit)
 
     def create(self, **fields: Any) -> T:
         entity = self.model(**fields)
         self.db.add(entity)
-        self.db.commit()
-        self.db.refresh(entity)
+        self._commit()
+        self._invalidate_entity(self._entity_id(entity))
+        self._refresh(entity)
         return entity
 
     def update(self, entity: T) -> T:
         self.db.add(entity)
-        self.db.commit()
-        self.db.refresh(entity)
+        self._commit()
+        self._invalidate_entity(self._entity_id(entity))
+        self._refresh(entity)
         return entity
 
     def find_one_where(self, *where_clauses: Any) -> Optional[T]:
-        stmt = select(self.model)
-        for clause in where_clauses:
-            stmt = stmt.where(clause)
-        return self.db.execute(stmt).scalar_one_or_none()
+        stmt, params = find_where_statement(self.model, where_clauses)
+        return self.db.execute(stmt, params).scalar_one_or_none()
 
     def list_where(self, *where_clauses: Any, offset: int = 0, limit: Optional[int] = None) -> List[T]:
-        stmt = select(self.model)
-        for clause in where_clauses:
-            stmt = stmt.where(clause)
-        if limit is not None:
-            stmt = stmt.offset(offset).limit(limit)
-        return list(self.db.execute(stmt).scalars().all())
+        stmt, params = list_where_statement(self.model, where_clauses, offset, limit)
+        return list(self.db.execute(stmt, params).scalars().all())
 
     def exists_where(self, *where_clauses: Any) -> bool:
-        stmt = select(self.model)
-        for clause in where_clauses:
-            stmt = stmt.where(clause)
-        stmt = stmt.limit(1)
-        return self.db.execute(stmt).scalar_one_or_none() is not None
+        stmt, params = exists_where_statement(self.model, where_clauses)
+        return self.db.execute(stmt, params).scalar_one_or_none() is not None
 
     def find_max_of(self, column: Any, *where_clauses: Any) -> Optional[T]:
-        stmt = select(self.model)
-        for clause in where_clauses:
-            stmt = stmt.where(clause)
-        stmt = stmt.order_by(column.desc()).limit(1)
-        return self.db.execute(stmt).scalar_one_or_none()
+        stmt, params = max_of_statement(self.model, column, where_clauses)
+        return self.db.execute(stmt, params).scalar_one_or_none()
+
+    def stream(self, *where_clauses: Any, order_by: Optional[Any] = None, descending: bool = False, batch_size: int = 1000) -> Iterator[T]:
+        """Yield rows through a server-side cursor, ``batch_size`` at a time, without loading them all."""
+        stmt, params = stream_statement(self.model, where_clauses, order_by, descending)
+        yield from self.db.scalars(stmt.execution_options(yield_per=batch_size), params)
 
     def delete(self, entity: T) -> None:
+        entity_id = self._entity_id(entity)
         self.db.delete(entity)
-        self.db.commit()
+        self._commit()
+        self._invalidate_entity(entity_id)
 
     def delete_by_id(self, entity_id: Any) -> bool:
-        entity = self.find_by_id(entity_id)
+        entity = self.db.get(self.model, entity_id)
         if entity is None:
             return False
         self.db.delete(entity)
-        self.db.commit()
+        self._commit()
+        self._invalidate_entity(entity_id)
         return True
 
-
+    def create_many(self, rows: Sequence[Mapping[str, Any]], chunk_size: Optional[int] = None) -> int:
+        """Insert many rows with batched executemany in one transaction; rows are not reloaded."""
+        total = 0
+        for chunk in chunked(rows, chunk_size or self.bulk_chunk_size):
+            self.db.execute(insert(self.model), chunk)
+            total += len(chunk)
+        self._commit()
+        self._invalidate(model_tag(self.model))
+        return total
+
+    def update_where(self, values: Mapping[str, Any], *where_clauses: Any) -> int:
+        """Single ``UPDATE ... WHERE``; returns the affected row count. Loaded entities are not synchronized."""
+        require_where(where_clauses, "update_where")
+        stmt = update(self.model).where(*where_clauses).values(**values).execution_options(synchronize_session=False)
+        result = self.db.execute(stmt)
+        self._commit()
+        self._invalidate(model_tag(self.model))
+        return result.rowcount
+
+    def upsert_many(
+        self,
+        rows: Sequence[Mapping[str, Any]],
+        update_fields: Optional[Sequence[str]] = None,
+        index_elements: Optional[Sequence[str]] = None,
+        chunk_size: Optional[int] = None,
+    ) -> int:
+        """Insert-or-update many rows; returns the driver's affected row count (MySQL counts updates twice)."""
+        if not rows:
+            return 0
+        stmt = upsert_statement(self.model, self.db.get_bind().dialect.name, list(rows[0].keys()), update_fields, index_elements)
+        total = 0
+        for chunk in chunked(rows, chunk_size or self.bulk_chunk_size):
+            total += self.db.execute(stmt, chunk).rowcount
+        self._commit()
+        self._invalidate(model_tag(self.model))
+        return total
+
+    def delete_where(self, *where_clauses: Any) -> int:
+        require_where(where_clauses, "delete_where")
+        stmt = delete(self.model).where(*where_clauses).execution_options(synchronize_session=False)
+        result = self.db.execute(stmt)
+        self._commit()
+        self._invalidate(model_tag(self.model))
+        return result.rowcount
@@ -0,0 +1,56 @@
+from typing import Any, Iterator, List, Mapping, Optional, Sequence, Type, Union
+
+from sqlalchemy import inspect
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.sql import Insert
+
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def chunked(rows: Sequence[Mapping[str, Any]], size: int) -> Iterator[List[Mapping[str, Any]]]:
+    rows = list(rows)
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def upsert_statement(
+    model: Type[Any],
+    dialect_name: str,
+    columns: Sequence[str],
+    update_fields: Optional[Sequence[str]] = None,
+    index_elements: Optional[Sequence[str]] = None,
+) -> Insert:
+    """INSERT that updates ``update_fields`` when a row with the same key already exists.
+
+    MySQL uses ``ON DUPLICATE KEY UPDATE`` (any unique key); SQLite/PostgreSQL use
+    ``ON CONFLICT (index_elements) DO UPDATE``, defaulting to the primary key.
+    """
+    table = model.__table__
+    if index_elements is None:
+        index_elements = [c.name for c in inspect(model).primary_key]
+    if update_fields is None:
+        update_fields = [c for c in columns if c not in index_elements]
+    if dialect_name == "mysql":
+        stmt = mysql.insert(table)
+        if not update_fields:
+            # MySQL has no DO NOTHING: assigning a key column to itself leaves the existing row untouched
+            return stmt.on_duplicate_key_update({f: table.c[f] for f in index_elements[:1]})
+        return stmt.on_duplicate_key_update({f: stmt.inserted[f] for f in update_fields})
+    if dialect_name in ("sqlite", "postgresql"):
+        conflict_stmt: Union[sqlite.Insert, postgresql.Insert] = (
+            sqlite.insert(table) if dialect_name == "sqlite" else postgresql.insert(table)
+        )
+        if not update_fields:
+            return conflict_stmt.on_conflict_do_nothing(index_elements=list(index_elements))
+        return conflict_stmt.on_conflict_do_update(
+            index_elements=list(index_elements),
+            set_={f: conflict_stmt.excluded[f] for f in update_fields},
+        )
+    raise NotImplementedError(f"upsert is not supported for dialect {dialect_name!r}")
+
+
+def require_where(where_clauses: Sequence[Any], operation: str) -> None:
+    # an empty WHERE would touch the whole table; make callers say so explicitly (e.g. sqlalchemy.true())
+    if not where_clauses:
+        raise ValueError(f"{operation} requires at least one where clause")
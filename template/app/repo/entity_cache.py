@@ -0,0 +1,372 @@
+import asyncio
+import json
+import threading
+from typing import Any, Dict, Hashable, Iterable, Mapping, Optional, Set, Tuple, Type, Union, cast
+
+import redis
+from loguru import logger
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import settings
+from app.core.redis import get_async_redis, get_redis, scripts
+from app.repo.pagination import from_json_value, to_json_value
+from app.utils.cache import TTLCache
+
+
+# SMEMBERS + DEL in one step so entries tagged mid-invalidation are not left behind;
+# KEYS = n tag sets then their n version counters; ARGV = channel, message
+# (tells every worker to drop its local copies), version ttl
+_INVALIDATE_SCRIPT = scripts.register("entity_cache_invalidate", """
+local n = #KEYS / 2
+for t = 1, n do
+    local members = redis.call('SMEMBERS', KEYS[t])
+    for i = 1, #members, 500 do
+        redis.call('DEL', unpack(members, i, math.min(i + 499, #members)))
+    end
+    redis.call('DEL', KEYS[t])
+    redis.call('INCR', KEYS[n + t])
+    redis.call('EXPIRE', KEYS[n + t], ARGV[3])
+end
+redis.call('PUBLISH', ARGV[1], ARGV[2])
+return n
+""")
+
+# Store an entry only if no tag it was read under was invalidated since, by any process.
+# KEYS = entry, n version counters, tag sets; ARGV = payload, ttl, tag ttl, n, n expected versions
+_PUT_SCRIPT = scripts.register("entity_cache_put", """
+local n = tonumber(ARGV[4])
+for i = 1, n do
+    if (redis.call('GET', KEYS[1 + i]) or '0') ~= ARGV[4 + i] then
+        return 0
+    end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+for i = n + 2, #KEYS do
+    redis.call('SADD', KEYS[i], KEYS[1])
+    redis.call('EXPIRE', KEYS[i], ARGV[3])
+end
+return 1
+""")
+
+# version counters only have to outlive a database read; a day is plenty
+VERSION_TTL_SECONDS = 86400
+
+MISSING = object()
+
+
+def _table(model: Type[Any]) -> str:
+    return model.__tablename__
+
+
+def model_tag(model: Type[Any]) -> str:
+    """Every cached lookup of ``model``; dropped by bulk writes."""
+    return f"{_table(model)}:*"
+
+
+def query_tag(model: Type[Any]) -> str:
+    """``find_one_by`` lookups of ``model``; any row write may change their answer."""
+    return f"{_table(model)}:by"
+
+
+def entity_tag(model: Type[Any], entity_id: Any) -> str:
+    return f"{_table(model)}:id:{_dumps(entity_id)}"
+
+
+def _dumps(value: Any) -> str:
+    if isinstance(value, (list, tuple)):
+        value = [to_json_value(v) for v in value]
+    elif isinstance(value, dict):
+        value = {k: to_json_value(v) for k, v in sorted(value.items())}
+    else:
+        value = to_json_value(value)
+    return json.dumps(value, separators=(",", ":"), sort_keys=True, default=str)
+
+
+def _text(value: Union[str, bytes]) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def id_key(model: Type[Any], entity_id: Any) -> str:
+    return f"{_table(model)}:id:{_dumps(entity_id)}"
+
+
+def filter_key(model: Type[Any], filters: Mapping[str, Any]) -> str:
+    return f"{_table(model)}:by:{_dumps(dict(filters))}"
+
+
+def entity_to_row(entity: Any) -> Dict[str, Any]:
+    mapper = inspect(type(entity))
+    return {attr.key: getattr(entity, attr.key) for attr in mapper.column_attrs}
+
+
+def row_to_entity(db: Session, model: Type[Any], row: Mapping[str, Any]) -> Any:
+    """Attach a cached row to ``db`` as a persistent instance without a SELECT.
+
+    An instance already in the session's identity map wins, so a request never
+    sees two versions of the same row.
+    """
+    mapper = inspect(model)
+    pk = [row[mapper.get_property_by_column(c).key] for c in mapper.primary_key]
+    existing = db.identity_map.get(mapper.identity_key_from_primary_key(pk))
+    if existing is not None:
+        return existing
+    entity = mapper.class_manager.new_instance()
+    for key, value in row.items():
+        set_committed_value(entity, key, value)
+    make_transient_to_detached(entity)
+    return db.merge(entity, load=False)
+
+
+class EntityCache:
+    """Two-level read-through cache for ``Repository.find_by_id`` / ``find_one_by``.
+
+    Rows are kept as column dicts in a small in-process LRU in front of Redis.
+    Misses are cached too, for ``negative_ttl``. Every entry carries tags;
+    writes through a repository drop the tags they affect from Redis (tag
+    sets) and publish them so every worker drops its local copies. As with
+    ``ApiKeyCache``, the local level is only used while the invalidation
+    listener is subscribed. Every invalidation also bumps a per-tag version
+    in Redis; a lookup reads the versions of its tags before the database
+    (``versions``) and is only stored if they are unchanged, so a row read
+    while any process was invalidating it is not cached. Redis errors
+    degrade to database reads.
+    """
+
+    def __init__(
+        self,
+        client: Optional[redis.Redis] = None,
+        *,
+        prefix: str = "entity",
+        ttl: float = 300.0,
+        negative_ttl: float = 30.0,
+        model_ttls: Optional[Mapping[str, float]] = None,
+        local_size: int = 1024,
+        local_ttl: float = 5.0,
+    ) -> None:
+        self._client = client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.model_ttls = dict(model_ttls or {})
+        self._local: TTLCache[Tuple[Any, ...]] = TTLCache(maxsize=local_size, ttl=local_ttl)
+        self._local_tags: Dict[str, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self.channel = f"{prefix}:invalidate"
+        self.listening = False
+        self.generation = 0
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    @property
+    def client(self) -> redis.Redis:
+        return self._client if self._client is not None else get_redis()
+
+    def ttl_for(self, model: Type[Any]) -> float:
+        return self.model_ttls.get(_table(model), self.ttl)
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}:tag:{tag}"
+
+    def _version_key(self, tag: str) -> str:
+        return f"{self.prefix}:ver:{tag}"
+
+    def get(self, key: str) -> Any:
+        """The cached row dict, ``None`` for a cached miss, or ``MISSING``."""
+        local = self._local.get(key) if self.listening else None
+        if local is not None:
+            self.local_hits += 1
+            return self._count_negative(local[0])
+        try:
+            raw = self.client.get(self._redis_key(key))
+        except redis.RedisError as exc:
+            self.errors += 1
+            logger.warning(f"Entity cache read failed, using the database: {exc}")
+            return MISSING
+        if raw is None:
+            self.misses += 1
+            return MISSING
+        self.redis_hits += 1
+        payload = json.loads(cast(Union[str, bytes], raw))
+        row = payload["r"]
+        if row is not None:
+            row = {k: from_json_value(v) for k, v in row.items()}
+        self._set_local(key, row, self._local.ttl, tuple(payload["t"]))
+        return self._count_negative(row)
+
+    def _count_negative(self, row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            self.negative_hits += 1
+        return row
+
+    def versions(self, tags: Iterable[str]) -> Optional[Dict[str, str]]:
+        """The current version of each tag, to pass to ``put`` after the database read; ``None`` if Redis failed."""
+        tags = list(tags)
+        try:
+            values = self.client.mget([self._version_key(t) for t in tags])
+        except redis.RedisError as exc:
+            self.errors += 1
+            logger.warning(f"Entity cache version read failed: {exc}")
+            return None
+        return {tag: "0" if value is None else _text(value) for tag, value in zip(tags, cast(list, values))}
+
+    def put(
+        self,
+        model: Type[Any],
+        key: str,
+        row: Optional[Mapping[str, Any]],
+        tags: Iterable[str],
+        generation: Optional[int] = None,
+        versions: Optional[Mapping[str, str]] = None,
+    ) -> bool:
+        """Store a looked-up row (``None`` for a miss); ``False`` if it was not stored.
+
+        With ``versions`` (from ``versions()`` before the read) the entry is
+        skipped when any of those tags was invalidated since; ``generation``
+        does the same for this process's invalidations, without Redis.
+        """
+        if generation is not None and generation != self.generation:
+            return False
+        tags = tuple(tags)
+        versions = dict(versions or {})
+        model_ttl = self.ttl_for(model)
+        ttl = model_ttl if row is not None else min(self.negative_ttl, model_ttl)
+        if ttl <= 0:
+            return False
+        payload = {
+            "r": None if row is None else {k: to_json_value(v) for k, v in row.items()},
+            "t": tags,
+        }
+        try:
+            stored = scripts.run(
+                _PUT_SCRIPT,
+                keys=[
+                    self._redis_key(key),
+                    *(self._version_key(t) for t in versions),
+                    *(self._tag_key(t) for t in tags),
+                ],
+                args=[
+                    json.dumps(payload, separators=(",", ":")),
+                    max(1, int(ttl)),
+                    # tag sets outlive every entry they point at
+                    max(1, int(model_ttl)),
+                    len(versions),
+                    *versions.values(),
+                ],
+                client=self.client,
+            )
+        except redis.RedisError as exc:
+            self.errors += 1
+            logger.warning(f"Entity cache write failed: {exc}")
+            return False
+        if not stored:
+            return False
+        self._set_local(key, None if row is None else dict(row), ttl, tags)
+        return True
+
+    def _set_local(self, key: str, row: Optional[Dict[str, Any]], ttl: float, tags: Tuple[str, ...]) -> None:
+        if not self.listening:
+            return
+        self._local.set(key, (row,), ttl=ttl)
+        with self._lock:
+            for tag in tags:
+                self._local_tags.setdefault(tag, set()).add(key)
+            if len(self._local_tags) > 4 * self._local.maxsize:
+                self._prune_local_tags()
+
+    def _prune_local_tags(self) -> None:
+        live = set(self._local.keys())
+        for tag in list(self._local_tags):
+            keys = self._local_tags[tag] & live
+            if keys:
+                self._local_tags[tag] = keys
+            else:
+                del self._local_tags[tag]
+
+    def invalidate(self, *tags: str) -> None:
+        if not tags:
+            return
+        self.invalidations += 1
+        self._drop_local(tags)
+        try:
+            scripts.run(
+                _INVALIDATE_SCRIPT,
+                keys=[self._tag_key(t) for t in tags] + [self._version_key(t) for t in tags],
+                args=[self.channel, json.dumps(tags), VERSION_TTL_SECONDS],
+                client=self.client,
+            )
+        except redis.RedisError as exc:
+            self.errors += 1
+            logger.error(f"Entity cache invalidation of {tags} failed; entries expire by TTL: {exc}")
+
+    def _drop_local(self, tags: Iterable[str]) -> None:
+        self.generation += 1
+        with self._lock:
+            for tag in tags:
+                for key in self._local_tags.pop(tag, ()):
+                    self._local.pop(key)
+
+    def clear_local(self) -> None:
+        self._local.clear()
+        with self._lock:
+            self._local_tags.clear()
+
+    async def listen(self, retry_delay: float = 1.0) -> None:
+        while True:
+            pubsub = get_async_redis().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                # invalidations may have been missed while disconnected
+                self.clear_local()
+                self.listening = True
+                while True:
+                    # a read timeout of its own: the shared client's socket_timeout would end a quiet listen()
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None and message["type"] == "message":
+                        self._drop_local(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning(f"Entity cache invalidation listener disconnected: {exc}")
+            finally:
+                self.listening = False
+                self.clear_local()
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(retry_delay)
+
+    def stats(self) -> Dict[str, Any]:
+        local = self._local.stats()
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return {
+            "listening": self.listening,
+            "local_size": local["size"],
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": local["evictions"],
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+            "hit_rate": ((self.local_hits + self.redis_hits) / lookups) if lookups else 0.0,
+        }
+
+
+entity_cache = EntityCache(
+    prefix=settings.entity_cache_prefix,
+    ttl=settings.entity_cache_ttl_seconds,
+    negative_ttl=settings.entity_cache_negative_ttl_seconds,
+    model_ttls=settings.entity_cache_model_ttls,
+    local_size=settings.entity_cache_local_size,
+    local_ttl=settings.entity_cache_local_ttl_seconds,
+)
@@ -0,0 +1,187 @@
+"""Helpers for data migrations that must not lock big tables.
+
+``alembic/env.py`` runs every revision in one transaction. Schema changes are
+fine there, but a backfill over millions of rows would hold its locks until
+the whole upgrade commits. Use these from a revision instead::
+
+    from app.repo.migrations import batched_backfill, outside_schema_transaction
+
+    def upgrade() -> None:
+        op.add_column("api_keys", sa.Column("prefix", sa.String(8)))
+        with outside_schema_transaction() as bind:
+            keys = sa.table("api_keys", sa.column("id"), sa.column("key_hash"), sa.column("prefix"))
+            batched_backfill(bind.engine, keys, {"prefix": sa.func.substr(keys.c.key_hash, 1, 8)}, chunk_size=5000)
+"""
+import json
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterator, Mapping, Optional, Union
+
+from loguru import logger
+from sqlalchemy import (
+    BigInteger, Boolean, Column, DateTime, MetaData, String, Table, Text, func, select, true, update,
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.sql import TableClause
+
+from app.repo.pagination import from_json_value, to_json_value
+
+
+ChunkFn = Callable[[Connection, Any, Any], int]
+
+# created by batched_backfill at run time, not by a revision: alembic/env.py
+# keeps autogenerate from dropping it (add custom ``progress_table`` names there)
+PROGRESS_TABLE = "migration_progress"
+
+
+@dataclass
+class BackfillProgress:
+    job: str
+    last_pk: Any = None
+    rows: int = 0
+    chunks: int = 0
+    finished: bool = False
+    started_at: float = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+
+@contextmanager
+def outside_schema_transaction() -> Iterator[Connection]:
+    """Commit the revision's transaction so far and run the block in autocommit mode.
+
+    Long data steps inside it neither hold the schema transaction's locks nor
+    get rolled back with it; make them idempotent (``batched_backfill`` resumes).
+    """
+    from alembic import op
+
+    with op.get_context().autocommit_block():
+        yield op.get_bind()
+
+
+def _progress_table(name: str) -> Table:
+    return Table(
+        name,
+        MetaData(),
+        Column("job", String(191), primary_key=True),
+        Column("last_pk", Text, nullable=True),
+        Column("rows_done", BigInteger, nullable=False, default=0),
+        Column("finished", Boolean, nullable=False, default=False),
+        Column("updated_at", DateTime(timezone=True), nullable=False),
+    )
+
+
+def _load_progress(conn: Connection, progress: Table, job: str) -> Optional[BackfillProgress]:
+    row = conn.execute(select(progress).where(progress.c.job == job)).mappings().first()
+    if row is None:
+        return None
+    last_pk = from_json_value(json.loads(row["last_pk"])) if row["last_pk"] is not None else None
+    return BackfillProgress(job=job, last_pk=last_pk, rows=row["rows_done"], finished=row["finished"])
+
+
+def _save_progress(conn: Connection, progress: Table, state: BackfillProgress) -> None:
+    values = {
+        "last_pk": json.dumps(to_json_value(state.last_pk)) if state.last_pk is not None else None,
+        "rows_done": state.rows,
+        "finished": state.finished,
+        "updated_at": datetime.now(timezone.utc),
+    }
+    if conn.execute(update(progress).where(progress.c.job == state.job).values(**values)).rowcount == 0:
+        conn.execute(progress.insert().values(job=state.job, **values))
+
+
+def _log_progress(state: BackfillProgress, max_pk: Any) -> None:
+    rate = state.rows / state.elapsed if state.elapsed > 0 else 0.0
+    logger.info(
+        f"backfill {state.job}: {state.rows} rows in {state.chunks} chunks, "
+        f"at {state.last_pk!r} of {max_pk!r} ({rate:.0f} rows/s)"
+    )
+
+
+def batched_backfill(
+    engine: Engine,
+    table: Union[str, TableClause],
+    apply: Union[Mapping[str, Any], ChunkFn],
+    *,
+    pk: str = "id",
+    where: Optional[Any] = None,
+    chunk_size: int = 1000,
+    sleep_seconds: float = 0.1,
+    job: Optional[str] = None,
+    resume: bool = True,
+    progress_table: str = PROGRESS_TABLE,
+    on_progress: Optional[Callable[[BackfillProgress], None]] = None,
+    log_interval: float = 10.0,
+) -> BackfillProgress:
+    """Walk ``table`` in primary-key order, ``chunk_size`` keys per transaction.
+
+    ``apply`` is either column values for ``UPDATE table SET ... WHERE lower < pk <= upper
+    [AND where]`` or a ``fn(conn, lower, upper) -> rows`` callback (``lower`` is ``None``
+    on the first chunk). Each chunk commits together with its position in
+    ``progress_table``, so an interrupted run continues where it stopped and a
+    finished job is a no-op; ``resume=False`` starts over. ``sleep_seconds``
+    between chunks leaves room for production traffic and replication; progress
+    is logged every ``log_interval`` seconds.
+
+    Opens its own connections from ``engine``: run it outside the revision's
+    transaction (``outside_schema_transaction``) or it may wait on that
+    transaction's locks.
+    """
+    if isinstance(table, str):
+        table = Table(table, MetaData(), autoload_with=engine)
+    key = table.c[pk]
+    job = job or f"{table.name}.{pk}:backfill"
+    progress = _progress_table(progress_table)
+    progress.create(engine, checkfirst=True)
+
+    if callable(apply):
+        apply_chunk = apply
+    else:
+        values = dict(apply)
+
+        def apply_chunk(conn: Connection, lower: Any, upper: Any) -> int:
+            stmt = update(table).where(key > lower if lower is not None else true(), key <= upper).values(**values)
+            if where is not None:
+                stmt = stmt.where(where)
+            return conn.execute(stmt).rowcount
+
+    with engine.begin() as conn:
+        state = _load_progress(conn, progress, job) if resume else None
+        max_pk = conn.scalar(select(func.max(key)))
+    if state is None:
+        state = BackfillProgress(job=job)
+    elif state.finished:
+        logger.info(f"backfill {job}: already finished ({state.rows} rows)")
+        return state
+    else:
+        logger.info(f"backfill {job}: resuming after {state.last_pk!r} ({state.rows} rows done)")
+    state.started_at = time.monotonic()
+    logged_at = state.started_at
+
+    while True:
+        with engine.begin() as conn:
+            after = key > state.last_pk if state.last_pk is not None else true()
+            # the chunk's upper key is the chunk_size-th key past the last one; walks the pk index
+            upper = conn.scalar(select(key).where(after).order_by(key).offset(chunk_size - 1).limit(1))
+            last_chunk = upper is None
+            if last_chunk:
+                upper = conn.scalar(select(func.max(key)).where(after))
+            if upper is not None:
+                state.rows += apply_chunk(conn, state.last_pk, upper) or 0
+                state.chunks += 1
+                state.last_pk = upper
+            state.finished = last_chunk
+            _save_progress(conn, progress, state)
+        if state.finished or time.monotonic() - logged_at >= log_interval:
+            _log_progress(state, max_pk)
+            logged_at = time.monotonic()
+        if on_progress is not None:
+            on_progress(state)
+        if state.finished:
+            return state
+        if sleep_seconds > 0:
+            time.sleep(sleep_seconds)
@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 from typing import Optional
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy import String, Boolean, Integer, DateTime
@@ -10,17 +10,20 @@ class ApiKey(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
-    token_hash: Mapped[str] = mapped_column(String(128), nullable=False, index=True, unique=True)
+    key_hash: Mapped[str] = mapped_column(String(128), nullable=False, index=True, unique=True)
     scopes: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    usage_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
-    valid_until: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
     def is_valid(self) -> bool:
         if not self.is_active:
             return False
-        if self.valid_until is not None and datetime.utcnow() > self.valid_until:
-            return False
+        if self.expires_at is not None:
+            expires_at = self.expires_at
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            if datetime.now(timezone.utc) >= expires_at:
+                return False
         return True
-
-
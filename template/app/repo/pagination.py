@@ -0,0 +1,125 @@
+import base64
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Generic, List, Optional, Sequence, Tuple, Type, TypeVar
+
+from sqlalchemy import and_, inspect, or_, select
+from sqlalchemy.sql import Select
+
+
+T = TypeVar('T')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+@dataclass
+class KeysetPage(Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str]
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+
+def to_json_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"$d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"$dec": str(value)}
+    return value
+
+
+def from_json_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "$dt" in value:
+            return datetime.fromisoformat(value["$dt"])
+        if "$d" in value:
+            return date.fromisoformat(value["$d"])
+        if "$dec" in value:
+            return Decimal(value["$dec"])
+    return value
+
+
+def encode_cursor(keys: Sequence[str], values: Sequence[Any]) -> str:
+    raw = json.dumps({"k": list(keys), "v": [to_json_value(v) for v in values]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, keys: Sequence[str]) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = [from_json_value(v) for v in payload["v"]]
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+    if payload.get("k") != list(keys) or len(values) != len(keys):
+        raise InvalidCursor("Cursor does not match the requested ordering")
+    return values
+
+
+def _sort_columns(model: Type[Any], order_by: Any) -> List[Tuple[str, Any]]:
+    """(attribute name, attribute) pairs for the ordering, always ending with the primary key."""
+    if order_by is None:
+        order_by = ()
+    elif not isinstance(order_by, (list, tuple)):
+        order_by = (order_by,)
+    for attr in order_by:
+        # NULL never compares greater or smaller, so _after would silently skip those rows
+        if getattr(attr.expression, "nullable", False):
+            raise ValueError(f"keyset pagination cannot order by nullable column {attr.key!r}")
+    columns = [(attr.key, attr) for attr in order_by]
+    mapper = inspect(model)
+    seen = {key for key, _ in columns}
+    for pk in mapper.primary_key:
+        key = mapper.get_property_by_column(pk).key
+        if key not in seen:
+            columns.append((key, getattr(model, key)))
+    return columns
+
+
+def _after(columns: Sequence[Any], values: Sequence[Any], descending: bool) -> Any:
+    # (a > x) OR (a = x AND b > y) OR ... ; expanded form works on every dialect
+    # and leaves the leading column usable as an index range
+    clauses = []
+    for i, column in enumerate(columns):
+        prefix = [columns[j] == values[j] for j in range(i)]
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*prefix, step))
+    return or_(*clauses)
+
+
+def keyset_select(
+    model: Type[Any],
+    where_clauses: Sequence[Any],
+    *,
+    order_by: Any,
+    descending: bool,
+    limit: int,
+    cursor: Optional[str],
+) -> Tuple[Select, List[str]]:
+    sort = _sort_columns(model, order_by)
+    keys = [key for key, _ in sort]
+    columns = [column for _, column in sort]
+    stmt = select(model)
+    for clause in where_clauses:
+        stmt = stmt.where(clause)
+    if cursor:
+        stmt = stmt.where(_after(columns, decode_cursor(cursor, keys), descending))
+    stmt = stmt.order_by(*[c.desc() if descending else c.asc() for c in columns])
+    # one extra row tells whether another page exists
+    return stmt.limit(limit + 1), keys
+
+
+def build_page(rows: List[T], keys: Sequence[str], limit: int) -> KeysetPage[T]:
+    if len(rows) <= limit:
+        return KeysetPage(items=rows, next_cursor=None)
+    items = rows[:limit]
+    last = items[-1]
+    return KeysetPage(items=items, next_cursor=encode_cursor(keys, [getattr(last, k) for k in keys]))
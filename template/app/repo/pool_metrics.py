@@ -0,0 +1,54 @@
+from time import perf_counter
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.metrics import DB_POOL_CHECKED_OUT, DB_POOL_CHECKOUT_WAIT
+
+_wait_histograms: Dict[str, Any] = {}
+
+
+class _TimedCheckout:
+    # _do_get is the pool's checkout: waiting for a free slot, and connecting when it opens a new one
+    def _do_get(self) -> Any:
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            # pool_logging_name survives engine.dispose(), which replaces the pool object
+            name = self.logging_name or "default"
+            histogram = _wait_histograms.get(name)
+            if histogram is None:
+                histogram = _wait_histograms[name] = DB_POOL_CHECKOUT_WAIT.labels(name)
+            histogram.observe(perf_counter() - start)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(name: str, backend: str, use_async: bool = False) -> Dict[str, Any]:
+    """``create_engine`` options for a pool whose checkout wait is measured as ``pool=name``."""
+    if backend == "sqlite":
+        # SQLite engines pick special pools (e.g. one connection for :memory:); keep them
+        return {}
+    return {"poolclass": TimedAsyncAdaptedQueuePool if use_async else TimedQueuePool, "pool_logging_name": name}
+
+
+def instrument_pool(engine: Engine, name: str) -> None:
+    """Track connections checked out of ``engine``'s pool (any pool class) as ``pool=name``."""
+    gauge = DB_POOL_CHECKED_OUT.labels(name)
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(*_: Any) -> None:
+        gauge.inc()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(*_: Any) -> None:
+        gauge.dec()
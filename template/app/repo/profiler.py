@@ -0,0 +1,87 @@
+import heapq
+import time
+from collections import Counter
+from contextvars import ContextVar, Token
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+_START_KEY = "_profiler_started_at"
+
+
+class QueryProfile:
+    """SQL executed while handling one request."""
+
+    def __init__(self, top_n: int = 5) -> None:
+        self.top_n = top_n
+        self.count = 0
+        self.total = 0.0
+        self._slowest: List[Tuple[float, int, str]] = []
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total += elapsed
+        # the SQL text still has its placeholders, so equal text means equal shape
+        self.shapes[statement] += 1
+        item = (elapsed, self.count, statement)
+        if len(self._slowest) < self.top_n:
+            heapq.heappush(self._slowest, item)
+        elif elapsed > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, item)
+
+    @property
+    def slowest(self) -> List[Tuple[float, str]]:
+        return [(elapsed, statement) for elapsed, _, statement in sorted(self._slowest, reverse=True)]
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statement shapes run at least ``threshold`` times (likely N+1 loops)."""
+        return [(statement, n) for statement, n in self.shapes.most_common() if n >= threshold]
+
+    def summary(self) -> Dict[str, Any]:
+        return {"queries": self.count, "db_ms": round(self.total * 1000, 2)}
+
+
+_current: ContextVar[Optional[QueryProfile]] = ContextVar("sql_profile", default=None)
+
+
+def current_profile() -> Optional[QueryProfile]:
+    return _current.get()
+
+
+def start_profile(top_n: int = 5) -> Token:
+    return _current.set(QueryProfile(top_n))
+
+
+def stop_profile(token: Token) -> Optional[QueryProfile]:
+    profile = _current.get()
+    _current.reset(token)
+    return profile
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    if context is not None and _current.get() is not None:
+        setattr(context, _START_KEY, time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+    started = getattr(context, _START_KEY, None)
+    if started is None:
+        return
+    profile = _current.get()
+    if profile is not None:
+        profile.record(statement, time.perf_counter() - started)
+
+
+def instrument(*engines: Engine) -> None:
+    """Attach the profiler to sync engines (pass ``AsyncEngine.sync_engine`` for async ones).
+
+    Only call this when profiling is enabled: unattached engines pay nothing,
+    attached ones only a context-variable lookup outside profiled requests.
+    """
+    for engine in engines:
+        if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,137 @@
+import asyncio
+import itertools
+import os
+import threading
+import time
+from typing import Any, Callable, List, Optional, Sequence, Union
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+
+_STICKY_KEY = "use_primary"
+
+
+def mysql_replica_lag(conn: Connection) -> Optional[float]:
+    """Seconds behind the source, ``None`` if replication is broken, 0 if not a replica."""
+    if conn.dialect.name != "mysql":
+        conn.execute(text("SELECT 1"))
+        return 0.0
+    try:
+        row = conn.execute(text("SHOW REPLICA STATUS")).mappings().first()
+        column = "Seconds_Behind_Source"
+    except Exception:
+        # MySQL < 8.0.22
+        row = conn.execute(text("SHOW SLAVE STATUS")).mappings().first()
+        column = "Seconds_Behind_Master"
+    if row is None:
+        return 0.0
+    lag = row.get(column)
+    return float(lag) if lag is not None else None
+
+
+class ReplicaSet:
+    """Primary plus read replicas; replicas failing the lag probe are ejected until they recover."""
+
+    def __init__(
+        self,
+        primary: Engine,
+        replicas: Sequence[Engine] = (),
+        async_primary: Optional[AsyncEngine] = None,
+        async_replicas: Sequence[AsyncEngine] = (),
+        max_lag_seconds: float = 5.0,
+        lag_probe: Callable[[Connection], Optional[float]] = mysql_replica_lag,
+    ) -> None:
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.async_primary = async_primary
+        self.async_replicas = list(async_replicas)
+        self.max_lag_seconds = max_lag_seconds
+        self.lag_probe = lag_probe
+        self.healthy: List[int] = list(range(len(self.replicas)))
+        self._next = itertools.count()
+        self._monitor_pid: Optional[int] = None
+
+    def pick(self, use_async: bool = False) -> Engine:
+        healthy = self.healthy
+        if not healthy:
+            return self.primary_for(use_async)
+        index = healthy[next(self._next) % len(healthy)]
+        if use_async:
+            return self.async_replicas[index].sync_engine
+        return self.replicas[index]
+
+    def primary_for(self, use_async: bool = False) -> Engine:
+        if use_async and self.async_primary is not None:
+            return self.async_primary.sync_engine
+        return self.primary
+
+    def check(self) -> List[int]:
+        """Probe every replica (blocking; run it off the event loop) and update the healthy set."""
+        healthy = []
+        for index, replica in enumerate(self.replicas):
+            try:
+                with replica.connect() as conn:
+                    lag = self.lag_probe(conn)
+            except Exception as exc:
+                logger.warning(f"Replica {replica.url!r} unreachable, ejecting: {exc}")
+                continue
+            if lag is None or lag > self.max_lag_seconds:
+                logger.warning(f"Replica {replica.url!r} lagging ({lag}s), ejecting")
+                continue
+            healthy.append(index)
+        self.healthy = healthy
+        return healthy
+
+    async def monitor(self, interval: float) -> None:
+        while True:
+            await asyncio.to_thread(self.check)
+            await asyncio.sleep(interval)
+
+    def start_monitor_thread(self, interval: float) -> None:
+        """``monitor`` for processes without an event loop (Celery workers); starts once per process."""
+        if self._monitor_pid == os.getpid():
+            return
+        self._monitor_pid = os.getpid()
+        threading.Thread(target=self._monitor_forever, args=(interval,), name="replica-monitor", daemon=True).start()
+
+    def _monitor_forever(self, interval: float) -> None:
+        while True:
+            self.check()
+            time.sleep(interval)
+
+
+class RoutingSession(Session):
+    """Sends plain SELECTs to a replica and everything else to the primary.
+
+    Once the session has written (flush, DML, ``SELECT ... FOR UPDATE``, raw SQL)
+    all further reads stick to the primary until ``close()``, so a request always
+    reads its own writes.
+    """
+
+    def __init__(self, replica_set: ReplicaSet, use_async: bool = False, **kw: Any) -> None:
+        super().__init__(**kw)
+        self.replica_set = replica_set
+        self.use_async = use_async
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kw: Any) -> Engine:
+        if not self.replica_set.replicas or self.info.get(_STICKY_KEY):
+            return self.replica_set.primary_for(self.use_async)
+        if self._flushing or not isinstance(clause, Select) or clause._for_update_arg is not None:
+            if clause is not None or self._flushing:
+                self.info[_STICKY_KEY] = True
+            return self.replica_set.primary_for(self.use_async)
+        return self.replica_set.pick(self.use_async)
+
+    def close(self) -> None:
+        super().close()
+        self.info.pop(_STICKY_KEY, None)
+
+
+def use_primary(db: Union[Session, AsyncSession]) -> None:
+    """Pin the rest of this session's reads to the primary."""
+    db.info[_STICKY_KEY] = True
@@ -1,15 +1,83 @@
+from typing import Any, AsyncIterator, Dict, Union
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, scoped_session, DeclarativeBase
 
 from app.core.config import settings
+from app.repo.pool_metrics import instrument_pool, pool_options
+from app.repo.profiler import instrument
+from app.repo.routing import ReplicaSet, RoutingSession
 
 
 class Base(DeclarativeBase):
     pass
 
 
-engine = create_engine(settings.mysql_url, pool_pre_ping=True, future=True)
-SessionLocal = scoped_session(sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True))
+# sync driver backend -> asyncio driver used when MYSQL_ASYNC_URL is not set
+_ASYNC_DRIVERS = {
+    "mysql": "aiomysql",
+    "sqlite": "aiosqlite",
+}
+
+
+def to_async_url(url: str) -> URL:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    driver = _ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        return parsed
+    return parsed.set(drivername=f"{backend}+{driver}")
+
+
+def _pool_options(name: str, url: Union[str, URL], use_async: bool = False) -> Dict[str, Any]:
+    if not settings.metrics_enabled:
+        return {}
+    return pool_options(name, make_url(url).get_backend_name(), use_async=use_async)
+
+
+_async_url = settings.mysql_async_url or to_async_url(settings.mysql_url)
+engine = create_engine(settings.mysql_url, pool_pre_ping=True, future=True, **_pool_options("primary", settings.mysql_url))
+async_engine = create_async_engine(_async_url, pool_pre_ping=True, **_pool_options("async_primary", _async_url, use_async=True))
+
+replica_set = ReplicaSet(
+    primary=engine,
+    replicas=[
+        create_engine(url, pool_pre_ping=True, future=True, **_pool_options(f"replica{i}", url))
+        for i, url in enumerate(settings.mysql_replica_urls)
+    ],
+    async_primary=async_engine,
+    async_replicas=[
+        create_async_engine(to_async_url(url), pool_pre_ping=True, **_pool_options(f"async_replica{i}", url, use_async=True))
+        for i, url in enumerate(settings.mysql_replica_urls)
+    ],
+    max_lag_seconds=settings.mysql_replica_max_lag_seconds,
+)
+
+if settings.metrics_enabled:
+    instrument_pool(engine, "primary")
+    instrument_pool(async_engine.sync_engine, "async_primary")
+    for i, replica in enumerate(replica_set.replicas):
+        instrument_pool(replica, f"replica{i}")
+    for i, async_replica in enumerate(replica_set.async_replicas):
+        instrument_pool(async_replica.sync_engine, f"async_replica{i}")
+
+if settings.sql_profiler_enabled:
+    instrument(
+        engine,
+        async_engine.sync_engine,
+        *replica_set.replicas,
+        *[replica.sync_engine for replica in replica_set.async_replicas],
+    )
+
+SessionLocal = scoped_session(sessionmaker(
+    bind=engine, class_=RoutingSession, replica_set=replica_set, autocommit=False, autoflush=False, future=True,
+))
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, sync_session_class=RoutingSession, replica_set=replica_set, use_async=True,
+    autoflush=False, expire_on_commit=False,
+)
 
 
 def get_db():
@@ -20,3 +88,6 @@ def get_db():
         db.close()
 
 
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
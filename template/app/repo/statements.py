@@ -0,0 +1,161 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Optional, Sequence, Tuple, Type
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.elements import BindParameter
+
+
+_statements: Dict[Hashable, Select] = {}
+# where-shape -> (statement, its bind parameters in cache-key order)
+_where_statements: Dict[Hashable, Tuple[Select, List[BindParameter]]] = {}
+_lock = threading.Lock()
+# shapes of arbitrary where clauses come from callers; past this many, build per call instead of growing
+MAX_WHERE_STATEMENTS = 2048
+
+
+def cached_statement(key: Hashable, build: Callable[[], Select]) -> Select:
+    """Build a statement once per ``key`` and reuse it.
+
+    Reusing the same object lets SQLAlchemy reuse its memoized cache key, so a
+    call skips both statement construction and the cache-key traversal and goes
+    straight to the compiled-SQL cache. Statements must only carry bind
+    parameters, never values; shapes come from code, so the dict stays small.
+    """
+    stmt = _statements.get(key)
+    if stmt is None:
+        with _lock:
+            stmt = _statements.setdefault(key, build())
+    return stmt
+
+
+def _param(name: str) -> str:
+    return f"f_{name}"
+
+
+def filter_by_statement(model: Type[Any], filters: Mapping[str, Any]) -> Tuple[Select, Dict[str, Any]]:
+    """``select(model).filter_by(**filters)`` as a cached statement plus its parameters.
+
+    ``None`` values are part of the shape (``IS NULL``), not parameters.
+    """
+    shape = tuple(sorted((name, value is None) for name, value in filters.items()))
+
+    def build() -> Select:
+        return select(model).filter_by(**{
+            name: None if is_null else bindparam(_param(name)) for name, is_null in shape
+        })
+
+    params = {_param(name): value for name, value in filters.items() if value is not None}
+    return cached_statement(("filter_by", model, shape), build), params
+
+
+def list_statement(model: Type[Any], order_by: Optional[Any], descending: bool) -> Select:
+    """Paged ``select(model)``; offset and limit are parameters (``page_params``) so every page shares one statement."""
+
+    def build() -> Select:
+        return _ordered(select(model), order_by, descending).offset(bindparam("p_offset")).limit(bindparam("p_limit"))
+
+    key = order_key(order_by, descending)
+    if key is None:
+        return build()
+    return cached_statement(("list", model, key), build)
+
+
+def order_key(order_by: Optional[Any], descending: bool) -> Optional[Hashable]:
+    """Cache-key part for an ordering; ``None`` when it has no cheap stable key (arbitrary expressions)."""
+    if order_by is None:
+        return ("unordered",)
+    if isinstance(order_by, InstrumentedAttribute):
+        return (order_by.class_, order_by.key, descending)
+    return None
+
+
+def _where_shape(where_clauses: Sequence[Any]) -> Optional[Tuple[Hashable, List[BindParameter]]]:
+    keys = []
+    binds: List[BindParameter] = []
+    for clause in where_clauses:
+        # SQLAlchemy's own cache key: structure without the bound values, which it lists separately
+        cache_key = clause._generate_cache_key()
+        if cache_key is None:
+            return None
+        keys.append(cache_key.key)
+        binds.extend(cache_key.bindparams)
+    return tuple(keys), binds
+
+
+def where_statement(
+    kind: Hashable,
+    model: Type[Any],
+    where_clauses: Sequence[Any],
+    build: Callable[[Select], Select],
+) -> Tuple[Select, Dict[str, Any]]:
+    """``build(select(model).where(*where_clauses))`` cached per ``kind``, model and where-shape.
+
+    Two calls whose clauses differ only in their values (``ApiKey.id == 1`` and
+    ``ApiKey.id == 2``, ``in_`` lists of any length) share one statement; the
+    returned parameters carry this call's values into its bind parameters.
+    ``kind`` must capture everything ``build`` adds (e.g. the ordering).
+    """
+    shape = _where_shape(where_clauses)
+    if shape is None:
+        return build(select(model).where(*where_clauses)), {}
+    where_key, binds = shape
+    key = (kind, model, where_key)
+    cached = _where_statements.get(key)
+    if cached is None:
+        cached = (build(select(model).where(*where_clauses)), binds)
+        if len(_where_statements) >= MAX_WHERE_STATEMENTS:
+            return cached[0], {}
+        with _lock:
+            cached = _where_statements.setdefault(key, cached)
+    stmt, cached_binds = cached
+    return stmt, {old.key: new.effective_value for old, new in zip(cached_binds, binds)}
+
+
+def _ordered(stmt: Select, order_by: Optional[Any], descending: bool) -> Select:
+    if order_by is None:
+        return stmt
+    return stmt.order_by(order_by.desc() if descending else order_by.asc())
+
+
+def find_where_statement(model: Type[Any], where_clauses: Sequence[Any]) -> Tuple[Select, Dict[str, Any]]:
+    return where_statement("find", model, where_clauses, lambda stmt: stmt)
+
+
+def list_where_statement(model: Type[Any], where_clauses: Sequence[Any], offset: int, limit: Optional[int]) -> Tuple[Select, Dict[str, Any]]:
+    if limit is None:
+        return where_statement("all", model, where_clauses, lambda stmt: stmt)
+    stmt, params = where_statement(
+        "page", model, where_clauses, lambda stmt: stmt.offset(bindparam("p_offset")).limit(bindparam("p_limit")),
+    )
+    return stmt, {**params, **page_params(offset, limit)}
+
+
+def exists_where_statement(model: Type[Any], where_clauses: Sequence[Any]) -> Tuple[Select, Dict[str, Any]]:
+    return where_statement("exists", model, where_clauses, lambda stmt: stmt.limit(1))
+
+
+def max_of_statement(model: Type[Any], column: Any, where_clauses: Sequence[Any]) -> Tuple[Select, Dict[str, Any]]:
+    def build(stmt: Select) -> Select:
+        return stmt.order_by(column.desc()).limit(1)
+
+    key = order_key(column, True)
+    if key is None:
+        return build(select(model).where(*where_clauses)), {}
+    return where_statement(("max", key), model, where_clauses, build)
+
+
+def stream_statement(model: Type[Any], where_clauses: Sequence[Any], order_by: Optional[Any], descending: bool) -> Tuple[Select, Dict[str, Any]]:
+    key = order_key(order_by, descending)
+    if key is None:
+        return _ordered(select(model).where(*where_clauses), order_by, descending), {}
+    return where_statement(("stream", key), model, where_clauses, lambda stmt: _ordered(stmt, order_by, descending))
+
+
+def page_params(offset: int, limit: int) -> Dict[str, Any]:
+    return {"p_offset": offset, "p_limit": limit}
+
+
+def statement_cache_size() -> int:
+    return len(_statements) + len(_where_statements)
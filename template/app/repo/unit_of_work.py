@@ -0,0 +1,71 @@
+from typing import Any, Optional, Union
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+
+_UOW_KEY = "unit_of_work"
+
+
+def active_unit_of_work(db: Union[Session, AsyncSession]) -> Optional["UnitOfWork"]:
+    return db.info.get(_UOW_KEY)
+
+
+class UnitOfWork:
+    """Single-transaction scope for every repository sharing ``db``.
+
+    Inside the scope repository writes only ``flush()``; one ``commit()`` happens on
+    exit, or a ``rollback()`` if the block raised. Post-write refreshes are skipped
+    unless ``refresh=True`` (or ``Repository.refresh`` is called explicitly).
+    Nested scopes on the same session join the outer one.
+    """
+
+    def __init__(self, db: Session, refresh: bool = False) -> None:
+        self.db = db
+        self.refresh = refresh
+        self._owner = False
+
+    def _begin(self) -> None:
+        if active_unit_of_work(self.db) is None:
+            self.db.info[_UOW_KEY] = self
+            self._owner = True
+
+    def _end(self) -> None:
+        if self._owner:
+            self.db.info.pop(_UOW_KEY, None)
+            self._owner = False
+
+    def __enter__(self) -> "UnitOfWork":
+        self._begin()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if not self._owner:
+            return
+        try:
+            if exc_type is None:
+                self.db.commit()
+            else:
+                self.db.rollback()
+        finally:
+            self._end()
+
+
+class AsyncUnitOfWork(UnitOfWork):
+    def __init__(self, db: AsyncSession, refresh: bool = False) -> None:  # type: ignore[override]
+        super().__init__(db, refresh)  # type: ignore[arg-type]
+
+    async def __aenter__(self) -> "AsyncUnitOfWork":
+        self._begin()
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if not self._owner:
+            return
+        try:
+            if exc_type is None:
+                await self.db.commit()
+            else:
+                await self.db.rollback()
+        finally:
+            self._end()
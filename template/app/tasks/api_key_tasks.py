@@ -0,0 +1,56 @@
+from typing import Dict
+
+from celery.signals import worker_shutdown
+from loguru import logger
+
+from app.core.config import settings
+from app.core.redis import pipelined, scripts
+from app.repo.api_key_repository import ApiKeyRepository
+from app.repo.session import SessionLocal
+from app.tasks.celery import celery_app
+
+
+# HGETALL + DEL in one step so increments landing mid-flush are kept for the next run
+_DRAIN_SCRIPT = scripts.register("api_key_usage_drain", """
+local v = redis.call('HGETALL', KEYS[1])
+redis.call('DEL', KEYS[1])
+return v
+""")
+
+
+def _drain_usage_counts() -> Dict[int, int]:
+    raw = scripts.run(_DRAIN_SCRIPT, keys=[settings.api_key_usage_redis_key])
+    return {int(raw[i]): int(raw[i + 1]) for i in range(0, len(raw), 2)}
+
+
+def flush_usage_counts() -> int:
+    counts = _drain_usage_counts()
+    if not counts:
+        return 0
+    db = SessionLocal()
+    try:
+        ApiKeyRepository(db).add_usage_counts(counts)
+    except Exception:
+        db.rollback()
+        # put the counts back so the next run retries them
+        pipelined(
+            [("HINCRBY", settings.api_key_usage_redis_key, str(api_key_id), n) for api_key_id, n in counts.items()],
+            transaction=True,
+        )
+        raise
+    finally:
+        db.close()
+    return len(counts)
+
+
+@celery_app.task(name="api_keys.flush_usage", ignore_result=True)
+def flush_usage() -> int:
+    return flush_usage_counts()
+
+
+@worker_shutdown.connect
+def _flush_usage_on_shutdown(**_: object) -> None:
+    try:
+        flush_usage_counts()
+    except Exception as exc:
+        logger.error(f"Failed to flush API key usage on worker shutdown: {exc}")
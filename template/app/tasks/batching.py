@@ -0,0 +1,262 @@
+"""Batched tasks: enqueue items one by one, handle them in lists.
+
+    @batched_task("audit.record", max_size=500, max_wait=0.2)
+    def record(items: list[dict]) -> None:
+        AuditRepository(db).create_many(items)
+
+    record.enqueue({"event": "login", "user_id": 42})
+
+Items are JSON-encoded onto a Redis list; no broker message is sent per item.
+The first item of a window schedules a drain ``max_wait`` seconds later, and an
+item that leaves a full batch waiting schedules one right away (at most one at a
+time while the queue stays above ``max_size``). Celery beat runs ``batching.sweep``
+every ``CELERY_BATCH_SWEEP_SECONDS``: it puts expired batches back and drains every
+batch with items waiting, so a lost drain message delays items, never strands them. A drain moves up to
+``max_size`` items into an in-flight list (atomically, in Lua), calls the
+handler once with the list and only then deletes it: the batch is the unit of
+acknowledgement. Batches whose worker died are put back on the queue after
+``visibility_timeout``; a handler that raises has its batch put back and
+retried after ``retry_delay``, so handlers should be idempotent.
+
+With ``task_always_eager`` (tests) items are buffered in process memory instead
+and handled when a batch fills or on ``flush()``; ``flush()`` also drains the
+Redis queue synchronously, which is what tests against a Redis stand-in use
+(pass it as ``client``, e.g. ``fakeredis.FakeRedis(decode_responses=True)``).
+"""
+import json
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, cast
+
+import redis
+from celery import Celery
+from loguru import logger
+
+from app.core.config import settings
+from app.core.redis import get_redis, scripts
+from app.tasks.celery import celery_app
+
+
+# KEYS: queue, in-flight index, batch list; ARGV: max items, visibility deadline
+_TAKE_SCRIPT = scripts.register("batch_take", """
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items == 0 then
+    return items
+end
+redis.call('LTRIM', KEYS[1], #items, -1)
+redis.call('RPUSH', KEYS[3], unpack(items))
+redis.call('ZADD', KEYS[2], ARGV[2], KEYS[3])
+return items
+""")
+
+# KEYS: queue, in-flight index; ARGV: now [, one batch key to put back regardless of its deadline]
+_REQUEUE_SCRIPT = scripts.register("batch_requeue", """
+local batches
+if ARGV[2] then
+    batches = {ARGV[2]}
+else
+    batches = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+end
+local n = 0
+for _, batch in ipairs(batches) do
+    local items = redis.call('LRANGE', batch, 0, -1)
+    for i = #items, 1, -1 do
+        redis.call('LPUSH', KEYS[1], items[i])
+    end
+    redis.call('DEL', batch)
+    redis.call('ZREM', KEYS[2], batch)
+    n = n + #items
+end
+return n
+""")
+
+
+# every BatchedTask of the process, by name, for the periodic sweep
+_batches: Dict[str, "BatchedTask"] = {}
+
+
+class BatchedTask:
+    def __init__(
+        self,
+        app: Celery,
+        name: str,
+        handler: Callable[[List[Any]], Any],
+        max_size: int = 500,
+        max_wait: float = 0.2,
+        visibility_timeout: Optional[float] = None,
+        retry_delay: float = 5.0,
+        client: Optional[redis.Redis] = None,
+    ) -> None:
+        self.app = app
+        self.name = name
+        self.handler = handler
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.visibility_timeout = visibility_timeout or settings.celery_batch_visibility_timeout_seconds
+        self.retry_delay = retry_delay
+        self.queue_key = f"{settings.celery_batch_prefix}:{name}"
+        self.inflight_key = f"{self.queue_key}:inflight"
+        # set while a drain for full batches is queued, so a backlog sends one message, not one per item
+        self.scheduled_key = f"{self.queue_key}:scheduled"
+        self._buffer: List[Any] = []
+        # None: the process's shared client, looked up per call
+        self._client = client
+
+        def drain() -> int:
+            return self._drain()
+
+        self.drain_task = app.task(name=f"batch.{name}", ignore_result=True)(drain)
+        _batches[name] = self
+
+    @property
+    def client(self) -> redis.Redis:
+        return self._client or get_redis()
+
+    @property
+    def eager(self) -> bool:
+        return bool(self.app.conf.task_always_eager)
+
+    def enqueue(self, item: Any) -> None:
+        if self.eager:
+            self._buffer.append(item)
+            if len(self._buffer) >= self.max_size:
+                self._flush_buffer()
+            return
+        size = cast(int, self.client.rpush(self.queue_key, json.dumps(item, separators=(",", ":"))))
+        self._schedule(size, added=1)
+
+    def enqueue_many(self, items: Sequence[Any]) -> None:
+        if not items:
+            return
+        if self.eager:
+            for item in items:
+                self.enqueue(item)
+            return
+        size = cast(int, self.client.rpush(self.queue_key, *[json.dumps(item, separators=(",", ":")) for item in items]))
+        self._schedule(size, added=len(items))
+
+    def _schedule(self, size: int, added: int) -> None:
+        if size >= self.max_size:
+            # not only when the size hits max_size exactly: that item may have been taken already
+            if self.client.set(self.scheduled_key, 1, nx=True, px=int(self.visibility_timeout * 1000)):
+                self.drain_task.apply_async()
+        elif size == added:
+            # first items of a window
+            self.drain_task.apply_async(countdown=self.max_wait)
+
+    def _flush_buffer(self) -> int:
+        handled = 0
+        while self._buffer:
+            batch, self._buffer = self._buffer[:self.max_size], self._buffer[self.max_size:]
+            try:
+                self.handler(batch)
+            except Exception:
+                self._buffer[:0] = batch
+                raise
+            handled += len(batch)
+        return handled
+
+    def _take(self) -> Optional[Tuple[str, List[Any]]]:
+        batch_key = f"{self.inflight_key}:{uuid.uuid4().hex}"
+        deadline = time.time() + self.visibility_timeout
+        raw = scripts.run(_TAKE_SCRIPT, keys=[self.queue_key, self.inflight_key, batch_key], args=[self.max_size, deadline], client=self.client)
+        if not raw:
+            return None
+        return batch_key, [json.loads(item) for item in raw]
+
+    def _ack(self, batch_key: str) -> None:
+        with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(batch_key)
+            pipe.zrem(self.inflight_key, batch_key)
+            pipe.execute()
+
+    def requeue_expired(self) -> int:
+        """Put batches whose worker died mid-handler back at the head of the queue."""
+        return scripts.run(_REQUEUE_SCRIPT, keys=[self.queue_key, self.inflight_key], args=[time.time()], client=self.client)
+
+    def sweep(self) -> int:
+        """Requeue expired batches and schedule a drain if items are waiting; returns the items waiting."""
+        if self.eager:
+            return 0
+        requeued = self.requeue_expired()
+        if requeued:
+            logger.warning(f"batch {self.name}: requeued {requeued} items from expired batches")
+        waiting = self.pending()
+        if waiting:
+            self.drain_task.apply_async()
+        return waiting
+
+    def _drain(self, until_empty: bool = False) -> int:
+        # from here on, a new full batch needs a drain of its own
+        self.client.delete(self.scheduled_key)
+        requeued = self.requeue_expired()
+        if requeued:
+            logger.warning(f"batch {self.name}: requeued {requeued} items from expired batches")
+        handled = 0
+        while True:
+            taken = self._take()
+            if taken is None:
+                return handled
+            batch_key, items = taken
+            try:
+                self.handler(items)
+            except Exception:
+                scripts.run(_REQUEUE_SCRIPT, keys=[self.queue_key, self.inflight_key], args=[time.time(), batch_key], client=self.client)
+                if not until_empty:
+                    self.drain_task.apply_async(countdown=self.retry_delay)
+                raise
+            self._ack(batch_key)
+            handled += len(items)
+            if len(items) < self.max_size and not until_empty:
+                # a partial batch emptied the queue; a later enqueue opens the next window
+                if self.client.llen(self.queue_key):
+                    self.drain_task.apply_async(countdown=self.max_wait)
+                return handled
+
+    def flush(self) -> int:
+        """Handle everything pending now, in this process."""
+        if self.eager:
+            return self._flush_buffer()
+        return self._drain(until_empty=True)
+
+    def pending(self) -> int:
+        if self.eager:
+            return len(self._buffer)
+        return cast(int, self.client.llen(self.queue_key))
+
+    def stats(self) -> Dict[str, Any]:
+        if self.eager:
+            return {"pending": len(self._buffer), "in_flight_batches": 0}
+        with self.client.pipeline(transaction=False) as pipe:
+            pipe.llen(self.queue_key)
+            pipe.zcard(self.inflight_key)
+            pending, in_flight = pipe.execute()
+        return {"pending": pending, "in_flight_batches": in_flight}
+
+    def __call__(self, items: List[Any]) -> Any:
+        return self.handler(items)
+
+
+@celery_app.task(name="batching.sweep", ignore_result=True)
+def sweep_batches() -> int:
+    """Periodic (beat): recover every batch of this process from lost drains and dead workers."""
+    waiting = 0
+    for batch in list(_batches.values()):
+        try:
+            waiting += batch.sweep()
+        except Exception as exc:
+            logger.error(f"batch {batch.name}: sweep failed: {exc}")
+    return waiting
+
+
+def batched_task(
+    name: str,
+    max_size: int = 500,
+    max_wait: float = 0.2,
+    app: Celery = celery_app,
+    **options: Any,
+) -> Callable[[Callable[[List[Any]], Any]], BatchedTask]:
+    def decorate(handler: Callable[[List[Any]], Any]) -> BatchedTask:
+        return BatchedTask(app, name, handler, max_size=max_size, max_wait=max_wait, **options)
+    return decorate
+
@@ -1,24 +1,84 @@
-from celery import Celery
+from typing import Any
+
+from celery import Celery, signals
+from celery.concurrency import get_implementation
+from kombu import Queue
+
 from app.core.config import settings
+from app.repo.session import replica_set
+from app.tasks.metrics import connect_task_metrics
+from app.tasks.serialization import register_compact_serializer
+
+
+QUEUE_FAST = "fast"
+QUEUE_DEFAULT = "default"
+QUEUE_HEAVY = "heavy"
+
+# task name (glob) -> queue; first match wins, unmatched tasks go to QUEUE_DEFAULT.
+# fast: short, latency-sensitive; heavy: CPU-bound or long-running (see app/tasks/worker.py)
+TASK_ROUTES = {
+    "demo.echo": {"queue": QUEUE_FAST},
+    "batch.*": {"queue": QUEUE_FAST},
+    "batching.sweep": {"queue": QUEUE_FAST},
+    "demo.long_job": {"queue": QUEUE_HEAVY},
+    "demo.crunch": {"queue": QUEUE_HEAVY},
+    "demo.report": {"queue": QUEUE_HEAVY},
+}
 
 
 def create_celery_app() -> Celery:
+    if settings.celery_serializer == "compact":
+        register_compact_serializer()
     app = Celery(
         "__APP_NAME__",
         broker=settings.celery_broker_url,
         backend=settings.celery_result_backend,
-        include=["app.tasks"],
+        include=["app.tasks.demo_tasks", "app.tasks.api_key_tasks"],
     )
     app.conf.update(
-        task_serializer="json",
-        result_serializer="json",
-        accept_content=["json"],
+        task_serializer=settings.celery_serializer,
+        result_serializer=settings.celery_serializer,
+        # json stays accepted so messages queued before a serializer switch still run
+        accept_content=list(dict.fromkeys([settings.celery_serializer, "json"])),
+        result_accept_content=list(dict.fromkeys([settings.celery_serializer, "json"])),
+        result_expires=settings.celery_result_expires_seconds,
+        task_time_limit=settings.celery_task_time_limit_seconds,
+        task_soft_time_limit=settings.celery_task_soft_time_limit_seconds,
+        task_queues=[Queue(name) for name in (QUEUE_FAST, QUEUE_DEFAULT, QUEUE_HEAVY)],
+        task_default_queue=QUEUE_DEFAULT,
+        task_routes=TASK_ROUTES,
         timezone="UTC",
         enable_utc=True,
+        beat_schedule={
+            "api-keys-flush-usage": {
+                "task": "api_keys.flush_usage",
+                "schedule": settings.api_key_usage_flush_interval_seconds,
+            },
+            "batching-sweep": {
+                "task": "batching.sweep",
+                "schedule": settings.celery_batch_sweep_seconds,
+            },
+        },
     )
+    if settings.metrics_enabled:
+        connect_task_metrics(settings.celery_metrics_port)
+    if replica_set.replicas:
+        signals.worker_process_init.connect(_monitor_replicas, weak=False)
+        signals.worker_init.connect(_monitor_replicas_unless_prefork, weak=False)
     return app
 
 
+def _monitor_replicas(**_: Any) -> None:
+    # without it a worker keeps reading from a replica that fell behind or went away
+    replica_set.start_monitor_thread(settings.mysql_replica_check_interval_seconds)
+
+
+def _monitor_replicas_unless_prefork(sender: Any = None, **_: Any) -> None:
+    # thread / solo pools run tasks in this process; prefork children start their own in worker_process_init
+    if get_implementation(sender.pool_cls).__module__ != "celery.concurrency.prefork":
+        _monitor_replicas()
+
+
 celery_app = create_celery_app()
 
 
@@ -0,0 +1,138 @@
+"""Coalescing tasks: one run for identical calls that overlap.
+
+    @coalescing_task("reports.daily", result_ttl=60)
+    def daily_report(day: str) -> dict:
+        ...
+
+    daily_report.delay("2024-01-01")   # enqueued
+    daily_report.delay("2024-01-01")   # same AsyncResult, nothing enqueued
+
+``apply_async`` claims a Redis marker keyed by the task name and a hash of the
+canonical JSON of its arguments (``SET NX``, value: the task id). While the
+marker exists, identical calls get the marked task's ``AsyncResult`` instead
+of a new message. When the task finishes the marker is removed, or, with
+``result_ttl``, kept that long after a success so callers reuse the stored
+result (keep it below the result backend's ``result_expires``). The marker
+only goes away if its value is still this task's id (Lua compare-and-delete),
+and it carries ``lock_ttl`` so a task lost with its worker or message stops
+absorbing calls after that long: set ``lock_ttl`` above queue wait plus run
+time, retries included. The marker key travels with the message (a header), so
+the worker releases the key that was claimed even if arguments come back from
+the serializer as different types; ``Task.retry()`` re-publishes under the
+marked id and keeps the header.
+
+Only ``apply_async`` / ``delay`` (and ``task_gateway``) coalesce; ``send_task``
+by name does not.
+"""
+import hashlib
+import json
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from celery import Celery, Task, states
+from celery.utils import uuid
+from loguru import logger
+
+from app.core.config import settings
+from app.core.redis import get_redis, scripts
+from app.tasks.celery import celery_app
+
+MARKER_HEADER = "coalesce_marker"
+
+# KEYS: marker; ARGV: task id, seconds to keep it (0: delete)
+_RELEASE_SCRIPT = scripts.register("coalesce_release", """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+if tonumber(ARGV[2]) > 0 then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return redis.call('DEL', KEYS[1])
+""")
+
+
+def canonical_hash(args: Optional[Sequence[Any]], kwargs: Optional[Dict[str, Any]]) -> str:
+    # equal calls hash equally regardless of kwargs order or tuple vs list
+    payload = json.dumps([list(args or ()), kwargs or {}], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CoalescingTask(Task):
+    coalesce_lock_ttl: Optional[int] = None
+    coalesce_result_ttl: int = 0
+    # (args, kwargs) -> the part of the call that identifies the work; defaults to all of it
+    coalesce_key: Optional[Callable[..., Any]] = None
+
+    def _marker(self, args: Optional[Sequence[Any]], kwargs: Optional[Dict[str, Any]]) -> str:
+        if self.coalesce_key is not None:
+            digest = canonical_hash([self.coalesce_key(*(args or ()), **(kwargs or {}))], None)
+        else:
+            digest = canonical_hash(args, kwargs)
+        return f"{settings.celery_coalesce_prefix}:{self.name}:{digest}"
+
+    def apply_async(self, args: Optional[Sequence[Any]] = None, kwargs: Optional[Dict[str, Any]] = None, task_id: Optional[str] = None, **options: Any) -> Any:
+        task_id = task_id or uuid()
+        if options.get("retries"):
+            # Task.retry(): this id holds the marker, and the header still names it
+            return super().apply_async(args, kwargs, task_id=task_id, **options)
+        marker = self._marker(args, kwargs)
+        lock_ttl = self.coalesce_lock_ttl or settings.celery_coalesce_lock_ttl_seconds
+        client = get_redis()
+        for _ in range(3):
+            if client.set(marker, task_id, nx=True, ex=lock_ttl):
+                break
+            existing = client.get(marker)
+            if existing == task_id:
+                # published again under the id that holds the marker
+                break
+            if existing is not None:
+                logger.debug(f"{self.name}: coalesced into running task {existing}")
+                return self.AsyncResult(existing)
+            # expired between SET and GET; try to claim it again
+        else:
+            raise RuntimeError(f"{self.name}: could not claim coalescing marker {marker}")
+        headers = {**(options.pop("headers", None) or {}), MARKER_HEADER: marker}
+        try:
+            return super().apply_async(args, kwargs, task_id=task_id, headers=headers, **options)
+        except Exception:
+            self._release(marker, task_id, 0)
+            raise
+
+    def after_return(self, status: str, retval: Any, task_id: str, args: Any, kwargs: Any, einfo: Any) -> None:
+        # a retry keeps its task id, so the marker stays with it
+        if status in states.READY_STATES:
+            keep = self.coalesce_result_ttl if status == states.SUCCESS else 0
+            if keep and self.request.is_eager and not self.app.conf.task_store_eager_result:
+                # nothing in the result backend for later callers to read
+                keep = 0
+            marker = (self.request.headers or {}).get(MARKER_HEADER)
+            if marker is None:
+                # send_task() or apply(): the compare-and-delete only matches a marker this id holds
+                marker = self._marker(args, kwargs)
+            self._release(marker, task_id, keep)
+        super().after_return(status, retval, task_id, args, kwargs, einfo)
+
+    def _release(self, marker: str, task_id: str, keep_seconds: int) -> None:
+        try:
+            scripts.run(_RELEASE_SCRIPT, keys=[marker], args=[task_id, keep_seconds])
+        except Exception as exc:
+            logger.warning(f"{self.name}: failed to release coalescing marker, it expires on its own: {exc}")
+
+
+def coalescing_task(
+    name: str,
+    lock_ttl: Optional[int] = None,
+    result_ttl: int = 0,
+    key: Optional[Callable[..., Any]] = None,
+    app: Celery = celery_app,
+    **options: Any,
+) -> Callable[[Callable[..., Any]], CoalescingTask]:
+    def decorate(fn: Callable[..., Any]) -> CoalescingTask:
+        return app.task(
+            name=name,
+            base=CoalescingTask,
+            coalesce_lock_ttl=lock_ttl,
+            coalesce_result_ttl=result_ttl,
+            coalesce_key=staticmethod(key) if key is not None else None,
+            **options,
+        )(fn)
+    return decorate
@@ -1,4 +1,12 @@
+import time
+from typing import List
+
+from loguru import logger
+
+from app.tasks.batching import batched_task
 from app.tasks.celery import celery_app
+from app.tasks.coalesce import coalescing_task
+from app.tasks.progress import ProgressTask
 
 
 @celery_app.task(name="demo.echo")
@@ -6,3 +14,32 @@ def echo(value: str) -> str:
     return value
 
 
+@celery_app.task(name="demo.crunch")
+def crunch(seconds: float = 1.0) -> int:
+    """Burn CPU for ``seconds``; stands in for heavy jobs (routed to the heavy queue)."""
+    deadline = time.perf_counter() + seconds
+    rounds = 0
+    while time.perf_counter() < deadline:
+        sum(i * i for i in range(10000))
+        rounds += 1
+    return rounds
+
+
+@coalescing_task("demo.report", result_ttl=30)
+def report(day: str, seconds: float = 2.0) -> dict:
+    """Slow, deterministic per-day job: concurrent and repeated calls share one run."""
+    time.sleep(seconds)
+    return {"day": day, "generated_at": time.time()}
+
+
+@batched_task("demo.events", max_size=500, max_wait=0.2)
+def record_events(events: List[dict]) -> None:
+    logger.info(f"demo.events: {len(events)} events in one batch")
+
+
+@celery_app.task(name="demo.long_job", base=ProgressTask, bind=True)
+def long_job(self: ProgressTask, steps: int = 10, delay: float = 0.5) -> int:
+    for step in range(1, steps + 1):
+        time.sleep(delay)
+        self.report_progress(step, steps, message=f"step {step}/{steps}")
+    return steps
@@ -0,0 +1,221 @@
+"""Dispatch Celery tasks and await their results from async code without tying up threads.
+
+    task_id = await task_gateway.submit("demo.echo", args=["hi"])
+    value = await task_gateway.result(task_id, timeout=5)
+
+``submit`` publishes through the app's producer pool on a small dedicated thread
+pool (kombu publishing is blocking). ``result`` does not poll: the Redis result
+backend PUBLISHes every state change on the result key's own channel, so all
+waiters in a process share one pub/sub connection and are woken when their key
+is written. A waiter subscribes before reading the key, so a result stored in
+between is never missed. Other result backends fall back to ``AsyncResult.get``
+on the dispatch thread pool.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Dict, Optional, Sequence, Set
+
+import redis.asyncio as aioredis
+from celery import Celery, Task, states
+from celery.backends.redis import RedisBackend
+from celery.exceptions import NotRegistered, TimeoutError as CeleryTimeoutError
+from celery.result import AsyncResult, EagerResult
+from loguru import logger
+
+from app.core.config import settings
+from app.tasks.celery import celery_app
+
+
+class TaskResultTimeout(TimeoutError):
+    def __init__(self, task_id: str, timeout: float) -> None:
+        self.task_id = task_id
+        super().__init__(f"task {task_id} not ready after {timeout}s")
+
+
+class TaskGateway:
+    def __init__(self, app: Celery, dispatch_workers: int = 4) -> None:
+        self.app = app
+        self._executor = ThreadPoolExecutor(max_workers=dispatch_workers, thread_name_prefix="task-dispatch")
+        self._client: Optional[aioredis.Redis] = None
+        self._pubsub: Optional[aioredis.client.PubSub] = None
+        self._listener: Optional[asyncio.Task] = None
+        # PubSub takes a pool connection on a command issued while it has none: concurrent
+        # first subscribes would each take (and leak) one, so commands on it go one at a time
+        self._lock = asyncio.Lock()
+        # result key -> futures of everyone awaiting that task
+        self._waiters: Dict[str, Set[asyncio.Future]] = {}
+        # task_always_eager (tests): results never reach the backend
+        self._eager: Dict[str, EagerResult] = {}
+
+    def _task(self, name: str) -> Optional[Task]:
+        if name not in self.app.tasks:
+            # the web process does not import the worker's task modules
+            self.app.loader.import_default_modules()
+        return self.app.tasks.get(name)
+
+    def dispatch(self, name: str, args: Optional[Sequence[Any]] = None, kwargs: Optional[Dict[str, Any]] = None, **options: Any) -> str:
+        """Publish ``name`` and return its id without waiting (sync callers)."""
+        # through the task itself when it is known, so its apply_async (e.g. coalescing) applies
+        task = self._task(name)
+        if self.app.conf.task_always_eager:
+            if task is None:
+                raise NotRegistered(name)
+            result = task.apply_async(args, kwargs, **options)
+            if isinstance(result, EagerResult):
+                self._eager[result.id] = result
+            return result.id
+        with self.app.producer_or_acquire() as producer:
+            if task is not None:
+                return task.apply_async(args, kwargs, producer=producer, **options).id
+            return self.app.send_task(name, args=args, kwargs=kwargs, producer=producer, **options).id
+
+    async def submit(self, name: str, args: Optional[Sequence[Any]] = None, kwargs: Optional[Dict[str, Any]] = None, **options: Any) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(self.dispatch, name, args, kwargs, **options))
+
+    async def result(self, task_id: str, timeout: Optional[float] = None, propagate: bool = True) -> Any:
+        """Wait for ``task_id`` to finish; raises its exception (``propagate``) or ``TaskResultTimeout``."""
+        timeout = settings.celery_result_wait_timeout_seconds if timeout is None else timeout
+        eager = self._eager.pop(task_id, None)
+        if eager is not None:
+            return eager.get(propagate=propagate)
+        if not isinstance(self.app.backend, RedisBackend):
+            loop = asyncio.get_running_loop()
+            pending = AsyncResult(task_id, app=self.app)
+            try:
+                return await loop.run_in_executor(self._executor, partial(pending.get, timeout=timeout, propagate=propagate))
+            except CeleryTimeoutError:
+                raise TaskResultTimeout(task_id, timeout) from None
+        meta = await self._wait(task_id, timeout)
+        result = meta["result"]
+        if meta["status"] in states.PROPAGATE_STATES:
+            exc = self.app.backend.exception_to_python(result)
+            if propagate:
+                raise exc
+            return exc
+        return result
+
+    def _redis(self) -> aioredis.Redis:
+        if self._client is None:
+            # raw bytes: payloads are decoded by the backend's serializer
+            pool = aioredis.BlockingConnectionPool.from_url(
+                self.app.conf.result_backend,
+                max_connections=settings.redis_max_connections,
+                timeout=settings.redis_pool_timeout_seconds,
+            )
+            self._client = aioredis.Redis(connection_pool=pool)
+        return self._client
+
+    async def _wait(self, task_id: str, timeout: float) -> Dict[str, Any]:
+        key = self.app.backend.get_key_for_task(task_id).decode()
+        future = asyncio.get_running_loop().create_future()
+        waiters = self._waiters.get(key)
+        first = waiters is None
+        if waiters is None:
+            waiters = self._waiters[key] = set()
+        waiters.add(future)
+        try:
+            if first:
+                await self._subscribe(key)
+            # subscribed (by us or an earlier waiter): anything written from now on is published to us
+            self._resolve(key, await self._redis().get(key))
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise TaskResultTimeout(task_id, timeout) from None
+        finally:
+            waiters.discard(future)
+            if not waiters and self._waiters.get(key) is waiters:
+                del self._waiters[key]
+                try:
+                    async with self._lock:
+                        if self._pubsub is not None:
+                            await self._pubsub.unsubscribe(key)
+                except Exception as exc:
+                    logger.warning(f"Failed to unsubscribe from {key}: {exc}")
+
+    def _resolve(self, key: str, payload: Optional[bytes]) -> None:
+        if payload is None:
+            return
+        meta = self.app.backend.decode_result(payload)
+        # STARTED / RETRY / custom progress states are published too
+        if meta["status"] not in states.READY_STATES:
+            return
+        for future in self._waiters.get(key, ()):
+            if not future.done():
+                future.set_result(meta)
+
+    async def _subscribe(self, key: str) -> None:
+        async with self._lock:
+            if self._pubsub is None:
+                self._pubsub = self._redis().pubsub(ignore_subscribe_messages=True)
+            await self._pubsub.subscribe(key)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self, retry_delay: float = 1.0) -> None:
+        while self._pubsub is not None:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is not None and message["type"] == "message":
+                    self._resolve(message["channel"].decode(), message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                if self._pubsub is None:
+                    return
+                logger.warning(f"Task result listener disconnected, resubscribing: {exc}")
+                await asyncio.sleep(retry_delay)
+                await self._resubscribe()
+
+    async def _resubscribe(self) -> None:
+        async with self._lock:
+            await self._reconnect()
+
+    async def _reconnect(self) -> None:
+        old, self._pubsub = self._pubsub, None
+        if old is not None:
+            try:
+                await old.aclose()
+            except Exception:
+                pass
+        keys = list(self._waiters)
+        if not keys:
+            # the next waiter subscribes and restarts the listener
+            return
+        try:
+            self._pubsub = self._redis().pubsub(ignore_subscribe_messages=True)
+            await self._pubsub.subscribe(*keys)
+            # results written while we were disconnected
+            for key, payload in zip(keys, await self._redis().mget(keys)):
+                self._resolve(key, payload)
+        except Exception as exc:
+            logger.warning(f"Task result listener still unavailable: {exc}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tasks": len(self._waiters),
+            "waiters": sum(len(waiters) for waiters in self._waiters.values()),
+            "listening": self._listener is not None and not self._listener.done(),
+        }
+
+    async def aclose(self) -> None:
+        # clearing the pubsub ends the listener loop even if a read swallows the cancellation
+        pubsub, self._pubsub = self._pubsub, None
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.cancel()
+            try:
+                await listener
+            except asyncio.CancelledError:
+                pass
+        if pubsub is not None:
+            await pubsub.aclose()
+        # a lock belongs to the loop it was first used on
+        self._lock = asyncio.Lock()
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose(close_connection_pool=True)
+
+
+task_gateway = TaskGateway(celery_app, dispatch_workers=settings.celery_dispatch_workers)
@@ -0,0 +1,93 @@
+"""Celery task metrics from signals: run time by task and final state, queue wait by task and queue.
+
+Queue wait is measured from a ``sent_at`` header stamped at publish (or from the
+ETA, when later) to the start of the run, so producer and worker clocks must agree.
+"""
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from celery import signals
+from loguru import logger
+from prometheus_client import CollectorRegistry, start_http_server
+from prometheus_client import multiprocess
+
+from app.core.metrics import CELERY_TASK_QUEUE_WAIT, CELERY_TASK_RUNTIME, MULTIPROCESS, mark_process_dead
+
+SENT_AT_HEADER = "sent_at"
+
+_runtime: Dict[Tuple[str, str], Any] = {}
+_queue_wait: Dict[Tuple[str, str], Any] = {}
+
+
+def _stamp_sent_at(headers: Optional[Dict[str, Any]] = None, **_: Any) -> None:
+    if headers is not None:
+        headers.setdefault(SENT_AT_HEADER, time.time())
+
+
+def _eta_timestamp(eta: Any) -> Optional[float]:
+    if not eta:
+        return None
+    try:
+        return (eta if isinstance(eta, datetime) else datetime.fromisoformat(eta)).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _task_started(task: Any = None, **_: Any) -> None:
+    request = task.request
+    request.metrics_started = time.perf_counter()
+    sent_at = getattr(request, SENT_AT_HEADER, None)
+    if sent_at is None:
+        # eager / direct calls are not published
+        return
+    eta = _eta_timestamp(request.eta)
+    ready_at = max(float(sent_at), eta) if eta is not None else float(sent_at)
+    queue = (request.delivery_info or {}).get("routing_key") or "unknown"
+    key = (task.name, queue)
+    histogram = _queue_wait.get(key)
+    if histogram is None:
+        histogram = _queue_wait[key] = CELERY_TASK_QUEUE_WAIT.labels(*key)
+    histogram.observe(max(0.0, time.time() - ready_at))
+
+
+def _task_finished(task: Any = None, state: Optional[str] = None, **_: Any) -> None:
+    started = getattr(task.request, "metrics_started", None)
+    if started is None:
+        return
+    key = (task.name, state or "UNKNOWN")
+    histogram = _runtime.get(key)
+    if histogram is None:
+        histogram = _runtime[key] = CELERY_TASK_RUNTIME.labels(*key)
+    histogram.observe(time.perf_counter() - started)
+
+
+def _serve(port: int) -> None:
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        start_http_server(port, registry=registry)
+    else:
+        start_http_server(port)
+
+
+def _process_exited(pid: Optional[int] = None, **_: Any) -> None:
+    mark_process_dead(pid or 0)
+
+
+def connect_task_metrics(metrics_port: int = 0) -> None:
+    """Connect the signal handlers; workers also serve their metrics on ``metrics_port`` (0: off)."""
+    signals.before_task_publish.connect(_stamp_sent_at, weak=False)
+    signals.task_prerun.connect(_task_started, weak=False)
+    signals.task_postrun.connect(_task_finished, weak=False)
+    signals.worker_process_shutdown.connect(_process_exited, weak=False)
+    if not metrics_port:
+        return
+
+    def serve(**_: Any) -> None:
+        try:
+            _serve(metrics_port)
+        except OSError as exc:
+            logger.warning(f"Celery metrics not served on port {metrics_port}: {exc}")
+
+    signals.worker_init.connect(serve, weak=False)
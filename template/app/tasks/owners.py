@@ -0,0 +1,45 @@
+"""Which API keys may read a task's result and progress.
+
+Task ids are not secrets: they appear in URLs and logs. Endpoints that hand
+out task ids record the caller as an owner, and endpoints that read a task
+check the owner before anything else::
+
+    task_id = await task_gateway.submit("reports.build", args=[day])
+    await task_owners.add(task_id, api_key_id)
+    ...
+    if not await task_owners.owns(task_id, api_key_id):
+        return 404
+
+A task can have several owners: a coalesced call returns the id of the task
+already running for another caller. Owners expire with the task's result and
+progress state.
+"""
+from app.core.config import settings
+from app.core.redis import get_async_redis
+
+
+class TaskOwners:
+    def __init__(self, prefix: str, ttl: int) -> None:
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def key(self, task_id: str) -> str:
+        return f"{self.prefix}:{task_id}"
+
+    async def add(self, task_id: str, owner: int) -> None:
+        key = self.key(task_id)
+        async with get_async_redis().pipeline(transaction=True) as pipe:
+            pipe.sadd(key, owner)
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+
+    async def owns(self, task_id: str, owner: int) -> bool:
+        # redis-py types the reply as sync-or-awaitable, whichever client it is
+        return bool(await get_async_redis().sismember(self.key(task_id), str(owner)))  # type: ignore[misc]
+
+
+task_owners = TaskOwners(
+    prefix=settings.task_owner_prefix,
+    # as long as anything can still be read about the task
+    ttl=max(settings.celery_result_expires_seconds, settings.task_progress_ttl_seconds),
+)
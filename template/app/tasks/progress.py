@@ -0,0 +1,285 @@
+"""Task progress over Redis pub/sub, for Server-Sent Events.
+
+Worker side::
+
+    @celery_app.task(name="reports.build", base=ProgressTask, bind=True)
+    def build(self, report_id: int) -> None:
+        for i, part in enumerate(parts, 1):
+            ...
+            self.report_progress(i, len(parts), message=part.name)
+
+Every update is stored as the task's latest state (so late subscribers start
+from it) and published on ``{prefix}:{task_id}``; a final event follows when the
+task returns or fails. Updates closer together than ``progress_min_interval``
+are skipped. Progress is best effort: a Redis error is logged, the task goes on.
+Events are ordered by ``(attempt, seq)``: a retried task numbers its updates
+from 1 again, under the next attempt.
+
+Web side: ``progress_broker`` holds one pub/sub connection per process and fans
+each message out to the subscriptions of that task. A subscription is a
+bounded queue of shared, already-encoded events: a slow client loses its
+oldest intermediate updates, never the newest or the final one.
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, NamedTuple, Optional, Set, Tuple
+
+from celery import Task, states
+from loguru import logger
+
+from app.core.config import settings
+from app.core.redis import get_async_redis, pipelined
+
+
+def progress_channel(task_id: str) -> str:
+    return f"{settings.task_progress_prefix}:{task_id}"
+
+
+def progress_key(task_id: str) -> str:
+    return f"{settings.task_progress_prefix}:{task_id}:latest"
+
+
+def publish_progress(task_id: str, event: Dict[str, Any]) -> None:
+    payload = json.dumps(event, separators=(",", ":"), default=str)
+    try:
+        pipelined([
+            ("SET", progress_key(task_id), payload, "EX", settings.task_progress_ttl_seconds),
+            ("PUBLISH", progress_channel(task_id), payload),
+        ])
+    except Exception as exc:
+        logger.warning(f"Failed to publish progress for task {task_id}: {exc}")
+
+
+class ProgressTask(Task):
+    progress_min_interval = settings.task_progress_min_interval_seconds
+
+    def report_progress(self, current: float, total: Optional[float] = None, message: Optional[str] = None, **extra: Any) -> bool:
+        """Publish an update; returns False when throttled or not running as a task."""
+        request = self.request
+        if request.id is None:
+            return False
+        now = time.monotonic()
+        # per-invocation state lives on the request: the task instance is shared
+        last = getattr(request, "progress_at", None)
+        if last is not None and now - last < self.progress_min_interval and (total is None or current < total):
+            return False
+        request.progress_at = now
+        request.progress_seq = getattr(request, "progress_seq", 0) + 1
+        event = {
+            "task_id": request.id,
+            "attempt": request.retries or 0,
+            "seq": request.progress_seq,
+            "state": "PROGRESS",
+            "current": current,
+            "total": total,
+            "percent": round(current * 100 / total, 1) if total else None,
+            "message": message,
+            "final": False,
+            **extra,
+        }
+        publish_progress(request.id, event)
+        return True
+
+    def after_return(self, status: str, retval: Any, task_id: str, args: Any, kwargs: Any, einfo: Any) -> None:
+        event = {
+            "task_id": task_id,
+            "attempt": self.request.retries or 0,
+            "seq": getattr(self.request, "progress_seq", 0) + 1,
+            "state": status,
+            # a retry is not the end of the stream
+            "final": status in states.READY_STATES,
+        }
+        if status == states.FAILURE:
+            event["message"] = f"{type(retval).__name__}: {retval}"
+        publish_progress(task_id, event)
+        super().after_return(status, retval, task_id, args, kwargs, einfo)
+
+
+class ProgressEvent(NamedTuple):
+    attempt: int
+    seq: int
+    final: bool
+    data: str
+
+    @property
+    def id(self) -> str:
+        return f"{self.attempt}.{self.seq}"
+
+
+class ProgressSubscription:
+    __slots__ = ("_events", "_ready", "_last", "dropped")
+
+    def __init__(self, queue_size: int) -> None:
+        self._events: Deque[ProgressEvent] = deque(maxlen=queue_size)
+        self._ready = asyncio.Event()
+        self._last: Tuple[int, int] = (0, 0)
+        self.dropped = 0
+
+    def push(self, event: ProgressEvent) -> None:
+        # the stored latest state and the live message can both deliver the same update
+        position = (event.attempt, event.seq)
+        if position <= self._last:
+            return
+        self._last = position
+        if len(self._events) == self._events.maxlen:
+            self.dropped += 1
+        self._events.append(event)
+        self._ready.set()
+
+    async def next(self, timeout: float) -> Optional[ProgressEvent]:
+        """The oldest queued event, or None after ``timeout`` seconds without one."""
+        if not self._events:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._events.popleft()
+
+
+def _parse(data: str) -> Optional[ProgressEvent]:
+    try:
+        event = json.loads(data)
+        return ProgressEvent(int(event.get("attempt", 0)), int(event.get("seq", 0)), bool(event.get("final")), data)
+    except (ValueError, TypeError, AttributeError):
+        logger.warning(f"Ignoring malformed progress message: {data[:200]!r}")
+        return None
+
+
+class ProgressStreamsFull(RuntimeError):
+    """Raised when the process already follows ``max_streams`` progress streams."""
+
+
+class ProgressBroker:
+    def __init__(self, queue_size: int, max_streams: int = 1000) -> None:
+        self.queue_size = queue_size
+        self.max_streams = max_streams
+        self._streams = 0
+        self._pubsub: Optional[Any] = None
+        self._listener: Optional[asyncio.Task] = None
+        # concurrent first subscribes would each take a connection from the shared pool
+        self._lock = asyncio.Lock()
+        # channel -> subscriptions of connected clients
+        self._subscribers: Dict[str, Set[ProgressSubscription]] = {}
+
+    def full(self) -> bool:
+        return self._streams >= self.max_streams
+
+    @asynccontextmanager
+    async def subscribe(self, task_id: str) -> AsyncIterator[ProgressSubscription]:
+        if self.full():
+            raise ProgressStreamsFull(f"already following {self._streams} progress streams")
+        self._streams += 1
+        channel = progress_channel(task_id)
+        subscription = ProgressSubscription(self.queue_size)
+        subscribers = self._subscribers.get(channel)
+        first = subscribers is None
+        if subscribers is None:
+            subscribers = self._subscribers[channel] = set()
+        subscribers.add(subscription)
+        try:
+            if first:
+                await self._subscribe(channel)
+            # subscribed first, so nothing published after this read is missed
+            latest = await get_async_redis().get(progress_key(task_id))
+            event = _parse(latest) if latest is not None else None
+            if event is not None:
+                subscription.push(event)
+            yield subscription
+        finally:
+            self._streams -= 1
+            subscribers.discard(subscription)
+            if not subscribers and self._subscribers.get(channel) is subscribers:
+                del self._subscribers[channel]
+                try:
+                    async with self._lock:
+                        if self._pubsub is not None:
+                            await self._pubsub.unsubscribe(channel)
+                except Exception as exc:
+                    logger.warning(f"Failed to unsubscribe from {channel}: {exc}")
+
+    def _fan_out(self, channel: str, data: str) -> None:
+        subscribers = self._subscribers.get(channel)
+        if not subscribers:
+            return
+        event = _parse(data)
+        if event is None:
+            return
+        for subscription in subscribers:
+            subscription.push(event)
+
+    async def _subscribe(self, channel: str) -> None:
+        async with self._lock:
+            if self._pubsub is None:
+                self._pubsub = get_async_redis().pubsub(ignore_subscribe_messages=True)
+            await self._pubsub.subscribe(channel)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self, retry_delay: float = 1.0) -> None:
+        while self._pubsub is not None:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is not None and message["type"] == "message":
+                    self._fan_out(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                if self._pubsub is None:
+                    return
+                logger.warning(f"Task progress listener disconnected, resubscribing: {exc}")
+                await asyncio.sleep(retry_delay)
+                await self._resubscribe()
+
+    async def _resubscribe(self) -> None:
+        async with self._lock:
+            await self._reconnect()
+
+    async def _reconnect(self) -> None:
+        old, self._pubsub = self._pubsub, None
+        if old is not None:
+            try:
+                await old.aclose()
+            except Exception:
+                pass
+        channels = list(self._subscribers)
+        if not channels:
+            # the next subscriber reconnects and restarts the listener
+            return
+        try:
+            self._pubsub = get_async_redis().pubsub(ignore_subscribe_messages=True)
+            await self._pubsub.subscribe(*channels)
+            # updates published while we were disconnected: the latest state is enough
+            for channel, latest in zip(channels, await get_async_redis().mget([f"{channel}:latest" for channel in channels])):
+                if latest is not None:
+                    self._fan_out(channel, latest)
+        except Exception as exc:
+            logger.warning(f"Task progress listener still unavailable: {exc}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tasks": len(self._subscribers),
+            "streams": self._streams,
+            "listening": self._listener is not None and not self._listener.done(),
+        }
+
+    async def aclose(self) -> None:
+        # clearing the pubsub ends the listener loop even if a read swallows the cancellation
+        pubsub, self._pubsub = self._pubsub, None
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.cancel()
+            try:
+                await listener
+            except asyncio.CancelledError:
+                pass
+        if pubsub is not None:
+            await pubsub.aclose()
+        # a lock belongs to the loop it was first used on
+        self._lock = asyncio.Lock()
+
+
+progress_broker = ProgressBroker(queue_size=settings.task_progress_queue_size, max_streams=settings.task_progress_max_streams)
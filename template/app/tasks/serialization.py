@@ -0,0 +1,217 @@
+"""``compact`` kombu serializer: msgpack, optional compression, claim-check offloading.
+
+Wire format: one flag byte, then the body.
+
+- ``FLAG_ZLIB`` / ``FLAG_LZ4``: the body is compressed (only above ``compress_threshold``)
+- ``FLAG_CLAIM``: the body is a reference (``redis:<sha256>`` / ``file:<sha256>``) to the
+  stored, possibly compressed, payload
+
+Payloads above ``claim_threshold`` are stored once, keyed by content hash, and
+only the reference travels through the broker / result backend. Stored
+payloads are not deleted on read (messages can be redelivered, results read
+twice): Redis entries expire after ``ttl``; clean the claim-check directory by age.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import uuid
+import zlib
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Optional, cast
+
+import msgpack
+from kombu.serialization import register
+from loguru import logger
+
+from app.core.config import settings
+from app.core.redis import get_raw_redis
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # optional extra: poetry install -E lz4
+    lz4_frame = None
+
+
+SERIALIZER_NAME = "compact"
+CONTENT_TYPE = "application/x-compact"
+
+FLAG_ZLIB = 0x01
+FLAG_LZ4 = 0x02
+FLAG_CLAIM = 0x04
+
+# references arrive in message bodies: anything but a sha256 digest could name another key or file
+_DIGEST = re.compile(r"[0-9a-f]{64}")
+
+_EXT_DATETIME = 1
+_EXT_DATE = 2
+_EXT_TIME = 3
+_EXT_UUID = 4
+_EXT_DECIMAL = 5
+
+
+def _default(obj: Any) -> Any:
+    # same extra types kombu's json serializer understands
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(_EXT_DATETIME, obj.isoformat().encode())
+    if isinstance(obj, date):
+        return msgpack.ExtType(_EXT_DATE, obj.isoformat().encode())
+    if isinstance(obj, dt_time):
+        return msgpack.ExtType(_EXT_TIME, obj.isoformat().encode())
+    if isinstance(obj, uuid.UUID):
+        return msgpack.ExtType(_EXT_UUID, obj.bytes)
+    if isinstance(obj, Decimal):
+        return msgpack.ExtType(_EXT_DECIMAL, str(obj).encode())
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not msgpack serializable")
+
+
+def _ext_hook(code: int, data: bytes) -> Any:
+    if code == _EXT_DATETIME:
+        return datetime.fromisoformat(data.decode())
+    if code == _EXT_DATE:
+        return date.fromisoformat(data.decode())
+    if code == _EXT_TIME:
+        return dt_time.fromisoformat(data.decode())
+    if code == _EXT_UUID:
+        return uuid.UUID(bytes=data)
+    if code == _EXT_DECIMAL:
+        return Decimal(data.decode())
+    return msgpack.ExtType(code, data)
+
+
+def _checked(digest: str) -> str:
+    if not _DIGEST.fullmatch(digest):
+        raise ValueError(f"malformed claim-check reference {digest[:80]!r}")
+    return digest
+
+
+class RedisClaimStore:
+    def __init__(self, client: Optional[Callable[[], Any]] = None, prefix: str = "claim", ttl: int = 86400) -> None:
+        self._client = client or get_raw_redis
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def put(self, digest: str, data: bytes) -> str:
+        # content-addressed: an identical payload is stored once
+        self._client().set(f"{self.prefix}:{digest}", data, ex=self.ttl, nx=True)
+        return f"redis:{digest}"
+
+    def get(self, digest: str) -> bytes:
+        data = self._client().get(f"{self.prefix}:{_checked(digest)}")
+        if data is None:
+            raise LookupError(f"claim-check payload {digest} expired or missing")
+        return cast(bytes, data)
+
+
+class FileClaimStore:
+    """Payloads as files in a directory every producer and worker can read (shared volume)."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = Path(directory)
+
+    def put(self, digest: str, data: bytes) -> str:
+        path = self.directory / digest
+        if not path.exists():
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # write-then-rename so readers never see a partial file
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return f"file:{digest}"
+
+    def get(self, digest: str) -> bytes:
+        try:
+            return (self.directory / _checked(digest)).read_bytes()
+        except FileNotFoundError:
+            raise LookupError(f"claim-check payload {digest} missing") from None
+
+
+class CompactSerializer:
+    def __init__(
+        self,
+        compression: str = "zlib",
+        compress_threshold: int = 1024,
+        claim_threshold: int = 0,
+        store: Any = None,
+        zlib_level: int = 6,
+    ) -> None:
+        if compression == "lz4" and lz4_frame is None:
+            logger.warning("lz4 is not installed, compressing Celery payloads with zlib")
+            compression = "zlib"
+        if compression not in ("zlib", "lz4", "none"):
+            raise ValueError(f"unknown compression {compression!r}")
+        self.compression = compression
+        self.compress_threshold = compress_threshold
+        # 0 disables claim-check offloading
+        self.claim_threshold = claim_threshold
+        self.store = store
+        self.zlib_level = zlib_level
+
+    def dumps(self, obj: Any) -> bytes:
+        body = msgpack.packb(obj, default=_default, use_bin_type=True, datetime=False)
+        flags = 0
+        if self.compression != "none" and len(body) >= self.compress_threshold:
+            if self.compression == "lz4":
+                packed, flag = lz4_frame.compress(body), FLAG_LZ4
+            else:
+                packed, flag = zlib.compress(body, self.zlib_level), FLAG_ZLIB
+            # incompressible data is sent as is
+            if len(packed) < len(body):
+                body, flags = packed, flag
+        if self.claim_threshold and self.store is not None and len(body) >= self.claim_threshold:
+            reference = self.store.put(hashlib.sha256(body).hexdigest(), body)
+            body, flags = reference.encode(), flags | FLAG_CLAIM
+        return bytes((flags,)) + body
+
+    def loads(self, data: Any) -> Any:
+        data = bytes(data)
+        flags, body = data[0], data[1:]
+        if flags & FLAG_CLAIM:
+            kind, _, digest = body.decode().partition(":")
+            body = self._store_for(kind).get(digest)
+        if flags & FLAG_LZ4:
+            if lz4_frame is None:
+                raise RuntimeError("received an lz4-compressed payload but lz4 is not installed")
+            body = lz4_frame.decompress(body)
+        elif flags & FLAG_ZLIB:
+            body = zlib.decompress(body)
+        return msgpack.unpackb(body, ext_hook=_ext_hook, raw=False, strict_map_key=False)
+
+    def _store_for(self, kind: str) -> Any:
+        # a worker configured for one backend can still read the other's references
+        if self.store is not None and kind == _kind(self.store):
+            return self.store
+        if kind == "redis":
+            return RedisClaimStore(prefix=settings.celery_claim_check_prefix, ttl=settings.celery_claim_check_ttl_seconds)
+        if kind == "file":
+            return FileClaimStore(settings.celery_claim_check_dir)
+        raise ValueError(f"unknown claim-check reference {kind!r}")
+
+
+def _kind(store: Any) -> str:
+    return "file" if isinstance(store, FileClaimStore) else "redis"
+
+
+def serializer_from_settings() -> CompactSerializer:
+    store: Any = None
+    if settings.celery_claim_check_backend == "redis":
+        store = RedisClaimStore(prefix=settings.celery_claim_check_prefix, ttl=settings.celery_claim_check_ttl_seconds)
+    elif settings.celery_claim_check_backend == "file":
+        store = FileClaimStore(settings.celery_claim_check_dir)
+    return CompactSerializer(
+        compression=settings.celery_compression,
+        compress_threshold=settings.celery_compression_threshold_bytes,
+        claim_threshold=settings.celery_claim_check_threshold_bytes if store is not None else 0,
+        store=store,
+    )
+
+
+def register_compact_serializer(serializer: Optional[CompactSerializer] = None) -> CompactSerializer:
+    serializer = serializer or serializer_from_settings()
+    register(SERIALIZER_NAME, serializer.dumps, serializer.loads, content_type=CONTENT_TYPE, content_encoding="binary")
+    return serializer
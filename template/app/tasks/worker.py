@@ -0,0 +1,80 @@
+"""Start a Celery worker for one of the queue profiles.
+
+    poetry run python -m app.tasks.worker fast
+    poetry run python -m app.tasks.worker heavy --concurrency 8   # extra args go to ``celery worker``
+
+Queues get their own workers so a burst of heavy jobs cannot hold the slots
+(or the prefetched messages) that latency-sensitive tasks need. Which task goes
+to which queue is ``TASK_ROUTES`` in ``app/tasks/celery.py``.
+"""
+import os
+import sys
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.tasks.celery import QUEUE_DEFAULT, QUEUE_FAST, QUEUE_HEAVY, celery_app
+
+
+@dataclass(frozen=True)
+class WorkerProfile:
+    queues: Tuple[str, ...]
+    pool: str
+    concurrency: int
+    prefetch_multiplier: int
+    # ack after the task ran: a job whose worker died is redelivered (tasks must be idempotent)
+    acks_late: bool
+    max_tasks_per_child: Optional[int] = None
+
+
+_CPUS = os.cpu_count() or 1
+
+WORKER_PROFILES: Dict[str, WorkerProfile] = {
+    # short, I/O-bound tasks: plenty of threads, a few messages prefetched per slot
+    "fast": WorkerProfile((QUEUE_FAST,), pool="threads", concurrency=16, prefetch_multiplier=4, acks_late=False),
+    "default": WorkerProfile((QUEUE_DEFAULT,), pool="prefork", concurrency=_CPUS, prefetch_multiplier=4, acks_late=False),
+    # one message per process at a time, so a queued job waits for the first free
+    # process instead of sitting behind a long one in another process's prefetch
+    "heavy": WorkerProfile(
+        (QUEUE_HEAVY,), pool="prefork", concurrency=_CPUS, prefetch_multiplier=1, acks_late=True, max_tasks_per_child=100,
+    ),
+    # every queue in one worker (development)
+    "all": WorkerProfile(
+        (QUEUE_FAST, QUEUE_DEFAULT, QUEUE_HEAVY), pool="prefork", concurrency=_CPUS, prefetch_multiplier=1, acks_late=False,
+    ),
+}
+
+
+def worker_argv(name: str, extra: Sequence[str] = ()) -> List[str]:
+    profile = WORKER_PROFILES[name]
+    argv = [
+        "worker",
+        f"--hostname={name}@%h",
+        f"--queues={','.join(profile.queues)}",
+        f"--pool={profile.pool}",
+        f"--concurrency={profile.concurrency}",
+        f"--prefetch-multiplier={profile.prefetch_multiplier}",
+        "--loglevel=INFO",
+    ]
+    if profile.max_tasks_per_child:
+        argv.append(f"--max-tasks-per-child={profile.max_tasks_per_child}")
+    # later options win, so extra args override the profile
+    return argv + list(extra)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] not in WORKER_PROFILES:
+        raise SystemExit(f"usage: python -m app.tasks.worker {{{'|'.join(WORKER_PROFILES)}}} [celery worker options]")
+    name, extra = argv[0], argv[1:]
+    profile = WORKER_PROFILES[name]
+    # read by the tasks when the app is finalized, i.e. in the worker; must be set before that
+    celery_app.conf.update(
+        task_acks_late=profile.acks_late,
+        task_reject_on_worker_lost=profile.acks_late,
+        worker_prefetch_multiplier=profile.prefetch_multiplier,
+    )
+    celery_app.worker_main(worker_argv(name, extra))
+
+
+if __name__ == "__main__":
+    main()
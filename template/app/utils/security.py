@@ -1,8 +1,20 @@
+import asyncio
+import base64
+import binascii
 import hashlib
+import hmac
+import json
+import threading
+import time
 import bcrypt
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Any, Optional
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
 from jose import jwt
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError, JWTError
+
+from app.core.config import settings
+from app.utils.cache import TTLCache
 
 
 JWT_ALG = "HS256"
@@ -10,18 +22,24 @@ JWT_SECRET = "CHANGE_ME_SECRET"
 # Token validity: 30 days
 JWT_EXPIRE_MINUTES = 60 * 24 * 30
 
+R = TypeVar('R')
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when the password hashing pool already has ``password_hash_max_pending`` jobs."""
+
 
 def _pre_hash_password(password: str) -> bytes:
     """Pre-hash password with SHA256 to ensure it's always under bcrypt's 72-byte limit."""
     return hashlib.sha256(password.encode('utf-8')).digest()
 
 
-def hash_password(password: str) -> str:
+def hash_password(password: str, rounds: Optional[int] = None) -> str:
     """Hash a password using SHA256 + bcrypt to handle passwords longer than 72 bytes."""
     # Pre-hash with SHA256 to get a fixed 32-byte hash (well under bcrypt's 72-byte limit)
     pre_hashed = _pre_hash_password(password)
     # Use bcrypt to hash the pre-hashed password
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds or settings.bcrypt_rounds)
     hashed = bcrypt.hashpw(pre_hashed, salt)
     # Return as string (bcrypt returns bytes)
     return hashed.decode('utf-8')
@@ -38,13 +56,145 @@ def verify_password(plain_password: str, password_hash: str) -> bool:
         return False
 
 
+def _bcrypt_cost(password_hash: str) -> Optional[int]:
+    # $2b$12$<salt+hash>
+    parts = password_hash.split("$")
+    if len(parts) < 4:
+        return None
+    try:
+        return int(parts[2])
+    except ValueError:
+        return None
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """True when the hash was made with a different cost than ``settings.bcrypt_rounds``."""
+    return _bcrypt_cost(password_hash) != settings.bcrypt_rounds
+
+
+def verify_and_update(plain_password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password and return a replacement hash when the stored cost is outdated."""
+    if not verify_password(plain_password, password_hash):
+        return False, None
+    if needs_rehash(password_hash):
+        return True, hash_password(plain_password)
+    return True, None
+
+
+# bcrypt releases the GIL while hashing, so a small dedicated thread pool keeps
+# the event loop and the anyio threadpool free without process start-up costs
+_hash_executor = ThreadPoolExecutor(max_workers=settings.password_hash_workers, thread_name_prefix="password-hash")
+_hash_slots = threading.BoundedSemaphore(settings.password_hash_max_pending)
+
+
+async def _run_in_hash_pool(fn: Callable[..., R], *args: Any) -> R:
+    if not _hash_slots.acquire(blocking=False):
+        raise PasswordHasherBusy("Password hashing queue is full")
+    try:
+        future = _hash_executor.submit(fn, *args)
+    except BaseException:
+        _hash_slots.release()
+        raise
+    # free the slot when the job really finishes, even if the awaiting request is cancelled
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return await asyncio.wrap_future(future)
+
+
+async def async_hash_password(password: str) -> str:
+    return await _run_in_hash_pool(hash_password, password)
+
+
+async def async_verify_password(plain_password: str, password_hash: str) -> bool:
+    return await _run_in_hash_pool(verify_password, plain_password, password_hash)
+
+
+async def async_verify_and_update(plain_password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+    return await _run_in_hash_pool(verify_and_update, plain_password, password_hash)
+
+
 def create_access_token(subject: str, expires_delta: Optional[timedelta] = None) -> str:
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=JWT_EXPIRE_MINUTES))
     to_encode: dict[str, Any] = {"sub": subject, "exp": expire}
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALG)
 
 
-def decode_access_token(token: str) -> dict[str, Any]:
+def _decode_jose(token: str) -> dict[str, Any]:
     return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
 
 
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+_JWT_SECRET_BYTES = JWT_SECRET.encode("utf-8")
+
+
+def _decode_native(token: str) -> dict[str, Any]:
+    """HS256-only verifier on hmac/hashlib; raises the same jose exceptions as ``_decode_jose``."""
+    try:
+        header_b64, payload_b64, signature_b64 = token.split(".")
+        header = json.loads(_b64url_decode(header_b64))
+        signature = _b64url_decode(signature_b64)
+        # non-ASCII segments are malformed, not a server error
+        signing_input = f"{header_b64}.{payload_b64}".encode("ascii")
+    except (ValueError, UnicodeError, binascii.Error):
+        raise JWTError("Invalid token")
+    if not isinstance(header, dict) or header.get("alg") != JWT_ALG:
+        raise JWTError("The specified alg value is not allowed")
+    expected = hmac.new(_JWT_SECRET_BYTES, signing_input, hashlib.sha256).digest()
+    if not hmac.compare_digest(expected, signature):
+        raise JWTError("Signature verification failed.")
+    try:
+        claims = json.loads(_b64url_decode(payload_b64))
+    except Exception:
+        raise JWTError("Invalid payload string")
+    if not isinstance(claims, dict):
+        raise JWTError("Invalid payload string: must be a json object")
+
+    now = time.time()
+    for name in ("exp", "nbf", "iat"):
+        if name in claims and not isinstance(claims[name], (int, float)):
+            raise JWTClaimsError(f"{name} claim must be an integer")
+    if "sub" in claims and not isinstance(claims["sub"], str):
+        raise JWTClaimsError("Subject must be a string.")
+    if "jti" in claims and not isinstance(claims["jti"], str):
+        raise JWTClaimsError("JWT ID must be a string.")
+    if "exp" in claims and claims["exp"] < now:
+        raise ExpiredSignatureError("Signature has expired.")
+    if "nbf" in claims and claims["nbf"] > now:
+        raise JWTClaimsError("The token is not yet valid (nbf)")
+    if "aud" in claims:
+        # jose rejects audience-bound tokens when no audience is expected
+        raise JWTClaimsError("Invalid audience")
+    return claims
+
+
+_JWT_DECODERS: Dict[str, Callable[[str], dict[str, Any]]] = {
+    "jose": _decode_jose,
+    "native": _decode_native,
+}
+_decode_verified = _JWT_DECODERS[settings.jwt_backend]
+
+# verified claims keyed by token digest; entries never outlive the token's exp
+_claims_cache: TTLCache[dict[str, Any]] = TTLCache(
+    maxsize=settings.jwt_cache_size,
+    ttl=settings.jwt_cache_ttl_seconds,
+)
+
+
+def decode_access_token(token: str) -> dict[str, Any]:
+    cache_key = hashlib.sha256(token.encode("utf-8")).digest()
+    claims = _claims_cache.get(cache_key)
+    if claims is not None:
+        return dict(claims)
+    claims = _decode_verified(token)
+    exp = claims.get("exp")
+    ttl = exp - time.time() if isinstance(exp, (int, float)) else None
+    _claims_cache.set(cache_key, claims, ttl=ttl)
+    return dict(claims)
+
+
+def jwt_cache_stats() -> Dict[str, Any]:
+    return _claims_cache.stats()
+
+
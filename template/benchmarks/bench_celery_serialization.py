@@ -0,0 +1,91 @@
+"""Compare Celery payload encodings: kombu json vs the compact serializer.
+
+For task payloads of 1 KB to 10 MB, prints encode+decode throughput and the
+bytes each message puts on the broker (plus, with claim-check, the bytes
+stored beside it).
+
+    poetry run python -m benchmarks.bench_celery_serialization
+"""
+import random
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from kombu.serialization import dumps, loads
+
+from app.tasks.serialization import CompactSerializer, FileClaimStore, lz4_frame
+
+SIZES = (1 << 10, 10 << 10, 100 << 10, 1 << 20, 10 << 20)
+WORDS = ["order", "user", "shipped", "pending", "refund", "invoice", "warehouse", "priority"]
+
+
+def make_payload(size: int) -> Tuple[Tuple[Any, ...], Dict[str, Any], Dict[str, Any]]:
+    # Celery's (args, kwargs, embed) body with semi-realistic records
+    rng = random.Random(size)
+    rows: List[Dict[str, Any]] = []
+    approx = 0
+    while approx < size:
+        row = {
+            "id": len(rows),
+            "status": rng.choice(WORDS),
+            "amount": round(rng.random() * 1000, 2),
+            "note": " ".join(rng.choice(WORDS) for _ in range(6)),
+            "created_at": datetime(2024, 1, 1, 12, 0, 0).isoformat(),
+        }
+        rows.append(row)
+        approx += 110
+    return (rows,), {}, {"callbacks": None, "errbacks": None, "chain": None, "chord": None}
+
+
+def _best_of(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    claim_dir = tempfile.mkdtemp(prefix="bench-claims-")
+    candidates: List[Tuple[str, Any]] = [
+        ("json", None),
+        ("compact", CompactSerializer(compression="none")),
+        ("compact+zlib", CompactSerializer(compression="zlib")),
+    ]
+    if lz4_frame is not None:
+        candidates.append(("compact+lz4", CompactSerializer(compression="lz4")))
+    candidates.append((
+        "compact+zlib+claim",
+        CompactSerializer(compression="zlib", claim_threshold=256 << 10, store=FileClaimStore(claim_dir)),
+    ))
+
+    for size in SIZES:
+        body = make_payload(size)
+        repeat = 20 if size <= 100 << 10 else 3
+        print(f"payload ~{size >> 10:>6} KB")
+        for name, serializer in candidates:
+            if serializer is None:
+                def roundtrip() -> Any:
+                    _, _, data = dumps(body, serializer="json")
+                    return loads(data, "application/json", "utf-8")
+                message = dumps(body, serializer="json")[2]
+            else:
+                def roundtrip() -> Any:
+                    return serializer.loads(serializer.dumps(body))
+                message = serializer.dumps(body)
+            stored = sum(p.stat().st_size for p in Path(claim_dir).iterdir())
+            seconds = _best_of(roundtrip, repeat)
+            broker = len(message.encode() if isinstance(message, str) else message)
+            print(
+                f"  {name:<20} {size / seconds / 1e6:8.1f} MB/s  broker {broker:>10} B"
+                + (f"  stored {stored:>9} B" if name.endswith("claim") else "")
+            )
+            for p in Path(claim_dir).iterdir():
+                p.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Compare JWT verification paths.
+
+    poetry run python -m benchmarks.bench_jwt
+"""
+import timeit
+
+from app.utils import security
+from app.utils.security import _claims_cache, _decode_jose, _decode_native, create_access_token, decode_access_token
+
+
+def main(number: int = 20000) -> None:
+    token = create_access_token("user:42")
+    assert _decode_jose(token) == _decode_native(token)
+
+    cases = {
+        "jose (uncached)": lambda: _decode_jose(token),
+        "native (uncached)": lambda: _decode_native(token),
+        "decode_access_token (cached)": lambda: decode_access_token(token),
+    }
+    _claims_cache.clear()
+    decode_access_token(token)
+    for name, fn in cases.items():
+        seconds = min(timeit.repeat(fn, number=number, repeat=3))
+        print(f"{name:<32} {seconds / number * 1e6:8.2f} us/op")
+    print(f"backend={security.settings.jwt_backend} cache={security.jwt_cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
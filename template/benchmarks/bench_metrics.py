@@ -0,0 +1,78 @@
+"""Per-request cost of MetricsMiddleware, against a bare ASGI app, and of a flush.
+
+Set PROMETHEUS_MULTIPROC_DIR to an empty directory to measure the multiprocess
+(mmap-backed) value store instead of the in-memory one.
+
+    poetry run python -m benchmarks.bench_metrics
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict
+
+from app.core.metrics import HTTP_REQUEST_DURATION, MULTIPROCESS, BufferedHistogram, flush
+from app.middleware.metrics import MetricsMiddleware
+
+ROUTE = SimpleNamespace(path_format="/api/v1/items/{item_id}")
+START = {"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]}
+BODY = {"type": "http.response.body", "body": b"{}"}
+
+
+async def endpoint(scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+    # what the router does: record the matched route in the scope
+    scope["route"] = ROUTE
+    await send(START)
+    await send(BODY)
+
+
+async def receive() -> Dict[str, Any]:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message: Dict[str, Any]) -> None:
+    pass
+
+
+async def _per_request(app: Callable, n: int) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        await app({"type": "http", "method": "GET", "path": f"/api/v1/items/{i}"}, receive, send)
+    return (time.perf_counter() - start) / n
+
+
+async def _best_of(app: Callable, n: int, repeat: int = 5) -> float:
+    return min([await _per_request(app, n) for _ in range(repeat)])
+
+
+async def main() -> None:
+    n = 100_000
+    wrapped = MetricsMiddleware(endpoint)
+    untracked = MetricsMiddleware(endpoint, track_in_progress=False)
+    await _per_request(wrapped, 1000)
+    bare = await _best_of(endpoint, n)
+    full = await _best_of(wrapped, n)
+    histogram_only = await _best_of(untracked, n)
+    child = HTTP_REQUEST_DURATION.labels("GET", "/bench", "200")
+    buffered = BufferedHistogram(HTTP_REQUEST_DURATION.labels("GET", "/bench-buffered", "200"))
+    start = time.perf_counter()
+    for _ in range(n):
+        child.observe(0.0123)
+    observe = (time.perf_counter() - start) / n
+    start = time.perf_counter()
+    for _ in range(n):
+        buffered.observe(0.0123)
+    buffered_observe = (time.perf_counter() - start) / n
+    start = time.perf_counter()
+    flush()
+    flushed = time.perf_counter() - start
+    print(f"value store: {'multiprocess (mmap)' if MULTIPROCESS else 'in-process'}")
+    print(f"bare app                 {bare * 1e6:6.2f} us/request")
+    print(f"+ metrics                {full * 1e6:6.2f} us/request  (+{(full - bare) * 1e6:.2f} us)")
+    print(f"+ metrics, no in-progress {histogram_only * 1e6:5.2f} us/request  (+{(histogram_only - bare) * 1e6:.2f} us)")
+    print(f"Histogram.observe        {observe * 1e6:6.2f} us")
+    print(f"BufferedHistogram.observe {buffered_observe * 1e6:5.2f} us")
+    print(f"flush (all buffers)      {flushed * 1e3:6.2f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+"""Fast-queue latency while the heavy queue is saturated: one shared worker vs per-queue workers.
+
+Uses the broker / result backend from the environment (a running Redis) and
+starts its own workers with ``app.tasks.worker``; stop other workers first.
+
+    poetry run python -m benchmarks.bench_queue_latency
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Sequence
+
+from app.tasks.celery import celery_app
+from app.tasks.demo_tasks import crunch, echo
+
+HEAVY_SLOTS = max(2, os.cpu_count() or 1)
+HEAVY_JOBS = HEAVY_SLOTS * 8
+HEAVY_SECONDS = 0.5
+PROBES = 40
+
+SCENARIOS = {
+    "shared worker": [["all", f"--concurrency={HEAVY_SLOTS}"]],
+    "per-queue workers": [["fast"], ["heavy", f"--concurrency={HEAVY_SLOTS}"]],
+}
+
+
+def _start(profiles: Sequence[Sequence[str]]) -> List[subprocess.Popen]:
+    return [
+        subprocess.Popen(
+            [sys.executable, "-m", "app.tasks.worker", *profile, "--loglevel=WARNING", "--without-gossip", "--without-mingle"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        for profile in profiles
+    ]
+
+
+def _stop(workers: Sequence[subprocess.Popen]) -> None:
+    for worker in workers:
+        worker.terminate()
+    for worker in workers:
+        try:
+            worker.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            worker.kill()
+
+
+def _probe(count: int, interval: float = 0.05) -> List[float]:
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        echo.apply_async(args=[str(i)]).get(timeout=120)
+        latencies.append((time.perf_counter() - start) * 1e3)
+        time.sleep(interval)
+    return latencies
+
+
+def _report(label: str, latencies: List[float]) -> None:
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"  {label:<14} p50 {statistics.median(ordered):8.1f} ms  p95 {p95:8.1f} ms  max {ordered[-1]:8.1f} ms")
+
+
+def main() -> None:
+    print(f"{HEAVY_JOBS} heavy jobs x {HEAVY_SECONDS}s on {HEAVY_SLOTS} heavy slots, {PROBES} fast probes")
+    for name, profiles in SCENARIOS.items():
+        celery_app.control.purge()
+        workers = _start(profiles)
+        try:
+            # first round trips also wait for the workers to come up
+            _probe(3, interval=0)
+            print(name)
+            _report("idle", _probe(PROBES))
+            for _ in range(HEAVY_JOBS):
+                crunch.apply_async(args=[HEAVY_SECONDS], ignore_result=True)
+            _report("heavy busy", _probe(PROBES))
+        finally:
+            celery_app.control.purge()
+            _stop(workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Per-call overhead of the repository query builders, fresh vs cached statements.
+
+Runs against in-memory SQLite so the numbers are dominated by Python-side
+statement construction, cache-key generation and compilation lookup.
+
+    poetry run python -m benchmarks.bench_repository
+"""
+import timeit
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.repo.api_key_repository import ApiKeyRepository, hash_api_token
+from app.repo.models import ApiKey
+from app.repo.session import Base
+from app.repo.statements import filter_by_statement
+
+
+def main(number: int = 5000, rows: int = 1000) -> None:
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    db = Session(engine)
+    repo = ApiKeyRepository(db)
+    repo.create_many([{"name": f"key-{i}", "key_hash": hash_api_token(f"token-{i}")} for i in range(rows)])
+    key_hash = hash_api_token(f"token-{rows // 2}")
+
+    def fresh():
+        # the pre-cache implementation of find_one_by
+        return db.execute(select(ApiKey).filter_by(key_hash=key_hash)).scalar_one_or_none()
+
+    # the pre-cache implementations of list_where, exists_where and find_max_of
+    def list_where_fresh():
+        stmt = select(ApiKey).where(ApiKey.is_active.is_(True), ApiKey.id > 10).offset(0).limit(20)
+        return list(db.execute(stmt).scalars().all())
+
+    def exists_where_fresh():
+        return db.execute(select(ApiKey).where(ApiKey.key_hash == key_hash).limit(1)).scalar_one_or_none() is not None
+
+    def find_max_of_fresh():
+        stmt = select(ApiKey).where(ApiKey.is_active.is_(True)).order_by(ApiKey.id.desc()).limit(1)
+        return db.execute(stmt).scalar_one_or_none()
+
+    cases = {
+        "build select (fresh)": lambda: select(ApiKey).filter_by(key_hash=key_hash),
+        "build select (cached)": lambda: filter_by_statement(ApiKey, {"key_hash": key_hash}),
+        "find_one_by (fresh statement)": fresh,
+        "find_one_by (cached statement)": lambda: repo.find_one_by(key_hash=key_hash),
+        "list (cached statement)": lambda: repo.list(offset=10, limit=20, order_by=ApiKey.id),
+        "list_where (fresh statement)": list_where_fresh,
+        "list_where (cached statement)": lambda: repo.list_where(ApiKey.is_active.is_(True), ApiKey.id > 10, limit=20),
+        "exists_where (fresh statement)": exists_where_fresh,
+        "exists_where (cached statement)": lambda: repo.exists_where(ApiKey.key_hash == key_hash),
+        "find_max_of (fresh statement)": find_max_of_fresh,
+        "find_max_of (cached statement)": lambda: repo.find_max_of(ApiKey.id, ApiKey.is_active.is_(True)),
+    }
+    assert fresh() is repo.find_one_by(key_hash=key_hash)
+    assert list_where_fresh() == repo.list_where(ApiKey.is_active.is_(True), ApiKey.id > 10, limit=20)
+    assert find_max_of_fresh() is repo.find_max_of(ApiKey.id, ApiKey.is_active.is_(True))
+    for name, fn in cases.items():
+        fn()
+        seconds = min(timeit.repeat(fn, number=number, repeat=3))
+        print(f"{name:<32} {seconds / number * 1e6:8.2f} us/op")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Compare the single-pass envelope encoder with the previous two-pass one.
+
+    poetry run python -m benchmarks.bench_response
+"""
+import time
+from datetime import datetime
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from app.api.response import success
+
+FMT = "%Y-%m-%d %H:%M:%S"
+
+
+class Row(BaseModel):
+    id: int
+    name: str
+    note: str
+    score: float
+    created_at: datetime
+
+
+def _legacy_reformat(obj: Any) -> Any:
+    # the old second pass: re-parse every string as a datetime
+    if isinstance(obj, dict):
+        return {k: _legacy_reformat(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_legacy_reformat(v) for v in obj]
+    if isinstance(obj, str):
+        s = obj[:-1] + "+00:00" if obj.endswith("Z") else obj
+        try:
+            return datetime.fromisoformat(s).strftime(FMT)
+        except Exception:
+            return obj
+    return obj
+
+
+def legacy_success(data: Any) -> JSONResponse:
+    custom = {datetime: lambda v: v.strftime(FMT)}
+    encoded = [jsonable_encoder(item, custom_encoder=custom) for item in data]
+    payload = _legacy_reformat({"code": 0, "message": "success", "data": encoded})
+    return JSONResponse(content=payload)
+
+
+def _best_of(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    for size in (1_000, 10_000, 100_000):
+        rows = [Row(id=i, name=f"user-{i}", note="some free text", score=i / 3, created_at=now) for i in range(size)]
+        assert legacy_success(rows).body == success(rows).body
+        old = _best_of(lambda: legacy_success(rows))
+        new = _best_of(lambda: success(rows))
+        print(f"{size:>7} rows  legacy {old * 1e3:9.2f} ms  single-pass {new * 1e3:9.2f} ms  x{old / new:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
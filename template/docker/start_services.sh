@@ -61,7 +61,7 @@ if [[ -n "${deps_service}" ]]; then
 fi
 
 # Build web/worker next
-app_services="$(docker compose ${ENV_FILE_OPT} config --services | grep -E '(-web|-worker)$' || true)"
+app_services="$(docker compose ${ENV_FILE_OPT} config --services | grep -E '(-web|-worker(-[a-z]+)?|-beat)$' || true)"
 if [[ -n "${app_services}" ]]; then
   echo "Building app services: ${app_services}"
   # shellcheck disable=SC2086
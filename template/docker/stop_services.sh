@@ -3,7 +3,7 @@ set -euo pipefail
 cd "$(dirname "$0")"
 #
 # Usage:
-#   ./stop_services.sh           # stop only app services (web/worker)
+#   ./stop_services.sh           # stop only app services (web/worker/beat)
 #   ./stop_services.sh --stop-deps  # stop all services including mysql/redis
 #
 
@@ -23,10 +23,10 @@ if [[ "${1-}" == "--stop-deps" ]]; then
   exit 0
 fi
 
-# Stop only app services (web/worker); keep mysql/redis running if they are shared.
-services_to_stop="$(docker compose ${ENV_FILE_OPT} config --services | grep -E '(-web|-worker)$' || true)"
+# Stop only app services (web/worker/beat); keep mysql/redis running if they are shared.
+services_to_stop="$(docker compose ${ENV_FILE_OPT} config --services | grep -E '(-web|-worker(-[a-z]+)?|-beat)$' || true)"
 if [[ -z "${services_to_stop}" ]]; then
-  echo "No app services (web/worker) found. Doing nothing."
+  echo "No app services (web/worker/beat) found. Doing nothing."
   exit 0
 fi
 
@@ -0,0 +1,88 @@
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="__APP_NAME__-test-")
+
+# settings are read at import: keep the tests off the project's MySQL, Redis and broker
+os.environ.update({
+    "MYSQL_URL": f"sqlite:///{_tmp}/test.db",
+    "REDIS_URL": "redis://localhost:6379/15",
+    "CELERY_BROKER_URL": "memory://",
+    "CELERY_RESULT_BACKEND": "cache+memory://",
+    "LOG_DIR": os.path.join(_tmp, "logs"),
+    "LOG_LEVEL": "WARNING",
+})
+
+import secrets
+from typing import Callable, Iterator
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+from fastapi.testclient import TestClient
+
+import app as app_module
+import app.core.redis as app_redis
+from app.repo.api_key_repository import ApiKeyRepository
+from app.repo.session import Base, SessionLocal, engine
+from app.tasks.celery import celery_app
+
+
+@pytest.fixture
+def redis_server(monkeypatch: pytest.MonkeyPatch) -> fakeredis.FakeServer:
+    """One in-memory Redis behind all of ``app.core.redis``'s clients."""
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(app_redis, "_redis", fakeredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(app_redis, "_async_redis", fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(app_redis, "_raw_redis", fakeredis.FakeRedis(server=server))
+    return server
+
+
+@pytest.fixture
+def eager() -> Iterator[None]:
+    celery_app.conf.task_always_eager = True
+    try:
+        yield
+    finally:
+        celery_app.conf.task_always_eager = False
+
+
+@pytest.fixture
+def tables() -> Iterator[None]:
+    Base.metadata.create_all(engine)
+    try:
+        yield
+    finally:
+        Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def client(redis_server, tables, monkeypatch: pytest.MonkeyPatch) -> Iterator[TestClient]:
+    """The app with its background listeners running on the fake Redis."""
+    async def keep_redis() -> None:
+        pass
+
+    monkeypatch.setattr(app_module, "close_redis", keep_redis)
+    with TestClient(app_module.create_app()) as test_client:
+        yield test_client
+
+
+def _make_api_key(name: str = "test") -> tuple[int, str]:
+    """A usable key: (id, plain token)."""
+    token = "ra_" + secrets.token_urlsafe(30)
+    db = SessionLocal()
+    try:
+        return ApiKeyRepository(db).create_with_plain(name, token).id, token
+    finally:
+        db.close()
+        SessionLocal.remove()
+
+
+@pytest.fixture
+def make_api_key(tables) -> Callable[..., tuple[int, str]]:
+    return _make_api_key
+
+
+@pytest.fixture
+def api_key(make_api_key) -> tuple[int, str]:
+    return make_api_key()
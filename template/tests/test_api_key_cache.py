@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Optional
+
+import pytest
+
+import app.utils.cache as cache_module
+from app.core.redis import get_async_redis
+from app.repo.api_key_cache import ApiKeyCache
+from app.repo.models import ApiKey
+
+
+def _cache(ttl: float = 60.0) -> ApiKeyCache:
+    cache = ApiKeyCache(maxsize=10, ttl=ttl, channel="test:api_key:invalidate")
+    cache.listening = True
+    return cache
+
+
+def _key(expires_at: Optional[datetime] = None) -> ApiKey:
+    return ApiKey(id=1, name="k", key_hash="h", scopes="read", expires_at=expires_at)
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> SimpleNamespace:
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_entries_expire_after_the_cache_ttl(clock: SimpleNamespace) -> None:
+    cache = _cache(ttl=60)
+    cache.put("h", _key())
+    clock.now += 59
+    assert cache.get("h").scopes == "read"
+    clock.now += 2
+    assert cache.get("h") is None
+
+
+def test_entries_expire_with_the_key(clock: SimpleNamespace) -> None:
+    cache = _cache(ttl=60)
+    # naive datetimes from MySQL are UTC
+    cache.put("h", _key(expires_at=datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=10)))
+    clock.now += 11
+    assert cache.get("h") is None
+
+    cache.put("h", _key(expires_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+    assert cache.get("h") is None
+
+
+def test_nothing_is_served_while_not_listening() -> None:
+    cache = _cache()
+    cache.put("h", _key())
+    cache.listening = False
+    assert cache.get("h") is None
+    cache.put("other", _key())
+    cache.listening = True
+    assert cache.get("other") is None
+
+
+def test_invalidation_drops_the_entry_and_a_racing_lookup() -> None:
+    cache = _cache()
+    cache.put("h", _key())
+    generation = cache.generation
+    cache.invalidate("h")
+    assert cache.get("h") is None
+    # a lookup that started before the revoke returns its row but does not cache it
+    assert cache.put("h", _key(), generation=generation).id == 1
+    assert cache.get("h") is None
+
+
+def test_revocations_published_by_other_workers_are_applied(redis_server) -> None:
+    cache = _cache()
+    cache.listening = False
+
+    async def scenario() -> Optional[object]:
+        listener = asyncio.create_task(cache.listen())
+        try:
+            while not cache.listening:
+                await asyncio.sleep(0.005)
+            cache.put("h", _key())
+            assert cache.get("h") is not None
+            await get_async_redis().publish(cache.channel, "h")
+            for _ in range(200):
+                if cache.get("h") is None:
+                    break
+                await asyncio.sleep(0.005)
+            return cache.get("h")
+        finally:
+            listener.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await listener
+
+    assert asyncio.run(scenario()) is None
+    assert not cache.listening
@@ -0,0 +1,120 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+from app.repo.api_key_filter import ApiKeyFilter
+from app.repo.api_key_repository import AsyncApiKeyRepository, hash_api_token
+from app.repo.session import AsyncSessionLocal
+
+
+@pytest.fixture
+def key_filter(redis_server, tables, monkeypatch: pytest.MonkeyPatch) -> ApiKeyFilter:
+    bloom = ApiKeyFilter(capacity=1000, error_rate=0.001, channel="test:api_key:written", write_lease=60.0)
+    # the repositories take their lease on the module's filter
+    monkeypatch.setattr("app.repo.api_key_repository.api_key_filter", bloom)
+    return bloom
+
+
+async def _create(token: str) -> Any:
+    async with AsyncSessionLocal() as db:
+        return await AsyncApiKeyRepository(db).create_with_plain("test", token)
+
+
+async def _built(bloom: ApiKeyFilter) -> ApiKeyFilter:
+    await bloom.rebuild()
+    bloom.ready = True
+    return bloom
+
+
+def test_unknown_key_is_refused_without_database(key_filter: ApiKeyFilter) -> None:
+    async def scenario() -> bool:
+        await _create("known")
+        # Redis time has millisecond resolution: a build in the same millisecond as a write does not trust misses
+        await asyncio.sleep(0.002)
+        await _built(key_filter)
+        assert await key_filter.might_exist(hash_api_token("known"))
+        return await key_filter.might_exist(hash_api_token("unknown"))
+
+    assert asyncio.run(scenario()) is False
+    assert key_filter.rejected == 1
+
+
+def test_key_written_after_build_is_never_refused(key_filter: ApiKeyFilter) -> None:
+    # no listener runs: the worker never hears of the new key, it must still let it through
+    async def scenario() -> bool:
+        await _built(key_filter)
+        await asyncio.sleep(0.002)
+        await _create("new")
+        return await key_filter.might_exist(hash_api_token("new"))
+
+    assert asyncio.run(scenario()) is True
+    assert key_filter.unverified == 1 and key_filter._stale.is_set()
+
+
+def test_misses_are_not_trusted_while_a_write_is_in_flight(key_filter: ApiKeyFilter) -> None:
+    async def scenario() -> bool:
+        await _built(key_filter)
+        async with key_filter.writing_async():
+            return await key_filter.might_exist(hash_api_token("pending"))
+
+    assert asyncio.run(scenario()) is True
+
+
+def test_lease_of_a_writer_that_died_counts_as_a_write(key_filter: ApiKeyFilter) -> None:
+    key_filter.write_lease = 0.001
+
+    async def scenario() -> bool:
+        await _built(key_filter)
+        writing = key_filter.writing_async()
+        await writing.__aenter__()  # never exits, like a writer that died before commit returned
+        await asyncio.sleep(0.01)
+        return await key_filter.might_exist(hash_api_token("orphan"))
+
+    assert asyncio.run(scenario()) is True
+    assert key_filter._stale.is_set()
+
+
+def test_rebuild_trusts_misses_again(key_filter: ApiKeyFilter) -> None:
+    async def scenario() -> bool:
+        await _built(key_filter)
+        await _create("new")
+        await asyncio.sleep(0.002)
+        await key_filter.rebuild()
+        assert await key_filter.might_exist(hash_api_token("new"))
+        return await key_filter.might_exist(hash_api_token("unknown"))
+
+    assert asyncio.run(scenario()) is False
+
+
+def test_redis_failure_falls_through(key_filter: ApiKeyFilter, monkeypatch: pytest.MonkeyPatch) -> None:
+    async def broken(*args: Any, **kwargs: Any) -> Any:
+        raise ConnectionError("redis down")
+
+    async def scenario() -> bool:
+        await _built(key_filter)
+        monkeypatch.setattr("app.repo.api_key_filter.scripts.run_async", broken)
+        return await key_filter.might_exist(hash_api_token("unknown"))
+
+    assert asyncio.run(scenario()) is True
+
+
+def test_listener_rebuilds_after_a_write(key_filter: ApiKeyFilter) -> None:
+    async def wait_for(condition: Any) -> None:
+        for _ in range(200):
+            if condition():
+                return
+            await asyncio.sleep(0.01)
+        raise AssertionError("timed out")
+
+    async def scenario() -> tuple:
+        listener = asyncio.create_task(key_filter.run(rebuild_interval=300, refresh_delay=0.05))
+        await wait_for(lambda: key_filter.ready)
+        built_at = key_filter._built_at
+        await _create("new")
+        await wait_for(lambda: key_filter._built_at != built_at)
+        result = (await key_filter.might_exist(hash_api_token("new")), await key_filter.might_exist(hash_api_token("unknown")))
+        listener.cancel()
+        return result
+
+    assert asyncio.run(scenario()) == (True, False)
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+import redis
+
+import app.repo.api_key_usage as usage_module
+import app.tasks.api_key_tasks as api_key_tasks
+from app.core.redis import get_redis
+from app.repo.api_key_repository import ApiKeyRepository
+from app.repo.api_key_usage import UsageBuffer
+from app.repo.session import SessionLocal
+
+
+KEY = "test:api_key:usage"
+
+
+class _BrokenRedis:
+    def pipeline(self, **_: object) -> object:
+        raise redis.ConnectionError("down")
+
+
+def _usage(api_key_id: int) -> int:
+    db = SessionLocal()
+    try:
+        return ApiKeyRepository(db).find_by_id(api_key_id).usage_count
+    finally:
+        db.close()
+        SessionLocal.remove()
+
+
+def test_flush_moves_the_counts_to_redis(redis_server) -> None:
+    buffer = UsageBuffer(KEY)
+    buffer.incr(1)
+    buffer.incr(1)
+    buffer.incr(2, n=5)
+    assert asyncio.run(buffer.flush()) == 2
+    assert get_redis().hgetall(KEY) == {"1": "2", "2": "5"}
+
+    buffer.incr(1)
+    assert asyncio.run(buffer.flush()) == 1
+    assert asyncio.run(buffer.flush()) == 0
+    assert get_redis().hgetall(KEY) == {"1": "3", "2": "5"}
+
+
+def test_failed_flush_keeps_the_counts(redis_server, monkeypatch: pytest.MonkeyPatch) -> None:
+    buffer = UsageBuffer(KEY)
+    buffer.incr(1, n=3)
+    with monkeypatch.context() as patch:
+        patch.setattr(usage_module, "get_async_redis", lambda: _BrokenRedis())
+        with pytest.raises(redis.ConnectionError):
+            asyncio.run(buffer.flush())
+    # requests counted while Redis was down add up with the restored ones
+    buffer.incr(1)
+    assert asyncio.run(buffer.flush()) == 1
+    assert get_redis().hgetall(KEY) == {"1": "4"}
+
+
+def test_shutdown_drains_the_buffer(redis_server) -> None:
+    buffer = UsageBuffer(KEY)
+
+    async def scenario() -> None:
+        runner = asyncio.create_task(buffer.run(interval=3600))
+        await asyncio.sleep(0)
+        buffer.incr(7)
+        runner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await runner
+
+    asyncio.run(scenario())
+    assert get_redis().hgetall(KEY) == {"7": "1"}
+
+
+def test_task_applies_the_redis_counts_to_the_database(redis_server, make_api_key, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(api_key_tasks.settings, "api_key_usage_redis_key", KEY)
+    api_key_id, _ = make_api_key()
+    get_redis().hset(KEY, str(api_key_id), 3)
+    assert api_key_tasks.flush_usage_counts() == 1
+    assert _usage(api_key_id) == 3
+    assert not get_redis().exists(KEY)
+
+
+def test_task_puts_the_counts_back_when_the_database_write_fails(redis_server, make_api_key, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(api_key_tasks.settings, "api_key_usage_redis_key", KEY)
+    api_key_id, _ = make_api_key()
+    get_redis().hset(KEY, str(api_key_id), 3)
+
+    def fail(self, counts):
+        raise RuntimeError("database down")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ApiKeyRepository, "add_usage_counts", fail)
+        with pytest.raises(RuntimeError):
+            api_key_tasks.flush_usage_counts()
+    assert get_redis().hgetall(KEY) == {str(api_key_id): "3"}
+    assert _usage(api_key_id) == 0
@@ -0,0 +1,29 @@
+from app.repo.api_key_repository import ApiKeyRepository
+from app.repo.session import SessionLocal
+
+
+def _is_active(key_id: int) -> bool:
+    db = SessionLocal()
+    try:
+        return ApiKeyRepository(db).find_by_id(key_id).is_active
+    finally:
+        db.close()
+        SessionLocal.remove()
+
+
+def test_revoke_deactivates_the_key_and_its_cached_entry(client, api_key, make_api_key) -> None:
+    _, token = api_key
+    victim_id, victim_token = make_api_key("victim")
+    # caches the victim as valid in this process
+    assert client.get("/api/v1/demo/secure", headers={"x-api-key": victim_token}).status_code == 200
+
+    response = client.delete(f"/api/v1/signature/api-key/{victim_id}", headers={"x-api-key": token})
+    assert response.status_code == 200
+    assert not _is_active(victim_id)
+    assert client.get("/api/v1/demo/secure", headers={"x-api-key": victim_token}).status_code == 401
+    assert _is_active(api_key[0])
+
+
+def test_signature_routes_require_an_api_key(client) -> None:
+    assert client.get("/api/v1/signature/api-keys").status_code == 401
+    assert client.get("/api/v1/signature/api-keys", headers={"x-api-key": "ra_unknown"}).status_code == 401
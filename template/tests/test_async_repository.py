@@ -0,0 +1,105 @@
+import asyncio
+from pathlib import Path
+from typing import Awaitable, Callable, TypeVar
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.repo.async_base import AsyncRepository
+from app.repo.models import ApiKey
+from app.repo.session import Base
+from app.repo.unit_of_work import AsyncUnitOfWork
+
+
+R = TypeVar("R")
+
+
+@pytest.fixture
+def run(tmp_path: Path) -> Callable[[Callable[[AsyncSession], Awaitable[R]]], R]:
+    """Run ``scenario(db)`` against a fresh aiosqlite file."""
+    def runner(scenario: Callable[[AsyncSession], Awaitable[R]]) -> R:
+        async def main() -> R:
+            engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/async.db")
+            try:
+                async with engine.begin() as conn:
+                    await conn.run_sync(Base.metadata.create_all)
+                async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                    return await scenario(db)
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return runner
+
+
+def test_crud(run) -> None:
+    async def scenario(db: AsyncSession) -> None:
+        repo = AsyncRepository(db, ApiKey)
+        created = await repo.create(name="first", key_hash="hash-1")
+        assert created.id is not None and created.usage_count == 0
+
+        assert (await repo.find_by_id(created.id)).name == "first"
+        assert (await repo.find_one_by(key_hash="hash-1")).id == created.id
+        assert await repo.find_one_by(key_hash="missing") is None
+
+        created.name = "renamed"
+        await repo.update(created)
+        db.expunge_all()
+        assert (await repo.find_by_id(created.id)).name == "renamed"
+
+        assert await repo.delete_by_id(created.id)
+        assert not await repo.delete_by_id(created.id)
+        assert await repo.find_by_id(created.id) is None
+
+    run(scenario)
+
+
+def test_queries_and_bulk_writes(run) -> None:
+    async def scenario(db: AsyncSession) -> None:
+        repo = AsyncRepository(db, ApiKey)
+        assert await repo.create_many([{"name": f"key-{i}", "key_hash": f"hash-{i}"} for i in range(1, 6)]) == 5
+
+        assert [k.name for k in await repo.list(offset=1, limit=2, order_by=ApiKey.id)] == ["key-2", "key-3"]
+        assert [k.name for k in await repo.list_where(ApiKey.id > 3)] == ["key-4", "key-5"]
+        assert await repo.exists_where(ApiKey.key_hash == "hash-2")
+        assert not await repo.exists_where(ApiKey.key_hash == "hash-9")
+        assert (await repo.find_max_of(ApiKey.id, ApiKey.id < 4)).name == "key-3"
+        assert [k.name async for k in repo.stream(ApiKey.id < 3, order_by=ApiKey.id, descending=True)] == ["key-2", "key-1"]
+
+        assert await repo.update_where({"is_active": False}, ApiKey.id <= 2) == 2
+        assert await repo.delete_where(ApiKey.is_active.is_(False)) == 2
+        await repo.upsert_many([{"id": 3, "name": "upserted", "key_hash": "hash-3"}, {"id": 9, "name": "new", "key_hash": "hash-9"}])
+        db.expunge_all()
+        assert [k.name for k in await repo.list(order_by=ApiKey.id)] == ["upserted", "key-4", "key-5", "new"]
+
+    run(scenario)
+
+
+def test_unit_of_work_commits_once_on_exit(run) -> None:
+    async def scenario(db: AsyncSession) -> None:
+        repo = AsyncRepository(db, ApiKey)
+        async with AsyncUnitOfWork(db):
+            await repo.create(name="first", key_hash="hash-1")
+            await repo.create(name="second", key_hash="hash-2")
+            assert db.in_transaction()
+        assert not db.in_transaction()
+        assert len(await repo.list_where(ApiKey.id > 0)) == 2
+
+    run(scenario)
+
+
+def test_unit_of_work_rolls_back_when_the_block_raises(run) -> None:
+    async def scenario(db: AsyncSession) -> None:
+        repo = AsyncRepository(db, ApiKey)
+        await repo.create(name="kept", key_hash="hash-0")
+        with pytest.raises(RuntimeError):
+            async with AsyncUnitOfWork(db):
+                await repo.create(name="first", key_hash="hash-1")
+                async with AsyncUnitOfWork(db):
+                    # a nested scope joins the outer transaction instead of committing
+                    await repo.create(name="second", key_hash="hash-2")
+                raise RuntimeError("boom")
+        assert [k.name for k in await repo.list_where(ApiKey.id > 0)] == ["kept"]
+
+    run(scenario)
@@ -0,0 +1,147 @@
+import itertools
+import time
+from typing import Any, List
+
+import fakeredis
+import pytest
+
+from app.tasks import batching
+from app.tasks.batching import BatchedTask, sweep_batches
+from app.tasks.celery import celery_app
+
+_names = itertools.count()
+
+
+class Recorder:
+    def __init__(self, fail_times: int = 0) -> None:
+        self.batches: List[List[Any]] = []
+        self.fail_times = fail_times
+
+    def __call__(self, items: List[Any]) -> None:
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("handler failed")
+        self.batches.append(items)
+
+
+def _batched(handler: Recorder, client: Any = None, **options: Any) -> BatchedTask:
+    return BatchedTask(celery_app, f"tests.batch{next(_names)}", handler, client=client, **options)
+
+
+@pytest.fixture
+def client() -> fakeredis.FakeRedis:
+    # the take / requeue scripts run in fakeredis's Lua
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+@pytest.fixture
+def drains(monkeypatch: pytest.MonkeyPatch) -> List[Any]:
+    """Countdowns of the drains scheduled (None: right away) instead of publishing them."""
+    scheduled: List[Any] = []
+    # only the batches of the test itself are swept
+    monkeypatch.setattr(batching, "_batches", {})
+
+    def record(self: Any, *args: Any, countdown: Any = None, **kwargs: Any) -> None:
+        scheduled.append(countdown)
+
+    monkeypatch.setattr("celery.app.task.Task.apply_async", record)
+    return scheduled
+
+
+def test_eager_buffers_until_a_batch_fills(eager) -> None:
+    handler = Recorder()
+    batch = _batched(handler, max_size=3)
+    for i in range(4):
+        batch.enqueue(i)
+    assert handler.batches == [[0, 1, 2]]
+    assert batch.pending() == 1
+    assert batch.flush() == 1
+    assert handler.batches == [[0, 1, 2], [3]]
+
+
+def test_eager_failed_batch_stays_buffered(eager) -> None:
+    handler = Recorder(fail_times=1)
+    batch = _batched(handler, max_size=10)
+    batch.enqueue_many([1, 2])
+    with pytest.raises(RuntimeError):
+        batch.flush()
+    assert batch.pending() == 2
+    batch.flush()
+    assert handler.batches == [[1, 2]]
+
+
+def test_flush_drains_redis_queue_in_batches(client) -> None:
+    handler = Recorder()
+    batch = _batched(handler, client=client, max_size=3)
+    batch.enqueue_many([{"n": i} for i in range(7)])
+    assert batch.pending() == 7
+    assert batch.flush() == 7
+    assert [[item["n"] for item in items] for items in handler.batches] == [[0, 1, 2], [3, 4, 5], [6]]
+    assert batch.stats() == {"pending": 0, "in_flight_batches": 0}
+
+
+def test_failed_batch_is_put_back_in_order(client) -> None:
+    handler = Recorder(fail_times=1)
+    batch = _batched(handler, client=client, max_size=2)
+    batch.enqueue_many([1, 2, 3])
+    with pytest.raises(RuntimeError):
+        batch.flush()
+    # the batch went back to the head of the queue, not the tail
+    assert client.lrange(batch.queue_key, 0, -1) == ["1", "2", "3"]
+    assert batch.stats()["in_flight_batches"] == 0
+    batch.flush()
+    assert handler.batches == [[1, 2], [3]]
+
+
+def test_batch_of_a_dead_worker_is_requeued_after_visibility_timeout(client) -> None:
+    handler = Recorder()
+    batch = _batched(handler, client=client, max_size=2, visibility_timeout=0.05)
+    batch.enqueue_many([1, 2, 3])
+    # taken and never acknowledged, as by a worker killed mid-handler
+    taken = batch._take()
+    assert taken is not None and taken[1] == [1, 2]
+    assert batch.stats() == {"pending": 1, "in_flight_batches": 1}
+    assert batch.requeue_expired() == 0
+    time.sleep(0.06)
+    assert batch.requeue_expired() == 2
+    assert client.lrange(batch.queue_key, 0, -1) == ["1", "2", "3"]
+    assert batch.flush() == 3
+    assert handler.batches == [[1, 2], [3]]
+
+
+def test_backlog_schedules_one_drain_until_a_drain_starts(client, drains) -> None:
+    batch = _batched(Recorder(), client=client, max_size=2, max_wait=0.2)
+    batch.enqueue(1)
+    assert drains == [0.2]
+    batch.enqueue(2)
+    assert drains == [0.2, None]
+    # above max_size, not only at it, yet only once while that drain is queued
+    batch.enqueue_many([3, 4])
+    batch.enqueue(5)
+    assert drains == [0.2, None]
+    batch.flush()
+    batch.enqueue_many([6, 7, 8])
+    assert drains == [0.2, None, None]
+
+
+def test_sweep_recovers_a_dead_workers_batch_without_new_items(client, drains) -> None:
+    handler = Recorder()
+    batch = _batched(handler, client=client, max_size=2, visibility_timeout=0.05)
+    batch.enqueue_many([1, 2, 3])
+    drains.clear()
+    # the worker took a batch and died; the countdown drain for the rest was lost
+    assert batch._take() is not None
+    assert sweep_batches() == 1
+    assert batch.stats() == {"pending": 1, "in_flight_batches": 1}
+    time.sleep(0.06)
+    assert sweep_batches() == 3
+    assert batch.stats() == {"pending": 3, "in_flight_batches": 0}
+    assert drains == [None, None]
+    batch.flush()
+    assert handler.batches == [[1, 2], [3]]
+
+
+def test_sweep_skips_idle_batches(client, drains) -> None:
+    _batched(Recorder(), client=client)
+    assert sweep_batches() == 0
+    assert drains == []
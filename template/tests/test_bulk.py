@@ -0,0 +1,23 @@
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from app.repo.bulk import upsert_statement
+from app.repo.models import ApiKey
+
+
+def _sql(dialect_name: str, dialect, **kwargs) -> str:
+    return str(upsert_statement(ApiKey, dialect_name, ["id", "name"], **kwargs).compile(dialect=dialect))
+
+
+def test_upsert_without_update_fields_keeps_existing_rows() -> None:
+    assert _sql("mysql", mysql.dialect(), update_fields=[]).endswith("ON DUPLICATE KEY UPDATE id = api_keys.id")
+    assert _sql("sqlite", sqlite.dialect(), update_fields=[]).endswith("ON CONFLICT (id) DO NOTHING")
+
+
+def test_upsert_updates_non_key_columns_by_default() -> None:
+    assert _sql("mysql", mysql.dialect()).endswith("ON DUPLICATE KEY UPDATE name = VALUES(name)")
+    assert _sql("sqlite", sqlite.dialect()).endswith("ON CONFLICT (id) DO UPDATE SET name = excluded.name")
+
+
+def test_postgresql_upsert_uses_on_conflict() -> None:
+    assert _sql("postgresql", postgresql.dialect()).endswith("ON CONFLICT (id) DO UPDATE SET name = excluded.name")
+    assert _sql("postgresql", postgresql.dialect(), update_fields=[]).endswith("ON CONFLICT (id) DO NOTHING")
@@ -0,0 +1,78 @@
+from typing import Iterator
+
+import pytest
+from celery import Task
+
+from app.core.redis import get_redis
+from app.tasks.celery import celery_app
+from app.tasks.coalesce import coalescing_task
+
+
+@coalescing_task("test.coalesce.add", lock_ttl=120)
+def add(a: int, b: int = 0) -> int:
+    return a + b
+
+
+@coalescing_task("test.coalesce.cached", result_ttl=60)
+def cached(a: int) -> int:
+    return a
+
+
+@coalescing_task("test.coalesce.fail")
+def fail() -> None:
+    raise ValueError("boom")
+
+
+@pytest.fixture
+def stored_eager_results(eager) -> Iterator[None]:
+    celery_app.conf.task_store_eager_result = True
+    try:
+        yield
+    finally:
+        celery_app.conf.task_store_eager_result = False
+
+
+def test_identical_calls_share_the_marked_task(redis_server) -> None:
+    first = add.delay(1, b=2)
+    marker = add._marker([1], {"b": 2})
+    assert get_redis().get(marker) == first.id
+    assert 0 < get_redis().ttl(marker) <= 120
+
+    assert add.apply_async((1,), {"b": 2}).id == first.id
+    assert add.delay(1, b=3).id != first.id
+
+
+def test_marker_is_removed_when_the_task_finishes(redis_server, eager) -> None:
+    marker = add._marker([1, 2], {})
+    assert add.delay(1, 2).get() == 3
+    assert not get_redis().exists(marker)
+
+    with pytest.raises(ValueError):
+        fail.delay().get()
+    assert not get_redis().exists(fail._marker([], {}))
+
+
+def test_successful_results_keep_the_marker_for_result_ttl(redis_server, stored_eager_results) -> None:
+    first = cached.delay(5)
+    marker = cached._marker([5], {})
+    assert get_redis().get(marker) == first.id
+    assert 0 < get_redis().ttl(marker) <= 60
+
+
+def test_only_the_marking_task_releases_the_marker(redis_server) -> None:
+    marker = add._marker([9], {})
+    get_redis().set(marker, "other-task")
+    add._release(marker, "stale-task", 0)
+    assert get_redis().get(marker) == "other-task"
+    add._release(marker, "other-task", 0)
+    assert not get_redis().exists(marker)
+
+
+def test_failed_publish_releases_the_marker(redis_server, monkeypatch: pytest.MonkeyPatch) -> None:
+    def broker_down(self, *args, **kwargs):
+        raise ConnectionError("broker down")
+
+    monkeypatch.setattr(Task, "apply_async", broker_down)
+    with pytest.raises(ConnectionError):
+        add.delay(4)
+    assert not get_redis().exists(add._marker([4], {}))
@@ -0,0 +1,23 @@
+def _headers(key: tuple) -> dict:
+    return {"x-api-key": key[1]}
+
+
+def test_task_result_is_only_readable_by_the_submitting_key(client, eager, api_key, make_api_key) -> None:
+    other = make_api_key("other")
+    task_id = client.post("/api/v1/demo/tasks/echo", params={"q": "hi"}, headers=_headers(api_key)).json()["data"]["task_id"]
+
+    response = client.get(f"/api/v1/demo/tasks/{task_id}", headers=_headers(other))
+    assert response.status_code == 404
+
+    response = client.get(f"/api/v1/demo/tasks/{task_id}", headers=_headers(api_key))
+    assert response.status_code == 200
+    assert response.json()["data"] == {"task_id": task_id, "result": "hi"}
+
+
+def test_unknown_task_is_not_found(client, api_key) -> None:
+    assert client.get("/api/v1/demo/tasks/no-such-task", headers=_headers(api_key)).status_code == 404
+
+
+def test_task_endpoints_require_an_api_key(client) -> None:
+    assert client.post("/api/v1/demo/tasks/echo").status_code == 401
+    assert client.get("/api/v1/demo/tasks/anything").status_code == 401
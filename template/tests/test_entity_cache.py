@@ -0,0 +1,89 @@
+from typing import Iterator
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.repo.base import Repository
+from app.repo.entity_cache import MISSING, EntityCache, entity_tag, id_key, model_tag
+from app.repo.models import ApiKey
+from app.repo.session import Base
+
+
+@pytest.fixture
+def cache(redis_server) -> EntityCache:
+    return EntityCache(prefix="test:entity")
+
+
+@pytest.fixture
+def db() -> Iterator[Session]:
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(ApiKey(id=1, name="first", key_hash="hash-1"))
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def test_lookup_misses_then_hits(db: Session, cache: EntityCache) -> None:
+    repo = Repository(db, ApiKey, cache=cache)
+    assert repo.find_by_id(1).name == "first"
+    assert (cache.misses, cache.redis_hits) == (1, 0)
+
+    db.expunge_all()
+    assert repo.find_by_id(1).name == "first"
+    assert repo.find_one_by(key_hash="hash-1").id == 1
+    assert repo.find_one_by(key_hash="hash-1").id == 1
+    assert (cache.misses, cache.redis_hits) == (2, 2)
+
+
+def test_misses_are_cached_until_the_row_is_created(db: Session, cache: EntityCache) -> None:
+    repo = Repository(db, ApiKey, cache=cache)
+    assert repo.find_by_id(2) is None
+    assert cache.get(id_key(ApiKey, 2)) is None
+    assert repo.find_by_id(2) is None
+    assert cache.negative_hits == 2
+
+    repo.create(id=2, name="second", key_hash="hash-2")
+    assert cache.get(id_key(ApiKey, 2)) is MISSING
+    assert repo.find_by_id(2).name == "second"
+
+
+def test_writes_invalidate_id_and_query_lookups(db: Session, cache: EntityCache) -> None:
+    repo = Repository(db, ApiKey, cache=cache)
+    entity = repo.find_one_by(key_hash="hash-1")
+    repo.find_by_id(1)
+
+    entity.name = "renamed"
+    repo.update(entity)
+    db.expunge_all()
+    assert repo.find_by_id(1).name == "renamed"
+    assert repo.find_one_by(key_hash="hash-1").name == "renamed"
+
+    repo.update_where({"name": "bulk"}, ApiKey.id == 1)
+    db.expunge_all()
+    assert repo.find_by_id(1).name == "bulk"
+
+
+def test_read_racing_another_process_invalidation_is_not_stored(db: Session, cache: EntityCache) -> None:
+    # a second instance stands in for another worker: it shares Redis but not ``generation``
+    other = EntityCache(prefix="test:entity")
+    repo = Repository(db, ApiKey, cache=cache)
+    key = id_key(ApiKey, 1)
+    tags = [model_tag(ApiKey), entity_tag(ApiKey, 1)]
+
+    def stale_read() -> ApiKey:
+        entity = db.get(ApiKey, 1)
+        # the other worker commits a write and invalidates after this read
+        other.invalidate(entity_tag(ApiKey, 1))
+        return entity
+
+    assert repo._cached(cache, key, stale_read, tags).name == "first"
+    assert cache.get(key) is MISSING
+
+    versions = cache.versions(tags)
+    assert cache.put(ApiKey, key, {"id": 1, "name": "first"}, tags, versions=versions)
+    other.invalidate(model_tag(ApiKey))
+    assert not cache.put(ApiKey, key, {"id": 1, "name": "first"}, tags, versions=versions)
@@ -0,0 +1,56 @@
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine
+
+from app.repo.migrations import PROGRESS_TABLE, batched_backfill
+from app.repo.session import Base
+
+
+ALEMBIC_DIR = Path(__file__).resolve().parents[1] / "alembic"
+
+
+@pytest.fixture
+def config(tmp_path: Path) -> Config:
+    """``alembic/`` against a temp SQLite file, at head.
+
+    A project with no revisions yet gets the one ``alembic revision --autogenerate``
+    would create first, so the check below covers the models either way.
+    """
+    # no ini file: env.py then leaves the test run's logging configuration alone
+    config = Config()
+    config.set_main_option("script_location", str(ALEMBIC_DIR))
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{tmp_path}/migrated.db")
+    if not ScriptDirectory.from_config(config).get_heads():
+        (tmp_path / "versions").mkdir()
+        config.set_main_option("version_locations", str(tmp_path / "versions"))
+        command.revision(config, message="initial", autogenerate=True)
+    command.upgrade(config, "head")
+    return config
+
+
+def test_upgrade_head_matches_the_models(config: Config) -> None:
+    # raises AutogenerateDiffsDetected when a revision would be generated
+    command.check(config)
+
+
+def test_autogenerate_leaves_the_backfill_progress_table_alone(config: Config) -> None:
+    engine = create_engine(config.get_main_option("sqlalchemy.url"))
+    try:
+        with engine.begin() as conn:
+            conn.exec_driver_sql("INSERT INTO api_keys (name, key_hash, usage_count, is_active, created_at) "
+                                 "VALUES ('k', 'h', 0, 1, CURRENT_TIMESTAMP)")
+        batched_backfill(engine, "api_keys", {"usage_count": 1}, job="test", sleep_seconds=0)
+        command.check(config)
+
+        # without env.py's include_object the table would be dropped
+        with engine.connect() as conn:
+            diff = compare_metadata(MigrationContext.configure(conn), Base.metadata)
+        assert [(op, table.name) for op, table in diff] == [("remove_table", PROGRESS_TABLE)]
+    finally:
+        engine.dispose()
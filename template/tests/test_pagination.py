@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.repo.base import Repository
+from app.repo.models import ApiKey
+from app.repo.pagination import InvalidCursor
+from app.repo.session import SessionLocal
+
+
+@pytest.fixture
+def repo(tables):
+    db = SessionLocal()
+    start = datetime(2024, 1, 1)
+    # two keys share each created_at, so the primary key has to break ties
+    for i in range(7):
+        db.add(ApiKey(name=f"k{i}", key_hash=f"h{i}", created_at=start + timedelta(minutes=i // 2)))
+    db.commit()
+    try:
+        yield Repository(db, ApiKey)
+    finally:
+        db.close()
+        SessionLocal.remove()
+
+
+def _walk(repo: Repository, **kwargs) -> list:
+    names, cursor = [], None
+    while True:
+        page = repo.list_keyset(limit=3, cursor=cursor, **kwargs)
+        names.append([key.name for key in page.items])
+        if not page.has_more:
+            return names
+        cursor = page.next_cursor
+
+
+def test_pages_follow_the_sort_key_with_primary_key_tiebreak(repo: Repository) -> None:
+    assert _walk(repo, order_by=ApiKey.created_at) == [["k0", "k1", "k2"], ["k3", "k4", "k5"], ["k6"]]
+    assert _walk(repo, order_by=ApiKey.created_at, descending=True) == [["k6", "k5", "k4"], ["k3", "k2", "k1"], ["k0"]]
+
+
+def test_cursor_must_match_the_ordering(repo: Repository) -> None:
+    cursor = repo.list_keyset(order_by=ApiKey.created_at, limit=3).next_cursor
+    with pytest.raises(InvalidCursor):
+        repo.list_keyset(order_by=ApiKey.name, limit=3, cursor=cursor)
+
+
+def test_nullable_sort_column_is_rejected(repo: Repository) -> None:
+    with pytest.raises(ValueError, match="nullable"):
+        repo.list_keyset(order_by=ApiKey.expires_at)
@@ -0,0 +1,127 @@
+import asyncio
+import json
+from typing import Any, Callable, List
+
+from app.tasks.celery import celery_app
+from app.tasks.progress import ProgressBroker, ProgressEvent, ProgressStreamsFull, ProgressSubscription, ProgressTask, publish_progress
+
+
+@celery_app.task(name="tests.flaky_job", base=ProgressTask, bind=True, max_retries=1, default_retry_delay=0)
+def flaky_job(self: ProgressTask, steps: int) -> int:
+    for step in range(1, steps + 1):
+        self.report_progress(step, steps)
+    if not self.request.retries:
+        raise self.retry()
+    return steps
+
+
+flaky_job.progress_min_interval = 0
+
+
+def _event(attempt: int, seq: int, final: bool = False) -> ProgressEvent:
+    return ProgressEvent(attempt, seq, final, json.dumps({"attempt": attempt, "seq": seq, "final": final}))
+
+
+def test_subscription_skips_duplicates_and_orders_attempts() -> None:
+    subscription = ProgressSubscription(queue_size=10)
+    for event in (_event(0, 1), _event(0, 2), _event(0, 2), _event(0, 1), _event(1, 1), _event(1, 2, final=True)):
+        subscription.push(event)
+
+    async def drain() -> List[str]:
+        ids = []
+        while (event := await subscription.next(timeout=0.01)) is not None:
+            ids.append(event.id)
+        return ids
+
+    assert asyncio.run(drain()) == ["0.1", "0.2", "1.1", "1.2"]
+
+
+def test_subscription_drops_oldest_when_full() -> None:
+    subscription = ProgressSubscription(queue_size=2)
+    for seq in range(1, 5):
+        subscription.push(_event(0, seq, final=seq == 4))
+    assert subscription.dropped == 2
+    first = asyncio.run(subscription.next(timeout=0.01))
+    assert first is not None and first.seq == 3
+
+
+def _follow(task_id: str, publish: Callable[[], Any]) -> List[ProgressEvent]:
+    broker = ProgressBroker(queue_size=100)
+
+    async def follow() -> List[ProgressEvent]:
+        events = []
+        async with broker.subscribe(task_id) as subscription:
+            await asyncio.get_running_loop().run_in_executor(None, publish)
+            while (event := await subscription.next(timeout=2)) is not None:
+                events.append(event)
+                if event.final:
+                    break
+        await broker.aclose()
+        return events
+
+    return asyncio.run(follow())
+
+
+def test_stream_follows_retried_attempt_to_the_end(redis_server) -> None:
+    # as a worker publishes them: attempt 0 and its RETRY event, then attempt 1 numbered from 1
+    def publish() -> None:
+        for attempt, seq, state, final in ((0, 1, "PROGRESS", False), (0, 2, "RETRY", False), (1, 1, "PROGRESS", False), (1, 2, "SUCCESS", True)):
+            publish_progress("retry-1", {"task_id": "retry-1", "attempt": attempt, "seq": seq, "state": state, "final": final})
+
+    events = _follow("retry-1", publish)
+    assert [event.id for event in events] == ["0.1", "0.2", "1.1", "1.2"]
+    assert events[-1].final
+
+
+def test_eager_progress_task_ends_with_final_event(redis_server, eager) -> None:
+    events = _follow("retry-2", lambda: flaky_job.apply_async((3,), task_id="retry-2"))
+    assert events[-1].final
+    assert json.loads(events[-1].data)["state"] == "SUCCESS"
+    # eager retry() runs the next attempt inline, before the first attempt's RETRY event
+    assert [event.id for event in events] == ["0.1", "0.2", "0.3", "1.1", "1.2", "1.3", "1.4"]
+
+
+def _start_long_job(client, key: tuple) -> str:
+    response = client.post("/api/v1/demo/tasks/long-job", params={"steps": 2, "delay": 0}, headers={"x-api-key": key[1]})
+    return response.json()["data"]["task_id"]
+
+
+def test_progress_endpoint_streams_to_the_owner(client, eager, api_key) -> None:
+    task_id = _start_long_job(client, api_key)
+    # eager: the job already finished, the stream starts from its final state and ends
+    response = client.get(f"/api/v1/tasks/{task_id}/progress", headers={"x-api-key": api_key[1]})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    data = [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+    assert data[-1]["final"] and data[-1]["state"] == "SUCCESS"
+
+
+def test_progress_endpoint_refuses_other_keys_and_anonymous_clients(client, eager, api_key, make_api_key) -> None:
+    task_id = _start_long_job(client, api_key)
+    other = make_api_key("other")
+    assert client.get(f"/api/v1/tasks/{task_id}/progress", headers={"x-api-key": other[1]}).status_code == 404
+    assert client.get(f"/api/v1/tasks/{task_id}/progress").status_code == 401
+
+
+def test_progress_endpoint_is_busy_when_the_stream_limit_is_reached(client, eager, api_key, monkeypatch) -> None:
+    task_id = _start_long_job(client, api_key)
+    monkeypatch.setattr("app.api.v1.tasks.progress_broker.max_streams", 0)
+    response = client.get(f"/api/v1/tasks/{task_id}/progress", headers={"x-api-key": api_key[1]})
+    assert response.status_code == 503
+
+
+def test_broker_refuses_subscriptions_over_the_limit(redis_server) -> None:
+    broker = ProgressBroker(queue_size=10, max_streams=1)
+
+    async def scenario() -> None:
+        async with broker.subscribe("a"):
+            assert broker.full()
+            try:
+                async with broker.subscribe("b"):
+                    raise AssertionError("over the limit")
+            except ProgressStreamsFull:
+                pass
+        assert not broker.full() and broker.stats()["streams"] == 0
+        await broker.aclose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,110 @@
+import dataclasses
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Optional
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from app.api.errors import ErrorCode
+from app.api.response import error_code, success
+
+FMT = "%Y-%m-%d %H:%M:%S"
+
+
+def _legacy_format(value: Any, fmt: str) -> str:
+    if isinstance(value, datetime):
+        return value.strftime(fmt)
+    return datetime(value.year, value.month, value.day).strftime(fmt)
+
+
+def _legacy_reformat(obj: Any, fmt: str) -> Any:
+    if isinstance(obj, dict):
+        return {k: _legacy_reformat(v, fmt) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_legacy_reformat(v, fmt) for v in obj]
+    if isinstance(obj, str):
+        s = obj[:-1] + "+00:00" if obj.endswith("Z") else obj
+        try:
+            return datetime.fromisoformat(s).strftime(fmt)
+        except Exception:
+            return obj
+    return obj
+
+
+def legacy_success(data: Any, exclude: Any = None, fmt: str = FMT) -> JSONResponse:
+    """The two-pass encoder the envelope helpers replaced (jsonable_encoder, then re-parse every string)."""
+    custom = {datetime: lambda v: _legacy_format(v, fmt), date: lambda v: _legacy_format(v, fmt)}
+    if isinstance(data, (list, tuple)):
+        encoded: Any = [jsonable_encoder(item, custom_encoder=custom, exclude=exclude) for item in data]
+    else:
+        encoded = jsonable_encoder(data, custom_encoder=custom, exclude=exclude)
+    return JSONResponse(content=_legacy_reformat({"code": 0, "message": "success", "data": encoded}, fmt))
+
+
+class Color(Enum):
+    RED = "red"
+
+
+class Child(BaseModel):
+    born: date
+    weight: Decimal
+
+
+class Row(BaseModel):
+    id: int
+    name: str
+    score: float
+    color: Color
+    created_at: datetime
+    note: Optional[str] = None
+    child: Optional[Child] = None
+
+
+@dataclasses.dataclass
+class Point:
+    x: int
+    at: datetime
+
+
+NOW = datetime(2024, 1, 2, 3, 4, 5, 678)
+ROW = Row(id=1, name="héllo ✓", score=1 / 3, color=Color.RED, created_at=NOW, child=Child(born=date(2020, 5, 6), weight=Decimal("3.50")))
+
+PAYLOADS = {
+    "none": None,
+    "scalars": [0, -1, 2 ** 63 - 1, 2 ** 70, True, "text", ""],
+    "floats": [0.0, -0.0, 1 / 3, 1e16, 1e20, -1.5e-7, 123456.789],
+    "unicode": {"name": "naïve ☃   \"quoted\" \\ \n"},
+    "datetimes": {"at": NOW, "day": date(2024, 2, 29), "nested": [{"at": NOW}]},
+    "non-string keys": {1: "a", 2.5: "b", None: "c", True: "d"},
+    "models": [ROW, ROW.model_copy(update={"id": 2, "child": None})],
+    "model": ROW,
+    "dataclass and containers": {"point": Point(x=1, at=NOW), "tuple": (1, "a"), "enum": Color.RED},
+}
+
+
+@pytest.mark.parametrize("data", PAYLOADS.values(), ids=PAYLOADS.keys())
+def test_envelope_bytes_match_the_two_pass_encoder(data: Any) -> None:
+    assert success(data).body == legacy_success(data).body
+
+
+def test_exclude_and_datetime_format_match() -> None:
+    assert success(ROW, exclude={"child", "score"}).body == legacy_success(ROW, exclude={"child", "score"}).body
+    rows = [{"id": 1, "secret": "x", "at": NOW}]
+    assert success(rows, exclude={"secret"}).body == legacy_success(rows, exclude={"secret"}).body
+    assert success(NOW, datetime_format="%d/%m/%Y").body == legacy_success(NOW, fmt="%d/%m/%Y").body
+
+
+def test_strings_that_look_like_dates_are_left_alone() -> None:
+    # the old second pass rewrote any ISO-looking string; only real datetimes are formatted now
+    assert success({"sku": "2024-01-02"}).body == b'{"code":0,"message":"success","data":{"sku":"2024-01-02"}}'
+
+
+def test_error_code_envelope() -> None:
+    response = error_code(code=ErrorCode.SERVICE_BUSY, status_code=503)
+    assert response.status_code == 503
+    assert response.body.startswith(b'{"code":-1001,"message":')
+    assert response.headers["content-type"] == "application/json"
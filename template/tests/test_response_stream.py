@@ -0,0 +1,60 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, List
+
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.api.response import success, success_stream
+
+
+NOW = datetime(2024, 1, 2, 3, 4, 5)
+ROWS = [{"id": i, "name": f"key-{i}", "at": NOW} for i in range(50)]
+
+
+def _chunks(response: StreamingResponse) -> List[bytes]:
+    async def collect() -> List[bytes]:
+        return [chunk async for chunk in response.body_iterator]  # type: ignore[misc]
+
+    return asyncio.run(collect())
+
+
+async def _arows() -> AsyncIterator[Any]:
+    for row in ROWS:
+        yield row
+
+
+def test_json_stream_is_the_success_envelope() -> None:
+    for items in (ROWS, iter(ROWS), _arows()):
+        assert b"".join(_chunks(success_stream(items))) == success(ROWS).body
+    assert b"".join(_chunks(success_stream([]))) == success([]).body
+
+
+def test_ndjson_writes_one_item_per_line() -> None:
+    response = success_stream(_arows(), stream_format="ndjson")
+    assert response.media_type == "application/x-ndjson"
+    lines = b"".join(_chunks(response)).splitlines()
+    assert [json.loads(line) for line in lines] == [{**row, "at": "2024-01-02 03:04:05"} for row in ROWS]
+    assert b"".join(_chunks(success_stream([], stream_format="ndjson"))) == b""
+
+
+def test_head_goes_out_first_and_rows_are_batched() -> None:
+    chunks = _chunks(success_stream(ROWS, chunk_size=256))
+    assert chunks[0] == b'{"code":0,"message":"success","data":['
+    assert 2 < len(chunks) < len(ROWS)
+    assert all(len(chunk) < 256 + 64 for chunk in chunks)
+
+
+def test_api_key_stream_endpoint(client: TestClient, make_api_key) -> None:
+    ids = [make_api_key(f"key-{i}")[0] for i in range(3)]
+    caller_id, token = make_api_key("caller")
+    headers = {"X-API-KEY": token}
+
+    response = client.get("/api/v1/signature/api-keys/stream", headers=headers)
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()["data"]] == ids + [caller_id]
+
+    response = client.get("/api/v1/signature/api-keys/stream?format=ndjson", headers=headers)
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line)["name"] for line in response.text.splitlines()] == ["key-0", "key-1", "key-2", "caller"]
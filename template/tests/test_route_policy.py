@@ -0,0 +1,42 @@
+from fastapi.testclient import TestClient
+
+from app.middleware.route_policy import AuthPolicy, RoutePolicyTable
+
+
+def _table(cache_size: int = 2048) -> RoutePolicyTable:
+    return RoutePolicyTable({
+        AuthPolicy.API_KEY: (r"/api/v1/secure", r"/api/v1/both/.*"),
+        AuthPolicy.JWT: (r"/api/v1/me", r"/api/v1/both/.*"),
+    }, cache_size=cache_size)
+
+
+def test_paths_get_the_policies_whose_patterns_match() -> None:
+    table = _table()
+    assert table.policies_for("/api/v1/secure") == {AuthPolicy.API_KEY}
+    assert table.policies_for("/api/v1/me") == {AuthPolicy.JWT}
+    assert table.policies_for("/api/v1/both/1") == {AuthPolicy.API_KEY, AuthPolicy.JWT}
+    assert table.policies_for("/health") == frozenset()
+    assert table.requires("/api/v1/secure", AuthPolicy.API_KEY)
+    assert not table.requires("/api/v1/secure", AuthPolicy.JWT)
+
+
+def test_policies_without_patterns_match_nothing() -> None:
+    table = RoutePolicyTable({AuthPolicy.API_KEY: (), AuthPolicy.JWT: ()})
+    assert table.policies_for("/api/v1/secure") == frozenset()
+
+
+def test_memo_is_bounded() -> None:
+    table = _table(cache_size=2)
+    for i in range(5):
+        assert table.requires(f"/api/v1/both/{i}", AuthPolicy.JWT)
+    assert list(table._cache) == ["/api/v1/both/3", "/api/v1/both/4"]
+    # an evicted path is matched again, not forgotten
+    assert table.requires("/api/v1/both/0", AuthPolicy.API_KEY)
+
+
+def test_app_routes_require_their_policy(client: TestClient) -> None:
+    assert client.get("/health").status_code == 200
+    assert client.get("/api/v1/demo/public").status_code == 200
+    assert client.get("/api/v1/demo/secure").status_code == 401
+    assert client.get("/api/v1/tasks/some-task/progress").status_code == 401
+    assert client.get("/api/v1/demo/me").status_code == 401
@@ -0,0 +1,86 @@
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.engine import Engine
+
+from app.repo.models import ApiKey
+from app.repo.routing import ReplicaSet, RoutingSession, use_primary
+from app.repo.session import Base
+
+
+def _database(path: Path, name: str) -> Engine:
+    """A SQLite file whose only key is named after it, so a read shows where it went."""
+    engine = create_engine(f"sqlite:///{path / name}.db")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(ApiKey.__table__.insert(), {"name": name, "key_hash": f"hash-{name}"})
+    return engine
+
+
+@pytest.fixture
+def replica_set(tmp_path: Path) -> ReplicaSet:
+    return ReplicaSet(_database(tmp_path, "primary"), [_database(tmp_path, "replica0"), _database(tmp_path, "replica1")])
+
+
+def _reads(db: RoutingSession, count: int = 4) -> List[str]:
+    return [db.scalars(select(ApiKey.name)).one() for _ in range(count)]
+
+
+def test_selects_go_to_the_replicas(replica_set: ReplicaSet) -> None:
+    with RoutingSession(replica_set) as db:
+        assert sorted(_reads(db)) == ["replica0", "replica0", "replica1", "replica1"]
+
+
+def test_a_write_makes_the_session_stick_to_the_primary(replica_set: ReplicaSet) -> None:
+    db = RoutingSession(replica_set)
+    assert _reads(db, 1) != ["primary"]
+    db.add(ApiKey(name="written", key_hash="hash-written"))
+    db.flush()
+    assert set(db.scalars(select(ApiKey.name))) == {"primary", "written"}
+    db.rollback()
+    assert _reads(db, 2) == ["primary", "primary"]
+
+    db.close()
+    assert "primary" not in _reads(db, 2)
+
+
+def test_select_for_update_goes_to_the_primary(replica_set: ReplicaSet) -> None:
+    with RoutingSession(replica_set) as db:
+        assert db.scalars(select(ApiKey.name).with_for_update()).one() == "primary"
+        assert _reads(db, 2) == ["primary", "primary"]
+
+
+def test_use_primary_pins_reads(replica_set: ReplicaSet) -> None:
+    with RoutingSession(replica_set) as db:
+        use_primary(db)
+        assert _reads(db, 2) == ["primary", "primary"]
+
+
+def test_replicas_failing_the_check_fall_back_to_the_primary(tmp_path: Path) -> None:
+    unreachable = create_engine(f"sqlite:///{tmp_path}/missing/replica.db")
+    replica_set = ReplicaSet(_database(tmp_path, "primary"), [unreachable, _database(tmp_path, "replica1")])
+    assert replica_set.check() == [1]
+    with RoutingSession(replica_set) as db:
+        assert _reads(db, 2) == ["replica1", "replica1"]
+
+    replica_set.lag_probe = lambda conn: replica_set.max_lag_seconds + 1
+    assert replica_set.check() == []
+    with RoutingSession(replica_set) as db:
+        assert _reads(db, 2) == ["primary", "primary"]
+
+
+def test_worker_monitor_starts_once_per_process(replica_set: ReplicaSet) -> None:
+    replica_set.healthy = []
+    replica_set.start_monitor_thread(3600)
+    replica_set.start_monitor_thread(3600)
+    monitors = [t for t in threading.enumerate() if t.name == "replica-monitor"]
+    assert len(monitors) == 1
+    for _ in range(100):
+        if replica_set.healthy:
+            break
+        time.sleep(0.01)
+    assert replica_set.healthy == [0, 1]
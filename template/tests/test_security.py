@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from jose import jwt
+from jose.exceptions import JWTClaimsError, JWTError
+
+import app.utils.security as security
+from app.api.errors import ErrorCode
+from app.utils.security import (
+    JWT_ALG, JWT_SECRET, PasswordHasherBusy, _decode_jose, _decode_native, async_hash_password, async_verify_password,
+    hash_password, verify_and_update,
+)
+
+DECODERS = [_decode_jose, _decode_native]
+
+
+@pytest.mark.parametrize("decode", DECODERS)
+def test_decoders_accept_a_valid_token(decode) -> None:
+    exp = int(time.time()) + 60
+    token = jwt.encode({"sub": "42", "exp": exp}, JWT_SECRET, algorithm=JWT_ALG)
+    assert decode(token) == {"sub": "42", "exp": exp}
+
+
+@pytest.mark.parametrize("decode", DECODERS)
+@pytest.mark.parametrize("claims", [{"sub": 42}, {"sub": ["42"]}, {"sub": "42", "jti": 1}])
+def test_decoders_reject_non_string_claims(decode, claims) -> None:
+    token = jwt.encode(claims, JWT_SECRET, algorithm=JWT_ALG)
+    with pytest.raises(JWTClaimsError):
+        decode(token)
+
+
+@pytest.mark.parametrize("decode", DECODERS)
+@pytest.mark.parametrize("token", ["", "a.b", "é.e30.AAAA", "eyJhbGciOiJIUzI1NiJ9.é.AAAA", "eyJhbGciOiJIUzI1NiJ9.e30.!!"])
+def test_decoders_reject_malformed_tokens_with_jwt_error(decode, token) -> None:
+    with pytest.raises(JWTError):
+        decode(token)
+
+
+@pytest.fixture
+def hash_slots(monkeypatch: pytest.MonkeyPatch) -> threading.BoundedSemaphore:
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(security, "_hash_slots", slots)
+    return slots
+
+
+def test_hash_pool_refuses_work_beyond_its_pending_limit(hash_slots: threading.BoundedSemaphore) -> None:
+    async def scenario() -> None:
+        password_hash = await async_hash_password("secret")
+        assert await async_verify_password("secret", password_hash)
+        # every finished job gave its slot back
+        assert hash_slots.acquire(blocking=False)
+        with pytest.raises(PasswordHasherBusy):
+            await async_hash_password("secret")
+        hash_slots.release()
+
+    asyncio.run(scenario())
+
+
+def test_busy_hash_pool_answers_503(client: TestClient, hash_slots: threading.BoundedSemaphore) -> None:
+    async def login() -> dict:
+        await async_verify_password("secret", "unused")
+        return {}
+
+    client.app.add_api_route("/test/login", login)
+    hash_slots.acquire()
+    response = client.get("/test/login")
+    assert response.status_code == 503
+    assert response.json()["code"] == int(ErrorCode.SERVICE_BUSY)
+
+
+def test_outdated_cost_is_rehashed(monkeypatch: pytest.MonkeyPatch) -> None:
+    old_hash = hash_password("secret", rounds=4)
+    monkeypatch.setattr(security.settings, "bcrypt_rounds", 5)
+    ok, new_hash = verify_and_update("secret", old_hash)
+    assert ok and new_hash is not None and new_hash.startswith("$2b$05$")
+    assert verify_and_update("secret", new_hash) == (True, None)
+    assert verify_and_update("wrong", new_hash) == (False, None)
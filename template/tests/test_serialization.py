@@ -0,0 +1,50 @@
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import fakeredis
+import pytest
+
+from app.tasks.serialization import FLAG_CLAIM, FLAG_ZLIB, CompactSerializer, FileClaimStore, RedisClaimStore
+
+PAYLOAD = {
+    "when": datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc),
+    "id": uuid.UUID(int=7),
+    "amount": Decimal("12.50"),
+    "rows": ["x" * 100] * 50,
+}
+
+
+def test_round_trip_keeps_types_and_compresses_large_bodies() -> None:
+    serializer = CompactSerializer(compression="zlib", compress_threshold=1024)
+    data = serializer.dumps(PAYLOAD)
+    assert data[0] & FLAG_ZLIB
+    assert serializer.loads(data) == PAYLOAD
+    small = serializer.dumps({"a": 1})
+    assert small[0] == 0 and serializer.loads(small) == {"a": 1}
+
+
+@pytest.mark.parametrize("backend", ["redis", "file"])
+def test_large_payloads_travel_as_claim_check_references(backend, tmp_path) -> None:
+    client = fakeredis.FakeRedis()
+    store = RedisClaimStore(client=lambda: client) if backend == "redis" else FileClaimStore(str(tmp_path))
+    serializer = CompactSerializer(compression="none", claim_threshold=1024, store=store)
+    data = serializer.dumps(PAYLOAD)
+    assert data[0] & FLAG_CLAIM
+    assert data[1:].startswith(f"{backend}:".encode()) and len(data) < 100
+    assert serializer.loads(data) == PAYLOAD
+
+
+@pytest.mark.parametrize("reference", [
+    b"file:../secret",
+    b"file:/etc/passwd",
+    b"redis:../other-app:secret",
+    b"file:" + b"A" * 64,
+])
+def test_crafted_references_are_refused_before_any_read(reference, tmp_path, redis_server, monkeypatch) -> None:
+    # a worker resolves references of either kind, from the configured locations
+    monkeypatch.setattr("app.tasks.serialization.settings.celery_claim_check_dir", str(tmp_path / "claims"))
+    (tmp_path / "secret").write_bytes(b"\x00")
+    fakeredis.FakeRedis(server=redis_server).set("other-app:secret", b"\x00")
+    with pytest.raises(ValueError, match="malformed claim-check reference"):
+        CompactSerializer().loads(bytes((FLAG_CLAIM,)) + reference)
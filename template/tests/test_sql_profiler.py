@@ -0,0 +1,98 @@
+from typing import Iterator, List
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from loguru import logger
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import StaticPool
+
+from app.middleware.sql_profiler import SqlProfilerMiddleware
+from app.repo.profiler import QueryProfile, current_profile, instrument, start_profile, stop_profile
+
+
+@pytest.fixture
+def engine() -> Iterator[Engine]:
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    instrument(engine)
+    # attaching twice must not count every statement twice
+    instrument(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def warnings() -> Iterator[List[str]]:
+    messages: List[str] = []
+    sink = logger.add(messages.append, level="WARNING", format="{message}")
+    yield messages
+    logger.remove(sink)
+
+
+def _query(engine: Engine, sql: str, **params: object) -> None:
+    with engine.connect() as conn:
+        conn.execute(text(sql), params)
+
+
+def test_queries_are_recorded_only_inside_a_profile(engine: Engine) -> None:
+    _query(engine, "SELECT 1")
+    token = start_profile(top_n=2)
+    for i in range(3):
+        _query(engine, "SELECT :i", i=i)
+    _query(engine, "SELECT 2")
+    profile = stop_profile(token)
+    _query(engine, "SELECT 3")
+
+    assert current_profile() is None
+    assert profile.count == 4
+    assert profile.summary()["queries"] == 4
+    assert len(profile.slowest) == 2
+    # one shape per SQL text, whatever the parameters
+    assert profile.repeated(3) == [("SELECT ?", 3)]
+    assert profile.repeated(4) == []
+
+
+def test_slowest_keeps_the_top_n_in_order() -> None:
+    profile = QueryProfile(top_n=2)
+    for statement, elapsed in [("a", 0.1), ("b", 0.5), ("c", 0.2), ("d", 0.05)]:
+        profile.record(statement, elapsed)
+    assert profile.slowest == [(0.5, "b"), (0.2, "c")]
+    assert profile.total == pytest.approx(0.85)
+
+
+def _app(engine: Engine, **options: object) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/items")
+    def items(n: int = 1) -> dict:
+        # an N+1 loop: one lookup per item
+        for i in range(n):
+            _query(engine, "SELECT :i", i=i)
+        return {}
+
+    app.add_middleware(SqlProfilerMiddleware, **options)
+    return TestClient(app)
+
+
+def test_middleware_logs_n_plus_one_requests(engine: Engine, warnings: List[str]) -> None:
+    client = _app(engine, n_plus_one_threshold=5)
+    client.get("/items", params={"n": 4})
+    assert warnings == []
+    client.get("/items", params={"n": 5})
+    assert len(warnings) == 1
+    assert warnings[0].startswith("GET /items: 5 queries")
+    assert "possible N+1, 5x: SELECT ?" in warnings[0]
+
+
+def test_middleware_logs_requests_over_the_query_budget(engine: Engine, warnings: List[str]) -> None:
+    _app(engine, max_queries=3, n_plus_one_threshold=100).get("/items", params={"n": 3})
+    assert len(warnings) == 1 and "3 queries" in warnings[0]
+
+
+def test_server_timing_header(engine: Engine) -> None:
+    response = _app(engine, server_timing=True).get("/items", params={"n": 2})
+    assert response.headers["server-timing"].startswith("db;dur=")
+    # sent with the response head, so only queries run before it are counted
+    assert response.headers["server-timing"].endswith('desc="2 queries"')
+    assert "server-timing" not in _app(engine).get("/items").headers
@@ -0,0 +1,94 @@
+from typing import Iterator
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.repo.base import Repository
+from app.repo.models import ApiKey
+from app.repo.session import Base
+from app.repo.statements import (
+    exists_where_statement, filter_by_statement, list_statement, list_where_statement, statement_cache_size,
+)
+
+
+@pytest.fixture
+def repo() -> Iterator[Repository[ApiKey]]:
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all([ApiKey(name=f"key-{i}", key_hash=f"hash-{i}", is_active=i % 2 == 0) for i in range(1, 10)])
+        db.commit()
+        yield Repository(db, ApiKey)
+    engine.dispose()
+
+
+def test_filter_by_shares_a_statement_per_filter_shape() -> None:
+    first, first_params = filter_by_statement(ApiKey, {"key_hash": "a", "name": "x"})
+    size = statement_cache_size()
+    second, second_params = filter_by_statement(ApiKey, {"name": "y", "key_hash": "b"})
+    assert second is first
+    assert statement_cache_size() == size
+    assert first_params == {"f_key_hash": "a", "f_name": "x"} and second_params == {"f_key_hash": "b", "f_name": "y"}
+    # NULL is compiled into the shape, not bound
+    is_null, params = filter_by_statement(ApiKey, {"key_hash": "a", "name": None})
+    assert is_null is not first and params == {"f_key_hash": "a"}
+
+
+def test_list_shares_a_statement_per_ordering() -> None:
+    assert list_statement(ApiKey, ApiKey.id, False) is list_statement(ApiKey, ApiKey.id, False)
+    assert list_statement(ApiKey, ApiKey.id, True) is not list_statement(ApiKey, ApiKey.id, False)
+    # arbitrary expressions have no stable key and are built per call
+    assert list_statement(ApiKey, ApiKey.id + 1, False) is not list_statement(ApiKey, ApiKey.id + 1, False)
+
+
+def test_cached_finders_bind_each_calls_values(repo: Repository[ApiKey]) -> None:
+    assert repo.find_one_by(key_hash="hash-2").name == "key-2"
+    assert repo.find_one_by(key_hash="hash-3").name == "key-3"
+    assert repo.find_one_by(key_hash="hash-3", scopes=None).name == "key-3"
+    assert [k.name for k in repo.list(offset=0, limit=2, order_by=ApiKey.id)] == ["key-1", "key-2"]
+    assert [k.name for k in repo.list(offset=7, limit=5, order_by=ApiKey.id)] == ["key-8", "key-9"]
+
+
+def test_where_statements_differing_only_in_values_are_shared() -> None:
+    first, first_params = list_where_statement(ApiKey, [ApiKey.name == "a", ApiKey.id > 1], 0, 10)
+    size = statement_cache_size()
+    second, second_params = list_where_statement(ApiKey, [ApiKey.name == "b", ApiKey.id > 7], 20, 5)
+    assert second is first
+    assert statement_cache_size() == size
+    assert sorted(second_params.values(), key=str) == sorted(["b", 7, 20, 5], key=str)
+    assert first_params != second_params
+
+
+def test_where_shape_is_part_of_the_key() -> None:
+    equal, _ = exists_where_statement(ApiKey, [ApiKey.name == "a"])
+    assert exists_where_statement(ApiKey, [ApiKey.name != "a"])[0] is not equal
+    assert exists_where_statement(ApiKey, [ApiKey.key_hash == "a"])[0] is not equal
+    assert list_where_statement(ApiKey, [ApiKey.name == "a"], 0, None)[0] is not equal
+
+
+def test_cached_where_methods_bind_each_calls_values(repo: Repository[ApiKey]) -> None:
+    assert [k.name for k in repo.list_where(ApiKey.id > 8)] == ["key-9"]
+    assert [k.name for k in repo.list_where(ApiKey.id > 7)] == ["key-8", "key-9"]
+    assert [k.name for k in repo.list_where(ApiKey.id > 0, offset=2, limit=2)] == ["key-3", "key-4"]
+    assert [k.name for k in repo.list_where(ApiKey.id > 0, offset=5, limit=1)] == ["key-6"]
+
+    assert repo.exists_where(ApiKey.key_hash == "hash-3")
+    assert not repo.exists_where(ApiKey.key_hash == "hash-missing")
+
+    assert repo.find_max_of(ApiKey.id, ApiKey.is_active.is_(True)).name == "key-8"
+    assert repo.find_max_of(ApiKey.id, ApiKey.id < 5).name == "key-4"
+    assert repo.find_one_where(ApiKey.name == "key-6").key_hash == "hash-6"
+
+
+def test_in_lists_of_any_length_share_a_statement(repo: Repository[ApiKey]) -> None:
+    assert {k.name for k in repo.list_where(ApiKey.name.in_(["key-1", "key-2"]))} == {"key-1", "key-2"}
+    size = statement_cache_size()
+    assert {k.name for k in repo.list_where(ApiKey.name.in_(["key-3", "key-4", "key-5"]))} == {"key-3", "key-4", "key-5"}
+    assert statement_cache_size() == size
+
+
+def test_stream_binds_each_calls_values(repo: Repository[ApiKey]) -> None:
+    assert [k.name for k in repo.stream(ApiKey.id > 7, order_by=ApiKey.id, descending=True)] == ["key-9", "key-8"]
+    assert [k.name for k in repo.stream(ApiKey.id < 3, order_by=ApiKey.id)] == ["key-1", "key-2"]
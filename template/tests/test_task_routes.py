@@ -0,0 +1,41 @@
+import pytest
+
+from app.tasks.celery import QUEUE_DEFAULT, QUEUE_FAST, QUEUE_HEAVY, TASK_ROUTES, celery_app
+from app.tasks.worker import WORKER_PROFILES, worker_argv
+
+
+def _queue(task_name: str) -> str:
+    return celery_app.amqp.router.route({}, task_name, (), {})["queue"].name
+
+
+@pytest.mark.parametrize("task_name, queue", [
+    ("demo.echo", QUEUE_FAST),
+    ("batch.demo.events", QUEUE_FAST),
+    ("batching.sweep", QUEUE_FAST),
+    ("demo.long_job", QUEUE_HEAVY),
+    ("demo.crunch", QUEUE_HEAVY),
+    ("demo.report", QUEUE_HEAVY),
+    ("api_keys.flush_usage", QUEUE_DEFAULT),
+    ("not.routed", QUEUE_DEFAULT),
+])
+def test_tasks_go_to_their_queue(task_name: str, queue: str) -> None:
+    assert _queue(task_name) == queue
+
+
+def test_every_registered_task_lands_on_a_consumed_queue() -> None:
+    celery_app.loader.import_default_modules()
+    consumed = {queue for name, profile in WORKER_PROFILES.items() if name != "all" for queue in profile.queues}
+    assert set(WORKER_PROFILES["all"].queues) == consumed
+    for name in celery_app.tasks:
+        if not name.startswith("celery."):
+            assert _queue(name) in consumed, name
+    assert {route["queue"] for route in TASK_ROUTES.values()} <= consumed
+
+
+def test_worker_argv_applies_the_profile_and_lets_extra_args_win() -> None:
+    argv = worker_argv("heavy", ["--concurrency=2"])
+    assert f"--queues={QUEUE_HEAVY}" in argv
+    assert "--prefetch-multiplier=1" in argv
+    assert "--max-tasks-per-child=100" in argv
+    assert argv[-1] == "--concurrency=2"
+    assert argv.index("--concurrency=2") > argv.index(f"--concurrency={WORKER_PROFILES['heavy'].concurrency}")